@@ -8,9 +8,14 @@ from config import Config
 db = SQLAlchemy()
 jwt = JWTManager()
 
-def create_app():
+def create_app(config_class=Config):
     app = Flask(__name__)
-    app.config.from_object(Config)
+    app.config.from_object(config_class)
+
+    # Respuestas JSON con orjson si está instalado (misma salida que jsonify)
+    from .serialization import OrjsonProvider, orjson
+    if orjson is not None and app.config.get("ORJSON_ENABLED", True):
+        app.json = OrjsonProvider(app)
 
     CORS(app, origins=["http://localhost:3000","http://127.0.0.1:3000"],
          allow_headers=["Content-Type","Authorization"])
@@ -27,13 +32,29 @@ def create_app():
 
     with app.app_context():
         db.create_all()
+
+    # Los servicios leen la configuración de esta app (app/settings.py); los índices en
+    # memoria (casas y preferencias) y las cachés se llenan desde su base
+    from .services import PreferencesService, configure_services
+    configure_services(app.config)
+    PreferencesService.start_match_sync(app, app.config.get("CLIENT_MATCHES_SYNC_WORKERS", 1),
+                                        app.config.get("CLIENT_MATCHES_SYNC_MAX_PENDING", 1000))
         
-        # Cargar modelos de IA al iniciar la aplicación
-        from .services import AIService
+    # Cargar modelos de IA: en segundo plano para que las rutas CRUD respondan
+    # de inmediato; /api/ai/* responde 503 hasta que estén listos (ver /readyz)
+    from .services import AIService
+    from .metrics import metrics
+    metrics.enabled = app.config.get("AI_METRICS_ENABLED", True)
+    if app.config.get("AI_BACKGROUND_LOAD", True):
+        AIService.start_background_load(warmup=app.config.get("AI_WARMUP", True))
+        if app.config.get("AI_WATCH_RESOURCES"):
+            AIService.start_watcher(app.config.get("AI_WATCH_INTERVAL"))
+    else:
         print("🔄 Cargando modelos de IA...")
         AIService.load_models()
         print("✅ Modelos de IA cargados correctamente")
 
     # útil para depurar: imprime todas las rutas
-    print(app.url_map)
+    if app.debug:
+        print(app.url_map)
     return app
@@ -0,0 +1,167 @@
+"""
+Micro-batching de predicciones.
+
+Las peticiones concurrentes encolan su fila ya codificada (validada en el hilo
+de la petición) y esperan su resultado; un hilo vacía la cola cuando junta
+max_batch_size filas o cuando la más antigua lleva max_wait_ms esperando, y
+hace una sola llamada al booster para todo el lote.
+"""
+import bisect
+import threading
+import time
+from concurrent.futures import Future
+
+import numpy as np
+
+# Límites superiores (ms) del histograma de tiempo en cola
+QUEUE_DELAY_BUCKETS_MS = (0.5, 1, 2, 5, 10, 25, 50, 100, 250, 1000)
+
+
+class MicroBatcher:
+    """
+    predict_matrix(X) recibe una matriz (n, n_features) y devuelve n predicciones,
+    como CompiledModel.predict_matrix. observe_delay(segundos), si se indica,
+    recibe el tiempo en cola de cada fila (para las métricas de Prometheus).
+    """
+
+    def __init__(self, predict_matrix, max_batch_size=32, max_wait_ms=2.0, name='micro-batcher',
+                 idle_timeout=60.0, observe_delay=None):
+        self.predict_matrix = predict_matrix
+        self.observe_delay = observe_delay
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.max_wait = max(0.0, float(max_wait_ms)) / 1000.0
+        # El hilo termina tras idle_timeout segundos sin filas y se recrea al llegar otra.
+        # Los batchers de versiones de modelo reemplazadas los cierra el registro (close)
+        self.idle_timeout = idle_timeout
+        self.name = name
+        self._queue = []
+        self._cond = threading.Condition()
+        self._thread = None
+        self._closed = False
+
+        # Métricas
+        self.batches = 0
+        self.rows = 0
+        self.max_queue_depth = 0
+        self.batch_size_counts = {}
+        self.queue_delay_counts = [0] * (len(QUEUE_DELAY_BUCKETS_MS) + 1)
+        self.queue_delay_sum = 0.0
+        self.queue_delay_max = 0.0
+
+    def submit(self, row):
+        """Encola una fila codificada (1, n_features) y devuelve un Future con su predicción"""
+        future = Future()
+        with self._cond:
+            closed = self._closed
+            if not closed:
+                if self._thread is None or not self._thread.is_alive():
+                    # El hilo se crea con la primera petición; si se heredó de un fork ya no existe
+                    self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+                    self._thread.start()
+                self._queue.append((row, future, time.perf_counter()))
+                self.max_queue_depth = max(self.max_queue_depth, len(self._queue))
+                self._cond.notify()
+        if closed:
+            # Cerrado (versión de modelo reemplazada): las peticiones que todavía
+            # lo usan predicen en su propio hilo, sin cola
+            try:
+                future.set_result(float(self.predict_matrix(row)[0]))
+            except Exception as e:
+                future.set_exception(e)
+        return future
+
+    def predict(self, row, timeout=None):
+        return self.submit(row).result(timeout)
+
+    @property
+    def closed(self):
+        return self._closed
+
+    def close(self):
+        """Deja de aceptar filas en la cola, despacha las que quedan y espera al hilo"""
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+            thread = self._thread
+        if thread is not None:
+            thread.join()
+
+    def _next_batch(self):
+        with self._cond:
+            idle_deadline = time.perf_counter() + self.idle_timeout
+            while not self._queue and not self._closed:
+                remaining = idle_deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+            if not self._queue:
+                self._thread = None
+                return None
+            deadline = self._queue[0][2] + self.max_wait
+            while len(self._queue) < self.max_batch_size and not self._closed:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+            batch = self._queue[:self.max_batch_size]
+            del self._queue[:self.max_batch_size]
+            return batch
+
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            if batch is None:
+                return
+            self._flush(batch)
+
+    def _flush(self, batch):
+        started = time.perf_counter()
+        self._record(batch, started)
+        try:
+            values = self.predict_matrix(np.vstack([row for row, _, _ in batch]))
+        except Exception as e:
+            for _, future, _ in batch:
+                future.set_exception(e)
+            return
+        for (_, future, _), value in zip(batch, values):
+            future.set_result(float(value))
+
+    def _record(self, batch, flushed_at):
+        if self.observe_delay is not None:
+            for _, _, enqueued_at in batch:
+                self.observe_delay(flushed_at - enqueued_at)
+        with self._cond:
+            self.batches += 1
+            self.rows += len(batch)
+            size = len(batch)
+            self.batch_size_counts[size] = self.batch_size_counts.get(size, 0) + 1
+            for _, _, enqueued_at in batch:
+                delay_ms = (flushed_at - enqueued_at) * 1000
+                self.queue_delay_counts[bisect.bisect_left(QUEUE_DELAY_BUCKETS_MS, delay_ms)] += 1
+                self.queue_delay_sum += delay_ms
+                self.queue_delay_max = max(self.queue_delay_max, delay_ms)
+
+    def stats(self):
+        with self._cond:
+            buckets = {}
+            cumulative = 0
+            for bound, count in zip(QUEUE_DELAY_BUCKETS_MS + ('+Inf',), self.queue_delay_counts):
+                cumulative += count
+                buckets[str(bound)] = cumulative
+            return {
+                'max_batch_size': self.max_batch_size,
+                'max_wait_ms': self.max_wait * 1000,
+                'queue_depth': len(self._queue),
+                'max_queue_depth': self.max_queue_depth,
+                'batches': self.batches,
+                'rows': self.rows,
+                'avg_batch_size': round(self.rows / self.batches, 2) if self.batches else 0.0,
+                'batch_size_histogram': dict(sorted(self.batch_size_counts.items())),
+                'queue_delay_ms': {
+                    'count': self.rows,
+                    'sum': round(self.queue_delay_sum, 3),
+                    'max': round(self.queue_delay_max, 3),
+                    'avg': round(self.queue_delay_sum / self.rows, 3) if self.rows else 0.0,
+                    'buckets': buckets,
+                },
+            }
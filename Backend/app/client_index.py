@@ -0,0 +1,281 @@
+"""
+Índice invertido en memoria de las preferencias de los clientes.
+
+Responde la pregunta inversa a HouseIndex: dada una casa nueva, qué clientes
+la aceptan según app/matching.py (cualquier criterio activo, con el mismo
+puntaje por pesos). Los criterios 'equals' van en tablas hash
+{valor: clientes}, los 'truthy' en un conjunto y cada rango min/max en un
+árbol de intervalos centrado, así que buscar una casa cuesta
+O(criterios · log n + clientes encontrados) en lugar de recorrer todas las
+preferencias.
+
+Los clientes sin criterios activos aceptan cualquier casa; no entran en las
+búsquedas y se listan aparte con match_all().
+
+Las preferencias que cambian en este proceso se aplican con upsert/remove.
+Igual que HouseIndex, si se da version() el índice recuerda la versión de las
+preferencias con la que se construyó y se reconstruye en cuanto otro proceso
+la sube; además, cada resync_interval segundos (o tras invalidate()) se
+reconstruye desde la base.
+"""
+import threading
+import time
+
+import numpy as np
+
+from .matching import MATCH_CRITERIA, TRUTHY_FOLDED, fold
+
+_POSITION = {criterion.column: n for n, criterion in enumerate(MATCH_CRITERIA)}
+_WEIGHTS = np.array([criterion.weight for criterion in MATCH_CRITERIA])
+_NAMES = np.array([criterion.name for criterion in MATCH_CRITERIA], dtype=object)
+
+
+class IntervalTree:
+    """
+    Árbol de intervalos centrado y estático sobre [(mínimo, máximo, id)], con
+    -inf/+inf para los extremos abiertos. stab(x) devuelve los id cuyos
+    intervalos contienen x.
+    """
+
+    __slots__ = ('center', 'by_low', 'low_ids', 'by_high', 'high_ids', 'left', 'right')
+
+    def __init__(self, low, high, ids):
+        # Centro: mediana de los extremos finitos, para que el árbol quede balanceado
+        ends = np.concatenate([low, high])
+        ends = ends[np.isfinite(ends)]
+        self.center = float(np.median(ends)) if len(ends) else 0.0
+        left = high < self.center
+        right = low > self.center
+        here = ~(left | right)
+
+        # Los que contienen el centro, ordenados por mínimo y por máximo (descendente)
+        order = np.argsort(low[here], kind='stable')
+        self.by_low, self.low_ids = low[here][order], ids[here][order]
+        order = np.argsort(-high[here], kind='stable')
+        self.by_high, self.high_ids = -high[here][order], ids[here][order]
+
+        self.left = IntervalTree(low[left], high[left], ids[left]) if left.any() else None
+        self.right = IntervalTree(low[right], high[right], ids[right]) if right.any() else None
+
+    @classmethod
+    def build(cls, intervals):
+        """intervals: {id: (mínimo o None, máximo o None)}"""
+        if not intervals:
+            return None
+        ids = np.fromiter(intervals.keys(), dtype=np.int64, count=len(intervals))
+        low = np.array([-np.inf if lo is None else lo for lo, _ in intervals.values()], dtype=float)
+        high = np.array([np.inf if hi is None else hi for _, hi in intervals.values()], dtype=float)
+        return cls(low, high, ids)
+
+    def stab(self, x):
+        found = []
+        node = self
+        while node is not None:
+            if x < node.center:
+                # Todos terminan después de x; basta con que empiecen antes
+                found.append(node.low_ids[:np.searchsorted(node.by_low, x, side='right')])
+                node = node.left
+            elif x > node.center:
+                found.append(node.high_ids[:np.searchsorted(node.by_high, -x, side='right')])
+                node = node.right
+            else:
+                found.append(node.low_ids)
+                break
+        return np.concatenate(found) if found else np.empty(0, dtype=np.int64)
+
+
+class ClientIndex:
+    """
+    load() devuelve un iterable de (client_id, [(criterio, valor)]) con las
+    preferencias vigentes de cada cliente (matching.active_criteria).
+    version(), opcional, devuelve la versión compartida de las preferencias;
+    se consulta antes de cada búsqueda.
+    """
+
+    def __init__(self, load, resync_interval=300.0, version=None):
+        self.load = load
+        self.resync_interval = float(resync_interval)
+        self.version = version
+        # Versión de las preferencias que refleja el índice (None sin version())
+        self._version = None
+        self._lock = threading.Lock()
+        # Una sola reconstrucción a la vez, como en HouseIndex
+        self._build_lock = threading.Lock()
+        self._criteria = None
+        self._built_at = 0.0
+        self._stale = True
+        self._changes = 0
+        self.rebuilds = 0
+        self._reset()
+
+    def _reset(self):
+        self._buckets = {}     # columna -> {valor (matching.fold): {client_id}}
+        self._truthy = {}      # columna -> {client_id}
+        self._intervals = {}   # columna -> {client_id: (mínimo, máximo)}
+        self._trees = {}       # columna -> IntervalTree (None si hay que reconstruirlo)
+        self._match_all = set()
+        self._weights = {}     # client_id -> suma de los pesos de sus criterios
+
+    def _add(self, client_id, criteria):
+        self._criteria[client_id] = criteria
+        self._weights[client_id] = sum(criterion.weight for criterion, _ in criteria)
+        if not criteria:
+            # Sin criterios activos todas las casas coinciden, como en find_matching_houses
+            self._match_all.add(client_id)
+        for criterion, value in criteria:
+            column = criterion.column
+            if criterion.kind == 'equals':
+                self._buckets.setdefault(column, {}).setdefault(fold(value), set()).add(client_id)
+            elif criterion.kind == 'truthy':
+                self._truthy.setdefault(column, set()).add(client_id)
+            else:
+                low, high = value
+                if low is not None and high is not None and low > high:
+                    # Un rango vacío no acepta ninguna casa
+                    continue
+                self._intervals.setdefault(column, {})[client_id] = value
+                self._trees[column] = None
+
+    def _discard(self, client_id):
+        criteria = self._criteria.pop(client_id, None)
+        if criteria is None:
+            return
+        self._weights.pop(client_id, None)
+        self._match_all.discard(client_id)
+        for criterion, value in criteria:
+            column = criterion.column
+            if criterion.kind == 'equals':
+                bucket = self._buckets[column]
+                value = fold(value)
+                bucket[value].discard(client_id)
+                if not bucket[value]:
+                    del bucket[value]
+            elif criterion.kind == 'truthy':
+                self._truthy[column].discard(client_id)
+            elif self._intervals.get(column, {}).pop(client_id, None) is not None:
+                self._trees[column] = None
+
+    def _expired(self, version):
+        return (self._stale or version != self._version
+                or time.monotonic() - self._built_at >= self.resync_interval)
+
+    def ensure_fresh(self):
+        """Reconstruye el índice si nunca se construyó, se invalidó, cambió la versión o ya venció"""
+        version = self.version() if self.version is not None else None
+        if not self._expired(version):
+            return
+        with self._build_lock:
+            if not self._expired(version):
+                return
+            changes = self._changes
+            # Si la carga falla el índice sigue marcado y la próxima consulta lo reintenta
+            rows = list(self.load())
+            with self._lock:
+                self._criteria = {}
+                self._reset()
+                for client_id, criteria in rows:
+                    self._add(client_id, criteria)
+                self._built_at = time.monotonic()
+                self._version = version
+                self.rebuilds += 1
+                self._stale = self._changes != changes
+
+    def invalidate(self):
+        with self._lock:
+            self._changes += 1
+            self._stale = True
+
+    def upsert(self, client_id, criteria, version=None):
+        """
+        Alta o cambio de las preferencias de un cliente. version es la de las
+        preferencias tras esta escritura (ver HouseIndex._advance)
+        """
+        with self._lock:
+            self._changes += 1
+            if self._criteria is None:
+                return
+            self._discard(client_id)
+            self._add(client_id, criteria)
+            self._advance(version)
+
+    def remove(self, client_id, version=None):
+        with self._lock:
+            self._changes += 1
+            if self._criteria is not None:
+                self._discard(client_id)
+                self._advance(version)
+
+    def _advance(self, version):
+        # Solo si esta escritura es la única desde la versión del índice
+        if version is not None and self._version is not None and version == self._version + 1:
+            self._version = version
+
+    def __len__(self):
+        criteria = self._criteria
+        return 0 if criteria is None else len(criteria)
+
+    def match_all(self):
+        """client_id (ordenados) de los clientes sin criterios activos"""
+        self.ensure_fresh()
+        with self._lock:
+            return sorted(self._match_all)
+
+    def match(self, values):
+        """
+        Clientes con criterios que aceptan una casa ({columna: valor}, None es
+        NULL): [(client_id, puntaje normalizado 0..1, [criterios cumplidos])].
+        Los de match_all() no se incluyen
+        """
+        self.ensure_fresh()
+        found = []
+
+        def add(client_ids, column):
+            if len(client_ids):
+                if isinstance(client_ids, set):
+                    client_ids = np.fromiter(client_ids, dtype=np.int64, count=len(client_ids))
+                found.append((client_ids, _POSITION[column]))
+
+        with self._lock:
+            for column, bucket in self._buckets.items():
+                value = fold(values.get(column))
+                if value is not None and value in bucket:
+                    add(bucket[value], column)
+            for column, client_ids in self._truthy.items():
+                if fold(values.get(column)) in TRUTHY_FOLDED:
+                    add(client_ids, column)
+            for column, intervals in self._intervals.items():
+                value = values.get(column)
+                if value is None or not intervals:
+                    continue
+                tree = self._trees.get(column)
+                if tree is None:
+                    tree = self._trees[column] = IntervalTree.build(intervals)
+                add(tree.stab(float(value)), column)
+            if not found:
+                return []
+
+            # Agrupar por cliente con los criterios en el orden de MATCH_CRITERIA,
+            # como matched_criteria y el puntaje de las recomendaciones
+            ids = np.concatenate([client_ids for client_ids, _ in found])
+            positions = np.concatenate([np.full(len(client_ids), p) for client_ids, p in found])
+            order = np.lexsort((positions, ids))
+            ids, positions = ids[order], positions[order]
+            starts = np.flatnonzero(np.r_[True, ids[1:] != ids[:-1]])
+            scores = np.add.reduceat(_WEIGHTS[positions], starts).tolist()
+            clients = ids[starts].tolist()
+            totals = [self._weights[client_id] for client_id in clients]
+
+        names = _NAMES[positions].tolist()
+        bounds = starts.tolist() + [len(names)]
+        return [
+            (client_id, round(score / total, 4), names[begin:end])
+            for client_id, score, total, begin, end in zip(clients, scores, totals, bounds, bounds[1:])
+        ]
+
+    def stats(self):
+        return {
+            'clients': len(self),
+            'rebuilds': self.rebuilds,
+            'version': self._version,
+            'age_s': round(time.monotonic() - self._built_at, 1) if self._criteria is not None else None,
+        }
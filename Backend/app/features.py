@@ -0,0 +1,317 @@
+"""
+Ingeniería de características del notebook (DataCleansing.ipynb), vectorizada.
+
+Cada característica de add_engineered_features se declara una sola vez
+(DERIVED_FEATURES) y se evalúa con NumPy sobre columnas completas para un
+DataFrame (CSV, benchmarks) o un lote de diccionarios (predict_batch, valuación
+de casas), y con floats de Python para una sola petición. Una característica se
+calcula solo si la fila trae todas sus columnas de entrada; si no, se respeta el
+valor que venga en la fila.
+"""
+import math
+from collections import namedtuple
+
+import numpy as np
+
+# drop_columns y limpiar_df del notebook
+DROP_COLUMNS = ['Id', 'Utilities', 'Condition2', 'LandSlope', 'LowQualFinSF',
+                'MiscVal', 'Street', 'RoofMatl', 'Heating']
+MODE_COLUMNS = ['MSZoning', 'BsmtQual', 'BsmtCond', 'BsmtExposure', 'BsmtFinType1',
+                'BsmtFinType2', 'FireplaceQu', 'GarageType', 'GarageYrBlt',
+                'GarageFinish', 'GarageQual', 'GarageCond']
+MEAN_COLUMNS = ['LotFrontage', 'MasVnrArea']
+SPARSE_COLUMNS = ['MasVnrType', 'MiscFeature', 'PoolQC', 'Alley']
+
+SEASONS = {12: 'Invierno', 1: 'Invierno', 2: 'Invierno', 3: 'Primavera', 4: 'Primavera',
+           5: 'Primavera', 6: 'Verano', 7: 'Verano', 8: 'Verano', 9: 'Otoño',
+           10: 'Otoño', 11: 'Otoño'}
+
+
+class Derived(namedtuple('Derived', 'op inputs weights')):
+    """
+    Fórmula de una característica derivada. Las operaciones replican a pandas:
+      diff      a - b (NaN se propaga)
+      age       a - b; negativo -> NaN
+      sum       suma ponderada con fillna(0)
+      ratio     a / b; b == 0 -> NaN
+      product   a * b con fillna(0)
+      positive  1 si fillna(0) > 0
+      differs   1 si a != b (NaN cuenta como distinto)
+      present   1 si el valor no es nulo
+      season    estación del mes de venta
+    """
+    __slots__ = ()
+
+    def __new__(cls, op, inputs, weights=None):
+        return super().__new__(cls, op, tuple(inputs), weights)
+
+
+# nombre -> fórmula; mismo orden que add_engineered_features del notebook
+DERIVED_FEATURES = {
+    'HouseAge': Derived('diff', ('YrSold', 'YearBuilt')),
+    'RemodAge': Derived('diff', ('YrSold', 'YearRemodAdd')),
+    'AgeAtRemodel': Derived('diff', ('YearRemodAdd', 'YearBuilt')),
+    'GarageAge': Derived('age', ('YrSold', 'GarageYrBlt')),
+    'BsmtFinSF': Derived('sum', ('BsmtFinSF1', 'BsmtFinSF2')),
+    'TotalSF': Derived('sum', ('1stFlrSF', '2ndFlrSF', 'TotalBsmtSF')),
+    'TotalPorchSF': Derived('sum', ('OpenPorchSF', 'EnclosedPorch', '3SsnPorch', 'WoodDeckSF')),
+    'TotalBath': Derived('sum', ('FullBath', 'HalfBath', 'BsmtFullBath', 'BsmtHalfBath'), (1.0, 0.5, 1.0, 0.5)),
+    'RoomsPlusBathEq': Derived('sum', ('TotRmsAbvGrd', 'FullBath', 'HalfBath'), (1.0, 1.0, 0.5)),
+    'LotFrontageRatio': Derived('ratio', ('LotFrontage', 'LotArea')),
+    'LotAreaPerRoom': Derived('ratio', ('LotArea', 'TotRmsAbvGrd')),
+    'GarageScore': Derived('product', ('GarageCars', 'GarageArea')),
+    'HasPool': Derived('positive', ('PoolArea',)),
+    'HasFireplace': Derived('positive', ('Fireplaces',)),
+    'Remodeled': Derived('differs', ('YearRemodAdd', 'YearBuilt')),
+    'Has2ndFlr': Derived('positive', ('2ndFlrSF',)),
+    'HasBsmt': Derived('positive', ('TotalBsmtSF',)),
+    'HasGarage': Derived('positive', ('GarageArea',)),
+    'HasFence': Derived('present', ('Fence',)),
+    'SeasonSold': Derived('season', ('MoSold',)),
+}
+
+_INPUT_SETS = {name: frozenset(spec.inputs) for name, spec in DERIVED_FEATURES.items()}
+
+
+def _is_missing(value):
+    return value is None or (isinstance(value, float) and value != value)
+
+
+def _to_float(values):
+    """Columna a float64; None y valores no numéricos quedan como NaN"""
+    try:
+        return np.asarray(values, dtype=np.float64)
+    except (TypeError, ValueError):
+        return np.array([_scalar(v) for v in values], dtype=np.float64)
+
+
+def _scalar(value):
+    try:
+        return float(value) if value is not None else math.nan
+    except (TypeError, ValueError):
+        return math.nan
+
+
+def _evaluate_columns(spec, columns):
+    """Fórmula sobre columnas completas (DataFrame o dict nombre -> lista)"""
+    op = spec.op
+    if op == 'present':
+        values = columns[spec.inputs[0]]
+        return np.fromiter((not _is_missing(v) for v in values), dtype=bool, count=len(values)).astype(int)
+    x = [_to_float(columns[name]) for name in spec.inputs]
+    if op in ('sum', 'product', 'positive'):
+        x = [np.where(np.isnan(v), 0.0, v) for v in x]
+    if op == 'diff':
+        return x[0] - x[1]
+    if op == 'age':
+        age = x[0] - x[1]
+        return np.where(age < 0, np.nan, age)
+    if op == 'sum':
+        weights = spec.weights or (1.0,) * len(x)
+        total = x[0] * weights[0]
+        for v, w in zip(x[1:], weights[1:]):
+            total = total + v * w
+        return total
+    if op == 'ratio':
+        return x[0] / np.where(x[1] == 0, np.nan, x[1])
+    if op == 'product':
+        return x[0] * x[1]
+    if op == 'positive':
+        return (x[0] > 0).astype(int)
+    if op == 'differs':
+        return (x[0] != x[1]).astype(int)
+    if op == 'season':
+        return np.array([SEASONS.get(int(m), np.nan) if m == m else np.nan for m in x[0]], dtype=object)
+    raise ValueError(f"Operación desconocida: {op}")
+
+
+def _evaluate_row(spec, row):
+    """La misma fórmula para una sola fila, con floats de Python (sin costo de NumPy)"""
+    op = spec.op
+    if op == 'present':
+        return int(not _is_missing(row[spec.inputs[0]]))
+    x = [_scalar(row[name]) for name in spec.inputs]
+    if op in ('sum', 'product', 'positive'):
+        x = [0.0 if v != v else v for v in x]
+    if op == 'diff':
+        return x[0] - x[1]
+    if op == 'age':
+        age = x[0] - x[1]
+        return math.nan if age < 0 else age
+    if op == 'sum':
+        weights = spec.weights or (1.0,) * len(x)
+        return sum(v * w for v, w in zip(x, weights))
+    if op == 'ratio':
+        return x[0] / x[1] if x[1] != 0 and x[1] == x[1] else math.nan
+    if op == 'product':
+        return x[0] * x[1]
+    if op == 'positive':
+        return int(x[0] > 0)
+    if op == 'differs':
+        return int(x[0] != x[1])
+    if op == 'season':
+        return SEASONS.get(int(x[0]), math.nan) if x[0] == x[0] else math.nan
+    raise ValueError(f"Operación desconocida: {op}")
+
+
+def _selected(features):
+    if features is None:
+        return DERIVED_FEATURES.items()
+    return [(name, spec) for name, spec in DERIVED_FEATURES.items() if name in features]
+
+
+def add_engineered_features(df, features=None):
+    """
+    Agrega a una copia del DataFrame las características derivadas cuyas columnas
+    de entrada están presentes. Si la columna derivada ya existía, sus valores se
+    conservan solo donde la fórmula da NaN.
+    """
+    df = df.copy()
+    with np.errstate(divide='ignore', invalid='ignore'):
+        for name, spec in _selected(features):
+            if not all(column in df.columns for column in spec.inputs):
+                continue
+            values = _evaluate_columns(spec, df)
+            if values.dtype == np.float64 and any(df[column].dtype == object for column in spec.inputs):
+                # Como en pandas: aritmética con una columna object da object (GarageAge
+                # a partir de GarageYrBlt imputado); el OneHotEncoder del pipeline lo espera
+                values = values.astype(object)
+            elif name in df.columns and values.dtype != object:
+                values = np.where(np.isnan(values), _to_float(df[name]), values)
+            df[name] = values
+    return df
+
+
+def engineer_records(rows, features=None, overwrite=True):
+    """
+    Características derivadas para una lista de diccionarios. Con varias filas
+    cada fórmula se evalúa por columna sobre las filas que traen sus entradas;
+    con una sola se evalúa en Python. overwrite=False solo llena las que faltan
+    (o son nulas) en la fila. Devuelve diccionarios nuevos solo para las filas
+    que cambian.
+    """
+    out = list(rows)
+    if not out:
+        return out
+    selected = _selected(features)
+    if len(out) == 1:
+        row = out[0]
+        keys = row.keys()
+        for name, spec in selected:
+            if not keys >= _INPUT_SETS[name] or (not overwrite and not _is_missing(row.get(name))):
+                continue
+            value = _evaluate_row(spec, row)
+            if _is_missing(value):
+                if name in row:
+                    continue
+                value = None
+            if row is rows[0]:
+                row = out[0] = dict(row)
+                keys = row.keys()
+            row[name] = value
+        return out
+
+    # Filas con todas las entradas de todas las fórmulas: no se revisan por fórmula
+    needed = frozenset().union(*(_INPUT_SETS[name] for name, _ in selected))
+    complete = [row.keys() >= needed for row in out]
+    all_complete = all(complete)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        for name, spec in selected:
+            inputs = _INPUT_SETS[name]
+            if all_complete and overwrite:
+                idx = range(len(out))
+            else:
+                idx = [
+                    i for i, row in enumerate(out)
+                    if (complete[i] or row.keys() >= inputs)
+                    and (overwrite or _is_missing(row.get(name)))
+                ]
+                if not idx:
+                    continue
+            columns = {column: [out[i][column] for i in idx] for column in spec.inputs}
+            values = _evaluate_columns(spec, columns)
+            if values.dtype.kind == 'f':
+                missing = np.isnan(values).tolist()
+            elif values.dtype.kind in 'iub':
+                missing = [False] * len(values)
+            else:
+                missing = [_is_missing(v) for v in values]
+            for i, value, is_missing in zip(idx, values.tolist(), missing):
+                row = out[i]
+                if is_missing:
+                    if name in row:
+                        continue
+                    value = None
+                if row is rows[i]:
+                    row = out[i] = dict(row)
+                row[name] = value
+    return out
+
+
+def engineer_record(data, features=None, overwrite=True):
+    """engineer_records para una sola fila"""
+    return engineer_records([data], features, overwrite)[0]
+
+
+class KaggleFillValues:
+    """
+    Valores de imputación de limpiar_df (moda de MODE_COLUMNS y media de
+    MEAN_COLUMNS) acumulados bloque por bloque, para limpiar un CSV grande en
+    bloques con las mismas estadísticas que tendría el archivo completo.
+    """
+
+    def __init__(self):
+        self.counts = {column: {} for column in MODE_COLUMNS}
+        self.sums = {column: 0.0 for column in MEAN_COLUMNS}
+        self.sizes = {column: 0 for column in MEAN_COLUMNS}
+
+    @classmethod
+    def from_frame(cls, df):
+        return cls().update(df)
+
+    def update(self, df):
+        for column in MODE_COLUMNS:
+            counts = self.counts[column]
+            for value, count in df[column].value_counts(dropna=True).items():
+                counts[value] = counts.get(value, 0) + int(count)
+        for column in MEAN_COLUMNS:
+            values = df[column].dropna()
+            self.sums[column] += float(values.sum())
+            self.sizes[column] += len(values)
+        return self
+
+    def values(self):
+        """{columna: valor}; en empates de la moda gana el menor, como SimpleImputer"""
+        fill = {}
+        for column, counts in self.counts.items():
+            if counts:
+                top = max(counts.values())
+                fill[column] = min(value for value, count in counts.items() if count == top)
+        for column in MEAN_COLUMNS:
+            if self.sizes[column]:
+                fill[column] = self.sums[column] / self.sizes[column]
+        return fill
+
+
+def prepare_kaggle_frame(df, fill_values=None):
+    """
+    drop_columns + limpiar_df + add_engineered_features del notebook para un
+    DataFrame con el formato de train.csv/test.csv. Sin fill_values la moda y
+    la media se calculan sobre el mismo DataFrame, como en el notebook; los NaN
+    restantes se dejan para los imputadores de los pipelines.
+    """
+    import pandas as pd
+
+    if fill_values is None:
+        fill_values = KaggleFillValues.from_frame(df).values()
+    df = df.drop(columns=[c for c in DROP_COLUMNS if c in df.columns])
+    for column in MODE_COLUMNS:
+        # SimpleImputer devuelve object para estas columnas (GarageYrBlt incluida)
+        values = df[column].to_numpy(dtype=object, copy=True)
+        if column in fill_values:
+            values[pd.isna(values)] = fill_values[column]
+        df[column] = values
+    for column in MEAN_COLUMNS:
+        df[column] = df[column].astype(np.float64).fillna(fill_values.get(column, np.nan))
+    df = df.drop(columns=[c for c in SPARSE_COLUMNS if c in df.columns])
+    return add_engineered_features(df)
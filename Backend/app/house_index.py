@@ -0,0 +1,262 @@
+"""
+Índice columnar en memoria de las casas disponibles.
+
+Las columnas que usa el matching se guardan como arreglos NumPy: las numéricas
+en float64 (NaN para NULL) y las de texto codificadas con un diccionario
+(-1 para NULL; el vocabulario guarda el texto con matching.fold, igual que
+compara la base). Los criterios de app/matching.py se evalúan sobre todo el
+arreglo a la vez, sin consultar la base de datos.
+
+create_house / delete_house actualizan el índice en el momento. Si se da
+version(), el índice recuerda la versión del inventario con la que se
+construyó y se reconstruye en cuanto otro proceso la sube; además, cada
+resync_interval segundos (o tras invalidate()) se reconstruye desde la base
+para recoger lo que cambió por otras rutas.
+"""
+import threading
+import time
+
+import numpy as np
+
+from .matching import CATEGORICAL_COLUMNS, RANGE_COLUMNS, TRUTHY_FOLDED, fold
+
+INITIAL_CAPACITY = 1024
+
+
+class _Columns:
+    """Arreglos del índice; solo crecen (las bajas se marcan en alive)"""
+
+    def __init__(self, capacity):
+        self.size = 0
+        self.house_id = np.zeros(capacity, dtype=np.int64)
+        self.alive = np.zeros(capacity, dtype=bool)
+        self.numeric = {column: np.full(capacity, np.nan) for column in RANGE_COLUMNS}
+        self.codes = {column: np.full(capacity, -1, dtype=np.int32) for column in CATEGORICAL_COLUMNS}
+        self.vocabulary = {column: {} for column in CATEGORICAL_COLUMNS}
+        self.slots = {}
+
+    @property
+    def capacity(self):
+        return len(self.house_id)
+
+    def grow(self):
+        """Duplica la capacidad con arreglos nuevos; quien lee conserva los anteriores"""
+        capacity = self.capacity * 2
+
+        def resized(array, fill):
+            out = np.full(capacity, fill, dtype=array.dtype)
+            out[:self.size] = array[:self.size]
+            return out
+
+        self.house_id = resized(self.house_id, 0)
+        self.alive = resized(self.alive, False)
+        self.numeric = {c: resized(a, np.nan) for c, a in self.numeric.items()}
+        self.codes = {c: resized(a, -1) for c, a in self.codes.items()}
+
+    def append(self, house_id, values):
+        if self.size == self.capacity:
+            self.grow()
+        i = self.size
+        self.house_id[i] = house_id
+        for column in RANGE_COLUMNS:
+            value = values.get(column)
+            self.numeric[column][i] = np.nan if value is None else float(value)
+        for column in CATEGORICAL_COLUMNS:
+            value = values.get(column)
+            if value is not None:
+                vocabulary = self.vocabulary[column]
+                self.codes[column][i] = vocabulary.setdefault(fold(value), len(vocabulary))
+        self.alive[i] = True
+        self.slots[house_id] = i
+        # El tamaño se publica al final: quien lee nunca ve una fila a medias
+        self.size = i + 1
+
+    def remove(self, house_id):
+        i = self.slots.pop(house_id, None)
+        if i is not None:
+            self.alive[i] = False
+
+
+class HouseIndex:
+    """
+    load() devuelve un iterable de (house_id, {columna: valor}) con las casas
+    disponibles; se llama al construir y al resincronizar el índice.
+    version(), opcional, devuelve la versión compartida del inventario; se
+    consulta antes de cada búsqueda.
+    """
+
+    def __init__(self, load, resync_interval=300.0, version=None):
+        self.load = load
+        self.resync_interval = float(resync_interval)
+        self.version = version
+        # Versión del inventario que refleja el índice (None sin version())
+        self._version = None
+        self._lock = threading.Lock()
+        # Una sola reconstrucción a la vez; las demás peticiones esperan su resultado
+        self._build_lock = threading.Lock()
+        self._columns = None
+        self._built_at = 0.0
+        self._stale = True
+        # Altas y bajas; si llega alguna mientras se reconstruye, se repite después
+        self._changes = 0
+        self.rebuilds = 0
+
+    def _build(self):
+        rows = list(self.load())
+        columns = _Columns(max(INITIAL_CAPACITY, len(rows)))
+        for house_id, values in rows:
+            columns.append(house_id, values)
+        return columns
+
+    def _expired(self, version):
+        return (self._stale or version != self._version
+                or time.monotonic() - self._built_at >= self.resync_interval)
+
+    def ensure_fresh(self):
+        """Reconstruye el índice si nunca se construyó, se invalidó, cambió la versión o ya venció"""
+        version = self.version() if self.version is not None else None
+        if not self._expired(version):
+            return
+        with self._build_lock:
+            # Otro hilo pudo reconstruirlo mientras se esperaba el lock
+            if not self._expired(version):
+                return
+            changes = self._changes
+            # Si la carga falla el índice sigue marcado y la próxima consulta lo reintenta
+            columns = self._build()
+            with self._lock:
+                self._columns = columns
+                self._built_at = time.monotonic()
+                self._version = version
+                self.rebuilds += 1
+                # Una alta, baja o invalidate() durante la carga obliga a repetirla
+                self._stale = self._changes != changes
+
+    def invalidate(self):
+        """La siguiente consulta reconstruye el índice desde la base"""
+        with self._lock:
+            self._changes += 1
+            self._stale = True
+
+    def upsert(self, house_id, values, version=None):
+        """
+        Alta o cambio de una casa; si ya no está disponible se quita del índice.
+        version es la del inventario tras esta escritura (ver _advance)
+        """
+        with self._lock:
+            self._changes += 1
+            if self._columns is None:
+                return
+            self._columns.remove(house_id)
+            if values.get('status', 'available') == 'available':
+                self._columns.append(house_id, values)
+            self._advance(version)
+
+    def remove(self, house_id, version=None):
+        with self._lock:
+            self._changes += 1
+            if self._columns is not None:
+                self._columns.remove(house_id)
+                self._advance(version)
+
+    def _advance(self, version):
+        # Si la escritura de este proceso es la única desde la versión del índice,
+        # el índice ya la refleja; si hubo otras en medio, se reconstruye
+        if version is not None and self._version is not None and version == self._version + 1:
+            self._version = version
+
+    def __len__(self):
+        columns = self._columns
+        return 0 if columns is None else len(columns.slots)
+
+    def _snapshot(self):
+        """Vistas de las filas publicadas; las altas posteriores no las modifican"""
+        self.ensure_fresh()
+        with self._lock:
+            columns = self._columns
+            n = columns.size
+            return (columns, columns.alive[:n], columns.house_id[:n],
+                    {c: a[:n] for c, a in columns.numeric.items()},
+                    {c: a[:n] for c, a in columns.codes.items()})
+
+    def match(self, criteria):
+        """
+        house_id (ordenados) de las casas que cumplen cualquiera de los criterios
+        [(criterio, valor)] de matching.active_criteria; sin criterios, todas
+        """
+        columns, alive, house_id, numeric, codes = self._snapshot()
+        if not criteria:
+            mask = alive.copy()
+        else:
+            mask = np.zeros(len(alive), dtype=bool)
+            for criterion, value in criteria:
+                mask |= self._evaluate(columns, numeric, codes, criterion, value)
+            mask &= alive
+        return np.sort(house_id[mask])
+
+    def rank(self, criteria, limit, offset=0):
+        """
+        Puntaje = suma de los pesos de los criterios que cumple cada casa, en una
+        pasada vectorizada. Devuelve (total de casas con puntaje > 0, página) con
+        la página como [(house_id, puntaje, [criterios cumplidos])] ordenada por
+        puntaje y, a igual puntaje, por house_id. Sin criterios todas valen 0.
+        limit=None devuelve todas desde offset.
+        """
+        columns, alive, house_id, numeric, codes = self._snapshot()
+        score = np.zeros(len(alive))
+        masks = []
+        for criterion, value in criteria:
+            mask = self._evaluate(columns, numeric, codes, criterion, value)
+            score += criterion.weight * mask
+            masks.append((criterion.name, mask))
+        candidates = alive & (score > 0) if criteria else alive
+        idx = np.flatnonzero(candidates)
+        total = len(idx)
+
+        # Selección parcial O(n) de los offset + limit mejores; los empates en el
+        # corte se resuelven por house_id para que la paginación sea estable
+        k = total if limit is None else min(offset + limit, total)
+        if k == 0:
+            return total, []
+        if k < total:
+            candidate_scores = score[idx]
+            threshold = -np.partition(-candidate_scores, k - 1)[k - 1]
+            above = idx[candidate_scores > threshold]
+            tied = idx[candidate_scores == threshold]
+            tied = tied[np.argsort(house_id[tied], kind='stable')][:k - len(above)]
+            idx = np.concatenate([above, tied])
+        order = np.lexsort((house_id[idx], -score[idx]))
+        page = idx[order][offset:None if limit is None else offset + limit]
+        return total, [
+            (int(house_id[i]), float(score[i]), [name for name, mask in masks if mask[i]])
+            for i in page
+        ]
+
+    @staticmethod
+    def _evaluate(columns, numeric, codes, criterion, value):
+        if criterion.kind == 'range':
+            # Las comparaciones con NaN dan False, como NULL en SQL
+            values = numeric[criterion.column]
+            low, high = value
+            with np.errstate(invalid='ignore'):
+                if low is not None and high is not None:
+                    return (values >= low) & (values <= high)
+                return values >= low if low is not None else values <= high
+
+        vocabulary = columns.vocabulary[criterion.column]
+        if criterion.kind == 'equals':
+            value = fold(value)
+            wanted = [vocabulary[value]] if value in vocabulary else []
+        else:
+            wanted = [code for text, code in list(vocabulary.items()) if text in TRUTHY_FOLDED]
+        return np.isin(codes[criterion.column], wanted)
+
+    def stats(self):
+        columns = self._columns
+        return {
+            'houses': len(self),
+            'slots': 0 if columns is None else columns.size,
+            'rebuilds': self.rebuilds,
+            'version': self._version,
+            'age_s': round(time.monotonic() - self._built_at, 1) if columns is not None else None,
+        }
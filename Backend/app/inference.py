@@ -0,0 +1,412 @@
+"""
+Inferencia rápida sin pandas.
+
+Al cargar los modelos se "compila" el ColumnTransformer de cada pipeline en un
+FeatureEncoder que convierte un diccionario directamente en una fila float32,
+y se extrae el booster de XGBoost para predecir sin pasar por sklearn.
+"""
+import math
+from array import array
+
+import numpy as np
+
+# Columnas del CSV de Kaggle que el notebook elimina antes de entrenar.
+# Se aceptan en la entrada (el formulario largo las envía) pero se ignoran.
+IGNORED_RAW_COLUMNS = frozenset([
+    'Id', 'SalePrice',
+    'Utilities', 'Condition2', 'LandSlope', 'LowQualFinSF', 'MiscVal',
+    'Street', 'RoofMatl', 'Heating',
+    'MasVnrType', 'MiscFeature', 'PoolQC', 'Alley',
+])
+
+
+def _is_nan(value):
+    return isinstance(value, float) and math.isnan(value)
+
+
+def _is_missing(value):
+    return value is None or _is_nan(value)
+
+
+def _to_json(value):
+    """Convierte escalares de numpy a tipos nativos para json.dump"""
+    return value.item() if isinstance(value, np.generic) else value
+
+
+class FeatureEncoder:
+    """
+    Réplica del ColumnTransformer ajustado de un pipeline.
+    Soporta OneHotEncoder (drop y handle_unknown='ignore'), SimpleImputer
+    y columnas passthrough, que es lo que usan los modelos del proyecto.
+    """
+
+    def __init__(self, known_columns, required_columns, n_features,
+                 categorical, numeric):
+        self.known_columns = frozenset(known_columns)
+        self.required_columns = tuple(required_columns)
+        self.n_features = int(n_features)
+        # categorical: (columna, offset, {categoria: posición}, imputación o None)
+        self.categorical = [
+            (col, int(offset), dict(mapping), fill)
+            for col, offset, mapping, fill in categorical
+        ]
+        # numeric: (columna, posición, imputación o None)
+        self.numeric = [(col, int(pos), fill) for col, pos, fill in numeric]
+
+    @classmethod
+    def from_pipeline(cls, pipeline):
+        """Lee categorías, imputaciones y orden de columnas del pipeline ajustado"""
+        from sklearn.compose import ColumnTransformer
+        from sklearn.impute import SimpleImputer
+        from sklearn.pipeline import Pipeline
+        from sklearn.preprocessing import FunctionTransformer, OneHotEncoder
+
+        pre = pipeline.steps[0][1]
+        if not isinstance(pre, ColumnTransformer):
+            raise TypeError("El primer paso del pipeline no es un ColumnTransformer")
+
+        categorical = []
+        numeric = []
+        required = []
+        for name, transformer, columns in pre.transformers_:
+            if transformer == 'drop' or len(columns) == 0:
+                continue
+            columns = list(columns)
+            if any(not isinstance(c, str) for c in columns):
+                raise TypeError("Solo se soportan columnas seleccionadas por nombre")
+            required.extend(columns)
+            start = pre.output_indices_[name].start
+
+            steps = transformer.steps if isinstance(transformer, Pipeline) else [(name, transformer)]
+            imputer = None
+            encoder = None
+            for _, step in steps:
+                if step == 'passthrough' or step is None:
+                    continue
+                if isinstance(step, SimpleImputer) and imputer is None and encoder is None:
+                    if step.add_indicator or not _is_nan(step.missing_values):
+                        raise TypeError("SimpleImputer con configuración no soportada")
+                    imputer = step
+                elif isinstance(step, OneHotEncoder) and encoder is None:
+                    if step.handle_unknown != 'ignore' or step._infrequent_enabled:
+                        raise TypeError("OneHotEncoder con configuración no soportada")
+                    encoder = step
+                elif isinstance(step, FunctionTransformer) and step.func is None:
+                    continue
+                else:
+                    raise TypeError(f"Transformador no soportado: {type(step).__name__}")
+
+            fills = list(imputer.statistics_) if imputer is not None else [None] * len(columns)
+            if encoder is None:
+                for i, col in enumerate(columns):
+                    fill = None if fills[i] is None else float(fills[i])
+                    numeric.append((col, start + i, fill))
+                continue
+
+            offset = start
+            drop_idx = encoder.drop_idx_ if encoder.drop_idx_ is not None else [None] * len(columns)
+            for col, cats, drop, fill in zip(columns, encoder.categories_, drop_idx, fills):
+                mapping = {}
+                pos = 0
+                for j, cat in enumerate(cats):
+                    if drop is not None and j == drop:
+                        continue
+                    mapping[cat] = pos
+                    pos += 1
+                categorical.append((col, offset, mapping, fill))
+                offset += pos
+
+        n_features = sum(s.stop - s.start for s in pre.output_indices_.values())
+        return cls(pre.feature_names_in_, required, n_features, categorical, numeric)
+
+    def to_spec(self):
+        """Especificación JSON del preprocesamiento (sin dependencias de sklearn)"""
+        return {
+            'known_columns': sorted(self.known_columns),
+            'required_columns': list(self.required_columns),
+            'n_features': self.n_features,
+            'categorical': [
+                {'column': col, 'offset': offset,
+                 'categories': [[_to_json(cat), pos] for cat, pos in mapping.items()],
+                 'fill': _to_json(fill)}
+                for col, offset, mapping, fill in self.categorical
+            ],
+            'numeric': [
+                {'column': col, 'position': pos, 'fill': _to_json(fill)}
+                for col, pos, fill in self.numeric
+            ],
+        }
+
+    @classmethod
+    def from_spec(cls, spec):
+        return cls(
+            spec['known_columns'],
+            spec['required_columns'],
+            spec['n_features'],
+            [(c['column'], c['offset'], {cat: pos for cat, pos in c['categories']}, c['fill'])
+             for c in spec['categorical']],
+            [(n['column'], n['position'], n['fill']) for n in spec['numeric']],
+        )
+
+    def validate(self, data):
+        """Rechaza campos desconocidos o faltantes antes de tocar el modelo"""
+        if not isinstance(data, dict):
+            raise ValueError("Los datos de entrada deben ser un objeto JSON")
+        unknown = [k for k in data if k not in self.known_columns and k not in IGNORED_RAW_COLUMNS]
+        if unknown:
+            raise ValueError(f"Campos desconocidos: {', '.join(sorted(unknown))}")
+        missing = [c for c in self.required_columns if c not in data]
+        if missing:
+            raise ValueError(f"Columnas faltantes: {', '.join(missing)}")
+
+    def _fill(self, out, data):
+        for col, offset, mapping, fill in self.categorical:
+            value = data[col]
+            # Igual que SimpleImputer: solo NaN cuenta como faltante en columnas de texto
+            if fill is not None and _is_nan(value):
+                value = fill
+            try:
+                pos = mapping.get(value)
+            except TypeError:
+                raise ValueError(f"Valor inválido para {col}: {value!r}")
+            if pos is not None:
+                out[offset + pos] = 1.0
+        for col, pos, fill in self.numeric:
+            value = data[col]
+            if _is_missing(value):
+                out[pos] = np.nan if fill is None else fill
+            else:
+                try:
+                    out[pos] = float(value)
+                except (TypeError, ValueError):
+                    raise ValueError(f"Valor numérico inválido para {col}: {value!r}")
+
+    def encode(self, data):
+        """Convierte un diccionario en una matriz float32 de 1 x n_features"""
+        self.validate(data)
+        out = np.zeros((1, self.n_features), dtype=np.float32)
+        self._fill(out[0], data)
+        return out
+
+    def encode_many(self, rows):
+        """Convierte una lista de diccionarios ya validados en una matriz float32"""
+        out = np.zeros((len(rows), self.n_features), dtype=np.float32)
+        for i, data in enumerate(rows):
+            self._fill(out[i], data)
+        return out
+
+    @property
+    def onehot_positions(self):
+        """Posiciones de la matriz que vienen del one-hot (siempre 0 o 1)"""
+        return sorted(offset + pos for _, offset, mapping, _ in self.categorical for pos in mapping.values())
+
+    def encode_sparse(self, rows):
+        """
+        Igual que encode_many pero en CSR: solo se guardan los 1 del one-hot y los
+        numéricos presentes (un NaN queda fuera, es decir, faltante). Los ceros del
+        one-hot también quedan fuera; CompiledModel.predict_sparse los trata igual
+        que en la matriz densa.
+        """
+        from scipy import sparse
+
+        # Columnas en orden de posición para que cada fila quede con índices ordenados
+        slots = sorted(
+            [(offset, True, col, mapping, fill) for col, offset, mapping, fill in self.categorical]
+            + [(pos, False, col, None, fill) for col, pos, fill in self.numeric],
+            key=lambda slot: slot[0]
+        )
+        # array.array crece sin reservar el peor caso y se pasa a NumPy sin copiar
+        indptr = array('q', [0])
+        indices = array('i')
+        data = array('f')
+        for row in rows:
+            for start, is_categorical, col, mapping, fill in slots:
+                value = row[col]
+                if is_categorical:
+                    if fill is not None and _is_nan(value):
+                        value = fill
+                    try:
+                        pos = mapping.get(value)
+                    except TypeError:
+                        raise ValueError(f"Valor inválido para {col}: {value!r}")
+                    if pos is not None:
+                        indices.append(start + pos)
+                        data.append(1.0)
+                    continue
+                if _is_missing(value):
+                    if fill is None:
+                        continue
+                    value = fill
+                try:
+                    data.append(float(value))
+                except (TypeError, ValueError):
+                    raise ValueError(f"Valor numérico inválido para {col}: {value!r}")
+                indices.append(start)
+            indptr.append(len(indices))
+        return sparse.csr_matrix(
+            (np.frombuffer(data, dtype=np.float32), np.frombuffer(indices, dtype=np.int32),
+             np.frombuffer(indptr, dtype=np.int64)),
+            shape=(len(rows), self.n_features)
+        )
+
+
+class CompiledModel:
+    """
+    Encoder + árboles extraídos de un pipeline ajustado. Los árboles se evalúan
+    con el booster de XGBoost o, si hay un TreeEnsemble, con NumPy puro.
+    """
+
+    def __init__(self, model_type, encoder, booster, inverse_func=None, iteration_range=(0, 0),
+                 trees=None):
+        self.model_type = model_type
+        self.encoder = encoder
+        self.booster = booster
+        self.inverse_func = inverse_func
+        self.iteration_range = tuple(iteration_range)
+        self.trees = trees
+        self.sparse_booster = None
+
+    @property
+    def engine(self):
+        return 'numpy' if self.trees is not None else 'xgboost'
+
+    def use_numpy_trees(self):
+        """Aplana el booster para evaluarlo con NumPy en lugar de XGBoost"""
+        from .trees import TreeEnsemble
+
+        if self.trees is None:
+            self.trees = TreeEnsemble.from_booster(self.booster, self.iteration_range)
+        return self
+
+    def use_sparse_booster(self):
+        """
+        Prepara una copia del booster para matrices CSR. En CSR un cero ausente
+        cuenta como faltante y XGBoost lo manda por la rama por defecto, que en
+        los splits del one-hot no siempre es la del 0 (el modelo nunca vio
+        faltantes ahí). En la copia la rama por defecto de esos splits es la que
+        toma el 0, así que ausente y 0 dan la misma predicción que en denso.
+        """
+        import json
+
+        import xgboost as xgb
+
+        if self.booster is None or self.sparse_booster is not None:
+            return self
+        onehot = np.zeros(self.encoder.n_features, dtype=bool)
+        onehot[self.encoder.onehot_positions] = True
+        model = json.loads(self.booster.save_raw('json'))
+        for tree in model['learner']['gradient_booster']['model']['trees']:
+            left = np.asarray(tree['left_children'])
+            split = np.asarray(tree['split_indices'])
+            # El 0 va a la izquierda si 0 < umbral (XGBoost compara x < umbral)
+            nodes = np.flatnonzero((left != -1) & onehot[split])
+            if len(nodes):
+                default_left = np.asarray(tree['default_left'], dtype=np.int64)
+                conditions = np.asarray(tree['split_conditions'], dtype=np.float64)
+                default_left[nodes] = conditions[nodes] > 0.0
+                tree['default_left'] = default_left.tolist()
+        booster = xgb.Booster()
+        booster.load_model(bytearray(json.dumps(model).encode('utf-8')))
+        self.sparse_booster = booster
+        return self
+
+    @classmethod
+    def from_pipeline(cls, model_type, pipeline):
+        from sklearn.compose import TransformedTargetRegressor
+
+        encoder = FeatureEncoder.from_pipeline(pipeline)
+
+        estimator = pipeline.steps[-1][1]
+        inverse_func = None
+        if isinstance(estimator, TransformedTargetRegressor):
+            if estimator.inverse_func is not None and estimator.inverse_func is not np.expm1:
+                raise TypeError("Solo se soporta expm1 como transformación inversa")
+            inverse_func = estimator.inverse_func
+            estimator = estimator.regressor_
+
+        # get_booster lanza NotFittedError si el modelo no fue entrenado
+        booster = estimator.get_booster()
+        best_iteration = booster.attr('best_iteration')
+        iteration_range = (0, int(best_iteration) + 1) if best_iteration is not None else (0, 0)
+        return cls(model_type, encoder, booster, inverse_func, iteration_range)
+
+    def to_spec(self):
+        return {
+            'format_version': 1,
+            'model_type': self.model_type,
+            'inverse_func': 'expm1' if self.inverse_func is np.expm1 else None,
+            'iteration_range': list(self.iteration_range),
+            'encoder': self.encoder.to_spec(),
+        }
+
+    def save(self, spec_path, booster_path, trees_path=None):
+        """
+        Exporta el preprocesamiento a JSON, el booster al formato nativo de XGBoost
+        y, si se indica trees_path, los árboles aplanados a .npz
+        """
+        import json
+
+        with open(spec_path, 'w', encoding='utf-8') as f:
+            json.dump(self.to_spec(), f, ensure_ascii=False, indent=1)
+        self.booster.save_model(booster_path)
+        if trees_path is not None:
+            from .trees import TreeEnsemble
+
+            trees = self.trees or TreeEnsemble.from_booster(self.booster, self.iteration_range)
+            trees.save(trees_path)
+
+    @classmethod
+    def load(cls, spec_path, booster_path=None, trees_path=None):
+        """
+        Carga un modelo exportado con save() sin sklearn ni pickle.
+        Con solo trees_path tampoco se importa xgboost.
+        """
+        import json
+
+        with open(spec_path, encoding='utf-8') as f:
+            spec = json.load(f)
+        if spec.get('format_version') != 1:
+            raise ValueError(f"Versión de especificación no soportada: {spec.get('format_version')}")
+        booster = None
+        if booster_path is not None:
+            import xgboost as xgb
+
+            booster = xgb.Booster(model_file=booster_path)
+        trees = None
+        if trees_path is not None:
+            from .trees import TreeEnsemble
+
+            trees = TreeEnsemble.load(trees_path)
+        if booster is None and trees is None:
+            raise ValueError("Se requiere booster_path o trees_path")
+        inverse_func = np.expm1 if spec['inverse_func'] == 'expm1' else None
+        return cls(spec['model_type'], FeatureEncoder.from_spec(spec['encoder']),
+                   booster, inverse_func, spec['iteration_range'], trees)
+
+    def predict_matrix(self, X):
+        if self.trees is not None:
+            values = self.trees.predict(X)
+        else:
+            values = self.booster.inplace_predict(
+                X, iteration_range=self.iteration_range, missing=np.nan, validate_features=False
+            )
+        if self.inverse_func is not None:
+            values = self.inverse_func(values)
+        return values
+
+    def predict_sparse(self, X):
+        """Predice una matriz CSR de encode_sparse con el booster de use_sparse_booster"""
+        values = self.sparse_booster.inplace_predict(
+            X, iteration_range=self.iteration_range, missing=np.nan, validate_features=False
+        )
+        if self.inverse_func is not None:
+            values = self.inverse_func(values)
+        return values
+
+    def predict_one(self, data):
+        """Valida, codifica y predice una sola casa"""
+        return float(self.predict_matrix(self.encoder.encode(data))[0])
+
+    def predict_many(self, rows):
+        """Predice filas ya validadas con una sola llamada al booster"""
+        return self.predict_matrix(self.encoder.encode_many(rows))
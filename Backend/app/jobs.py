@@ -0,0 +1,348 @@
+"""
+Trabajos de predicción asíncronos para lotes grandes.
+
+Un trabajo recibe un archivo JSON Lines (una casa por línea) o CSV, se guarda
+en disco y se valúa por bloques en un pool local de hilos con los modelos ya
+cargados. Cada trabajo vive en su propia carpeta:
+
+    meta.json      estado, progreso y desplazamientos de cada bloque de resultados
+    input.jsonl / input.csv
+    results.jsonl  un resultado por fila, en orden
+    cancel         existe si se pidió cancelar
+
+Como todo está en disco, cualquier proceso (p. ej. otro worker de Gunicorn)
+puede consultar el estado, paginar los resultados o pedir la cancelación; el
+trabajo corre en el proceso que lo recibió y revisa la cancelación entre bloques.
+Ese proceso renueva heartbeat_at en meta.json cada heartbeat_interval segundos
+mientras el trabajo está en cola o corriendo; si el latido tiene más de
+heartbeat_timeout segundos el trabajo quedó huérfano (el proceso terminó) y se
+marca como fallido. No depende del pid, que no sirve entre contenedores o
+máquinas que comparten la carpeta ni cuando el sistema lo reutiliza.
+"""
+import json
+import os
+import re
+import shutil
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from .metrics import metrics
+
+INPUT_FORMATS = ('jsonl', 'csv')
+ACTIVE_STATES = ('queued', 'running')
+FINAL_STATES = ('completed', 'failed', 'cancelled')
+
+_JOB_ID = re.compile(r'^[0-9a-f]{32}$')
+
+
+class JobQueueFull(Exception):
+    """Se alcanzó el máximo de trabajos pendientes en este proceso"""
+
+
+class JobQueue:
+    """
+    score_rows(rows, model) recibe una lista de casas y devuelve un resultado
+    por fila con 'status', 'predictions' y 'errors' (como AIService.predict_batch).
+    """
+
+    def __init__(self, directory, score_rows, workers=1, max_pending=8, chunk_size=1000,
+                 max_rows=1_000_000, heartbeat_interval=10.0, heartbeat_timeout=60.0):
+        self.directory = directory
+        self.score_rows = score_rows
+        self.workers = max(1, int(workers))
+        self.max_pending = max(1, int(max_pending))
+        self.chunk_size = max(1, int(chunk_size))
+        self.max_rows = int(max_rows)
+        self.heartbeat_interval = float(heartbeat_interval)
+        self.heartbeat_timeout = float(heartbeat_timeout)
+        self._executor = None
+        self._heartbeat = None
+        self._lock = threading.Lock()
+        self._pending = 0
+        # Último meta guardado de cada trabajo de este proceso en cola o corriendo;
+        # el hilo de latido lo reescribe con heartbeat_at al día
+        self._owned = {}
+        self._meta_lock = threading.Lock()
+
+    # Almacenamiento
+
+    def _path(self, job_id, name=''):
+        if not _JOB_ID.match(job_id or ''):
+            raise KeyError(job_id)
+        return os.path.join(self.directory, job_id, name)
+
+    def _write_meta(self, job_id, meta):
+        # Escritura atómica: quien lee nunca ve un meta.json a medias
+        path = self._path(job_id, 'meta.json')
+        with open(path + '.tmp', 'w', encoding='utf-8') as f:
+            json.dump(meta, f)
+        os.replace(path + '.tmp', path)
+
+    def _save(self, job_id, meta):
+        """Guarda el meta de un trabajo de este proceso con el latido al día"""
+        with self._meta_lock:
+            meta['heartbeat_at'] = time.time()
+            self._write_meta(job_id, meta)
+            if meta['status'] in ACTIVE_STATES:
+                self._owned[job_id] = json.loads(json.dumps(meta))
+            else:
+                self._owned.pop(job_id, None)
+
+    def _beat(self):
+        with self._meta_lock:
+            now = time.time()
+            for job_id, meta in self._owned.items():
+                meta['heartbeat_at'] = now
+                try:
+                    self._write_meta(job_id, meta)
+                except OSError as e:
+                    print(f"No se pudo renovar el latido del trabajo {job_id}: {e}")
+
+    def _heartbeat_loop(self):
+        while True:
+            time.sleep(self.heartbeat_interval)
+            self._beat()
+
+    def _read_meta(self, job_id):
+        try:
+            with open(self._path(job_id, 'meta.json'), encoding='utf-8') as f:
+                return json.load(f)
+        except (KeyError, FileNotFoundError):
+            return None
+
+    # API
+
+    def submit(self, source, input_format, model):
+        """
+        Guarda el archivo (un objeto con read() o con save(path), como los de
+        request.files) y encola el trabajo. Devuelve el estado inicial.
+        """
+        if input_format not in INPUT_FORMATS:
+            raise ValueError(f"Formato inválido: usa {' o '.join(INPUT_FORMATS)}")
+        with self._lock:
+            if self._pending >= self.max_pending:
+                raise JobQueueFull(f"Máximo {self.max_pending} trabajos pendientes")
+            self._pending += 1
+
+        try:
+            job_id = uuid.uuid4().hex
+            os.makedirs(self._path(job_id))
+            input_path = self._path(job_id, f'input.{input_format}')
+            if hasattr(source, 'save'):
+                source.save(input_path)
+            else:
+                with open(input_path, 'wb') as f:
+                    shutil.copyfileobj(source, f, 1024 * 1024)
+            meta = {
+                'job_id': job_id,
+                'status': 'queued',
+                'model': model,
+                'format': input_format,
+                'created_at': time.time(),
+                'started_at': None,
+                'finished_at': None,
+                'input_bytes': os.path.getsize(input_path),
+                'rows_total': None,
+                'rows_processed': 0,
+                'success_count': 0,
+                'error_count': 0,
+                'error': None,
+                'pid': os.getpid(),
+                'heartbeat_at': None,
+                # [fila inicial, byte inicial] de cada bloque de results.jsonl
+                'chunks': [],
+            }
+            self._save(job_id, meta)
+            self._get_executor().submit(self._run, job_id)
+        except BaseException:
+            with self._lock:
+                self._pending -= 1
+            raise
+        metrics.inc('ai_jobs_total', status='queued')
+        return self._public(meta)
+
+    def get(self, job_id):
+        meta = self._read_meta(job_id)
+        if meta is None:
+            return None
+        if meta['status'] in ACTIVE_STATES and self._orphaned(meta):
+            # El proceso que corría el trabajo terminó (reinicio o caída)
+            meta.update(status='failed', error='El proceso que ejecutaba el trabajo terminó',
+                        finished_at=time.time())
+            self._write_meta(job_id, meta)
+        return self._public(meta)
+
+    def _orphaned(self, meta):
+        if meta.get('job_id') in self._owned:
+            return False
+        last = meta.get('heartbeat_at') or meta['created_at']
+        return time.time() - last > self.heartbeat_timeout
+
+    def list(self, limit=50):
+        jobs = []
+        if os.path.isdir(self.directory):
+            for job_id in os.listdir(self.directory):
+                meta = self.get(job_id) if _JOB_ID.match(job_id) else None
+                if meta is not None:
+                    jobs.append(meta)
+        jobs.sort(key=lambda meta: meta['created_at'], reverse=True)
+        return jobs[:limit]
+
+    def cancel(self, job_id):
+        """Pide cancelar; el trabajo se detiene antes de su siguiente bloque"""
+        meta = self.get(job_id)
+        if meta is None:
+            return None
+        if meta['status'] in ACTIVE_STATES:
+            open(self._path(job_id, 'cancel'), 'w').close()
+            meta['cancel_requested'] = True
+        return meta
+
+    def results(self, job_id, offset=0, limit=None):
+        """
+        Iterador de las líneas JSON de los resultados desde la fila offset (hasta
+        limit filas), o None si el trabajo no existe. Con el desplazamiento de
+        cada bloque se salta directo al bloque que contiene offset.
+        """
+        meta = self._read_meta(job_id)
+        if meta is None:
+            return None
+        start_row, start_byte = 0, 0
+        for chunk_row, chunk_byte in meta['chunks']:
+            if chunk_row > offset:
+                break
+            start_row, start_byte = chunk_row, chunk_byte
+        # Solo filas de bloques ya registrados: el bloque en curso puede estar a medias
+        end = meta['rows_processed'] if limit is None else min(meta['rows_processed'], offset + limit)
+        return self._read_results(self._path(job_id, 'results.jsonl'), start_row, start_byte, offset, end)
+
+    @staticmethod
+    def _read_results(path, row, start_byte, offset, end):
+        if row >= end:
+            return
+        with open(path, 'rb') as f:
+            f.seek(start_byte)
+            for line in f:
+                if row >= end:
+                    break
+                if row >= offset:
+                    yield line
+                row += 1
+
+    # Ejecución
+
+    def _get_executor(self):
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(max_workers=self.workers,
+                                                        thread_name_prefix='ai-jobs')
+                    self._heartbeat = threading.Thread(target=self._heartbeat_loop,
+                                                       name='ai-jobs-heartbeat', daemon=True)
+                    self._heartbeat.start()
+        return self._executor
+
+    def _cancelled(self, job_id):
+        return os.path.exists(self._path(job_id, 'cancel'))
+
+    def _run(self, job_id):
+        meta = self._read_meta(job_id)
+        try:
+            if self._cancelled(job_id):
+                meta['status'] = 'cancelled'
+                return
+            meta.update(status='running', started_at=time.time(),
+                        rows_total=self._count_rows(job_id, meta['format']))
+            self._save(job_id, meta)
+
+            with open(self._path(job_id, 'results.jsonl'), 'wb') as out:
+                for rows, row_errors in self._read_chunks(job_id, meta['format']):
+                    if self._cancelled(job_id):
+                        meta['status'] = 'cancelled'
+                        return
+                    if meta['rows_processed'] + len(rows) > self.max_rows:
+                        raise ValueError(f"Máximo {self.max_rows} filas por trabajo")
+                    self._write_chunk(out, meta, rows, row_errors)
+                    self._save(job_id, meta)
+            meta['status'] = 'completed'
+        except Exception as e:
+            print(f"Error en el trabajo {job_id}: {e}")
+            meta.update(status='failed', error=str(e))
+        finally:
+            meta['finished_at'] = time.time()
+            self._save(job_id, meta)
+            with self._lock:
+                self._pending -= 1
+            metrics.inc('ai_jobs_total', status=meta['status'])
+
+    def _write_chunk(self, out, meta, rows, row_errors):
+        first = meta['rows_processed']
+        scored = self.score_rows([row if row is not None else {} for row in rows], meta['model'])
+        meta['chunks'].append([first, out.tell()])
+        for i, (row, result) in enumerate(zip(rows, scored)):
+            line = {'row': first + i}
+            if isinstance(row, dict) and row.get('Id') is not None:
+                line['id'] = row['Id']
+            if i in row_errors:
+                line.update(status='error', predictions={}, errors={'input': row_errors[i]})
+            else:
+                line.update(status=result['status'], predictions=result['predictions'],
+                            errors=result['errors'])
+            meta['success_count' if line['status'] == 'success' else 'error_count'] += 1
+            out.write(json.dumps(line, ensure_ascii=False).encode('utf-8') + b'\n')
+        out.flush()
+        meta['rows_processed'] = first + len(rows)
+
+    def _count_rows(self, job_id, input_format):
+        """Filas del archivo (líneas no vacías, sin el encabezado del CSV) para el progreso"""
+        count = 0
+        with open(self._path(job_id, f'input.{input_format}'), 'rb') as f:
+            for line in f:
+                if line.strip():
+                    count += 1
+        return max(0, count - 1) if input_format == 'csv' else count
+
+    def _read_chunks(self, job_id, input_format):
+        """Genera (filas, {posición: error de lectura}) por bloque de chunk_size"""
+        path = self._path(job_id, f'input.{input_format}')
+        if input_format == 'csv':
+            import pandas as pd
+
+            for chunk in pd.read_csv(path, chunksize=self.chunk_size):
+                # Celdas vacías como None: el modelo las trata como faltantes
+                chunk = chunk.astype(object).where(chunk.notna(), None)
+                yield chunk.to_dict('records'), {}
+            return
+
+        rows, errors = [], {}
+        with open(path, encoding='utf-8') as f:
+            for number, line in enumerate(f, start=1):
+                if not line.strip():
+                    continue
+                try:
+                    rows.append(json.loads(line))
+                except ValueError:
+                    errors[len(rows)] = f"JSON inválido en la línea {number}"
+                    rows.append(None)
+                if len(rows) == self.chunk_size:
+                    yield rows, errors
+                    rows, errors = [], {}
+        if rows:
+            yield rows, errors
+
+    @staticmethod
+    def _public(meta):
+        """Estado para la API (sin los desplazamientos internos)"""
+        public = {k: v for k, v in meta.items() if k not in ('chunks', 'pid', 'heartbeat_at')}
+        total = meta['rows_total']
+        if meta['status'] == 'completed':
+            public['progress'] = 1.0
+        elif total:
+            # En CSV con saltos de línea dentro de comillas el conteo es aproximado
+            public['progress'] = round(min(1.0, meta['rows_processed'] / total), 4)
+        else:
+            public['progress'] = 0.0
+        return public
+
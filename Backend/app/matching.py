@@ -0,0 +1,158 @@
+"""
+Criterios de coincidencia entre client_preferences y vendor_houses.
+
+Cada criterio se declara una sola vez y se evalúa igual en SQL (respaldo) y
+sobre el índice en memoria (HouseIndex). Una casa coincide si cumple
+cualquiera de los criterios activos de las preferencias; en el modo por
+ranking su puntaje es la suma de los pesos de los criterios que cumple.
+"""
+import heapq
+from collections import namedtuple
+
+# kind: 'range' (min_attr/max_attr), 'equals' (attr) o 'truthy' (attr booleano)
+Criterion = namedtuple('Criterion', ['name', 'kind', 'column', 'attrs', 'weight'], defaults=(1.0,))
+
+
+def _range(column, weight=1.0):
+    return Criterion(column, 'range', column, (f'min_{column}', f'max_{column}'), weight)
+
+
+def _equals(column, weight=1.0):
+    return Criterion(column, 'equals', column, (f'preferred_{column}',), weight)
+
+
+# Precio, ubicación y tamaño pesan más que los acabados
+MATCH_CRITERIA = (
+    [_range('sale_price', 3.0), _equals('neighborhood', 2.0), _equals('ms_zoning')]
+    + [_equals(column) for column in (
+        'bldg_type', 'house_style', 'roof_style', 'exterior1st', 'exterior2nd', 'foundation',
+        'condition1', 'functional', 'fireplace_qu', 'garage_type', 'garage_finish',
+        'garage_qual', 'garage_cond', 'paved_drive', 'pool_qc', 'fence', 'misc_feature',
+        'bsmt_qual', 'bsmt_cond', 'bsmt_exposure', 'bsmt_fin_type1', 'bsmt_fin_type2',
+        'heating_qc', 'electrical',
+    )]
+    + [Criterion('central_air', 'truthy', 'central_air', ('central_air_required',))]
+    + [_range('bedroom_abv_gr', 1.5), _range('full_bath'), _range('gr_liv_area', 1.5),
+       _range('total_bath'), _range('total_sf', 1.5)]
+    + [_range(column) for column in (
+        'remod_age', 'house_age', 'garage_score', 'total_porch_sf', 'rooms_plus_bath_eq',
+    )]
+)
+
+CRITERIA_BY_NAME = {criterion.name: criterion for criterion in MATCH_CRITERIA}
+RANGE_COLUMNS = tuple(c.column for c in MATCH_CRITERIA if c.kind == 'range')
+CATEGORICAL_COLUMNS = tuple(c.column for c in MATCH_CRITERIA if c.kind != 'range')
+
+# Valores de vendor_houses.central_air (VARCHAR) que cuentan como "tiene aire"
+TRUTHY_STRINGS = frozenset({"Y", "Yes", "1", "True", "T", "SI", "SÍ", "ON"})
+
+
+def fold(value):
+    """
+    Texto normalizado como lo compara MySQL con la collation por defecto de la
+    base (*_ci, PAD SPACE): sin distinguir mayúsculas ni espacios al final
+    """
+    return value.casefold().rstrip(' ') if isinstance(value, str) else value
+
+
+TRUTHY_FOLDED = frozenset(fold(text) for text in TRUTHY_STRINGS)
+
+
+def active_criteria(prefs):
+    """
+    [(criterio, valor)] de las preferencias: (mínimo, máximo) con None si falta
+    un extremo para los rangos, el texto para 'equals' y True para 'truthy'
+    """
+    active = []
+    for criterion in MATCH_CRITERIA:
+        if criterion.kind == 'range':
+            low, high = (getattr(prefs, attr) for attr in criterion.attrs)
+            if low is not None or high is not None:
+                active.append((criterion, (
+                    float(low) if low is not None else None,
+                    float(high) if high is not None else None,
+                )))
+        elif criterion.kind == 'equals':
+            value = getattr(prefs, criterion.attrs[0])
+            if value:
+                active.append((criterion, value))
+        elif getattr(prefs, criterion.attrs[0]):
+            active.append((criterion, True))
+    return active
+
+
+def criteria_shape(criteria):
+    """
+    Forma de los criterios activos: cuáles son y qué extremos de cada rango
+    tienen valor. Las preferencias con la misma forma comparten la sentencia
+    SQL (sql_filter); los valores viajan como parámetros (criteria_params).
+    """
+    return tuple(
+        (criterion.name, (value[0] is not None, value[1] is not None) if criterion.kind == 'range' else None)
+        for criterion, value in criteria
+    )
+
+
+def criteria_params(criteria):
+    """Valores de los parámetros de sql_filter para estos criterios"""
+    params = {}
+    for criterion, value in criteria:
+        if criterion.kind == 'range':
+            low, high = value
+            if low is not None:
+                params[f'{criterion.name}_low'] = low
+            if high is not None:
+                params[f'{criterion.name}_high'] = high
+        elif criterion.kind == 'equals':
+            params[f'{criterion.name}_value'] = value
+    return params
+
+
+def sql_filter(model, shape):
+    """
+    OR de SQLAlchemy de los criterios de una forma, con parámetros con nombre
+    (bindparam) en lugar de valores: se construye una vez por forma.
+    """
+    from sqlalchemy import and_, bindparam, or_
+
+    clauses = []
+    for name, ends in shape:
+        criterion = CRITERIA_BY_NAME[name]
+        column = getattr(model, criterion.column)
+        if criterion.kind == 'range':
+            has_low, has_high = ends
+            bounds = []
+            if has_low:
+                bounds.append(column >= bindparam(f'{name}_low'))
+            if has_high:
+                bounds.append(column <= bindparam(f'{name}_high'))
+            clauses.append(and_(*bounds) if len(bounds) > 1 else bounds[0])
+        elif criterion.kind == 'equals':
+            clauses.append(column == bindparam(f'{name}_value'))
+        else:
+            clauses.append(column.in_(TRUTHY_STRINGS))
+    return or_(*clauses)
+
+
+def row_matches(criterion, value, cell):
+    """El mismo criterio evaluado sobre el valor de una casa (None es NULL)"""
+    if cell is None:
+        return False
+    if criterion.kind == 'range':
+        low, high = value
+        return (low is None or cell >= low) and (high is None or cell <= high)
+    if criterion.kind == 'equals':
+        return fold(cell) == fold(value)
+    return fold(cell) in TRUTHY_FOLDED
+
+
+def top_k(scored, limit):
+    """
+    Los limit mejores (house_id, puntaje, criterios) de un iterable, con un heap
+    acotado: mayor puntaje primero y, a igual puntaje, menor house_id.
+    limit=None los ordena todos
+    """
+    key = lambda item: (-item[1], item[0])
+    if limit is None:
+        return sorted(scored, key=key)
+    return heapq.nsmallest(limit, scored, key=key)
@@ -0,0 +1,214 @@
+"""
+Métricas de inferencia en memoria: contadores e histogramas con buckets fijos.
+
+Registrar una observación es un bisect y dos sumas bajo un lock, así que se
+puede dejar activo en producción. Se exponen como resumen (p50/p95/p99) en
+/api/ai/models/status y en formato de texto de Prometheus en /metrics.
+"""
+import bisect
+import threading
+
+# Buckets de latencia en segundos (50 µs a 10 s)
+LATENCY_BUCKETS = (
+    0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005,
+    0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+)
+# Buckets de tamaño de lote (filas)
+BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256, 512, 1024, 4096, 10000)
+
+METRIC_HELP = {
+    'ai_stage_duration_seconds': ('histogram', 'Duración de cada etapa de inferencia por modelo'),
+    'ai_request_duration_seconds': ('histogram', 'Duración total de las peticiones /api/ai/*'),
+    'ai_batch_size': ('histogram', 'Filas por llamada al modelo'),
+    'ai_microbatch_queue_delay_seconds': ('histogram', 'Tiempo de cada fila en la cola del micro-batcher'),
+    'ai_requests_total': ('counter', 'Peticiones /api/ai/* por endpoint y código HTTP'),
+    'ai_predictions_total': ('counter', 'Predicciones por modelo y origen (model o cache)'),
+    'ai_prediction_errors_total': ('counter', 'Errores de predicción por modelo'),
+}
+
+
+class Histogram:
+
+    def __init__(self, buckets):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        i = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[i] += 1
+            self.sum += value
+            self.count += 1
+
+    def snapshot(self):
+        with self._lock:
+            return list(self.counts), self.sum, self.count
+
+    def percentile(self, q, snapshot=None):
+        """Percentil estimado interpolando dentro del bucket (como histogram_quantile)"""
+        counts, _, count = snapshot or self.snapshot()
+        if count == 0:
+            return None
+        rank = q * count
+        cumulative = 0
+        for i, c in enumerate(counts):
+            if cumulative + c >= rank and c > 0:
+                lower = self.buckets[i - 1] if i > 0 else 0.0
+                if i == len(self.buckets):
+                    return self.buckets[-1]
+                upper = self.buckets[i]
+                return lower + (upper - lower) * (rank - cumulative) / c
+            cumulative += c
+        return self.buckets[-1]
+
+
+class Metrics:
+
+    def __init__(self, enabled=True):
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._histograms = {}
+        self._counters = {}
+
+    def _histogram(self, name, labels, buckets):
+        key = (name, labels)
+        histogram = self._histograms.get(key)
+        if histogram is None:
+            with self._lock:
+                histogram = self._histograms.setdefault(key, Histogram(buckets))
+        return histogram
+
+    def observe(self, name, value, buckets=LATENCY_BUCKETS, **labels):
+        if self.enabled:
+            self._histogram(name, tuple(sorted(labels.items())), buckets).observe(value)
+
+    def observe_stage(self, model, stage, seconds):
+        if self.enabled:
+            self._histogram('ai_stage_duration_seconds', (('model', model), ('stage', stage)),
+                            LATENCY_BUCKETS).observe(seconds)
+
+    def observe_batch(self, model, size, path):
+        """path: 'batch' (predict_batch / backfill) o 'microbatch' (MicroBatcher)"""
+        if self.enabled:
+            self._histogram('ai_batch_size', (('model', model), ('path', path)),
+                            BATCH_SIZE_BUCKETS).observe(size)
+
+    def observe_queue_delay(self, model, seconds):
+        """Tiempo que una fila esperó en la cola del MicroBatcher hasta su lote"""
+        if self.enabled:
+            self._histogram('ai_microbatch_queue_delay_seconds', (('model', model),),
+                            LATENCY_BUCKETS).observe(seconds)
+
+    def inc(self, name, amount=1, **labels):
+        if not self.enabled:
+            return
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+
+    def reset(self):
+        with self._lock:
+            self._histograms.clear()
+            self._counters.clear()
+
+    def summary(self):
+        """Resumen para JSON: percentiles en ms por etapa y contadores"""
+        stages = {}
+        batch_sizes = {}
+        requests = {}
+        for (name, labels), histogram in list(self._histograms.items()):
+            labels = dict(labels)
+            snapshot = histogram.snapshot()
+            if name == 'ai_batch_size':
+                batch_sizes[f"{labels['model']}:{labels['path']}"] = {
+                    'count': snapshot[2],
+                    'avg': round(snapshot[1] / snapshot[2], 2) if snapshot[2] else 0.0,
+                    'p50': histogram.percentile(0.5, snapshot),
+                    'p95': histogram.percentile(0.95, snapshot),
+                    'max_bucket': _max_bucket(histogram, snapshot),
+                }
+                continue
+            entry = _latency_summary(histogram, snapshot)
+            if name == 'ai_stage_duration_seconds':
+                stages.setdefault(labels['model'], {})[labels['stage']] = entry
+            elif name == 'ai_request_duration_seconds':
+                requests[labels['endpoint']] = entry
+
+        counters = {}
+        for (name, labels), value in list(self._counters.items()):
+            label = ','.join(f'{k}={v}' for k, v in labels)
+            counters.setdefault(name, {})[label] = value
+        return {
+            'enabled': self.enabled,
+            'stages_ms': stages,
+            'requests_ms': requests,
+            'batch_size': batch_sizes,
+            'counters': counters,
+        }
+
+    def render_prometheus(self, extra_lines=()):
+        """Texto en formato de exposición de Prometheus (version 0.0.4)"""
+        families = {}
+        for (name, labels), histogram in list(self._histograms.items()):
+            families.setdefault(name, []).append((labels, histogram))
+        for (name, labels), value in list(self._counters.items()):
+            families.setdefault(name, []).append((labels, value))
+
+        lines = []
+        for name in sorted(families):
+            kind, help_text = METRIC_HELP.get(name, ('untyped', name))
+            lines.append(f'# HELP {name} {help_text}')
+            lines.append(f'# TYPE {name} {kind}')
+            for labels, item in families[name]:
+                if isinstance(item, Histogram):
+                    counts, total, count = item.snapshot()
+                    cumulative = 0
+                    for bound, c in zip(item.buckets + ('+Inf',), counts):
+                        cumulative += c
+                        lines.append(f'{name}_bucket{_labels(labels + (("le", bound),))} {cumulative}')
+                    lines.append(f'{name}_sum{_labels(labels)} {total}')
+                    lines.append(f'{name}_count{_labels(labels)} {count}')
+                else:
+                    lines.append(f'{name}{_labels(labels)} {item}')
+        lines.extend(extra_lines)
+        return '\n'.join(lines) + '\n'
+
+
+def _latency_summary(histogram, snapshot):
+    _, total, count = snapshot
+
+    def ms(value):
+        return round(value * 1000, 3) if value is not None else None
+
+    return {
+        'count': count,
+        'avg': ms(total / count) if count else None,
+        'p50': ms(histogram.percentile(0.5, snapshot)),
+        'p95': ms(histogram.percentile(0.95, snapshot)),
+        'p99': ms(histogram.percentile(0.99, snapshot)),
+    }
+
+
+def _max_bucket(histogram, snapshot):
+    counts = snapshot[0]
+    for i in range(len(counts) - 1, -1, -1):
+        if counts[i]:
+            return histogram.buckets[i] if i < len(histogram.buckets) else '+Inf'
+    return None
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(labels):
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{k}="{_escape(v)}"' for k, v in labels) + '}'
+
+
+# Instancia compartida por AIService y las rutas
+metrics = Metrics()
@@ -1,11 +1,15 @@
 from datetime import datetime
 from . import db
+from .serialization import row_serializer
 
 # HELPERS
 
+# BIGINT on MySQL; INTEGER on SQLite, where only INTEGER PRIMARY KEY autoincrements
+BigIntPK = db.BigInteger().with_variant(db.Integer(), 'sqlite')
+
 def _to_dict_all(model):
-    """Autoserialer for all columns"""
-    return {c.name: getattr(model, c.name) for c in model.__table__.columns}
+    """Autoserialer for all columns (precompiled per model, see serialization.row_serializer)"""
+    return row_serializer(type(model))(model)
 
 # TABLES
 
@@ -14,7 +18,7 @@ class Client(db.Model):
     """Contains registered clients."""
     __tablename__ = 'clients'
 
-    client_id = db.Column(db.BigInteger, primary_key=True, autoincrement=True)
+    client_id = db.Column(BigIntPK, primary_key=True, autoincrement=True)
     email     = db.Column(db.String(255), nullable=False, unique=True)
     username  = db.Column(db.String(100), nullable=False, unique=True)
     password  = db.Column(db.String(255), nullable=False)
@@ -27,6 +31,14 @@ class Client(db.Model):
         cascade='all, delete-orphan'
     )
 
+    # 1:N with house_client_matches
+    house_matches = db.relationship(
+        'HouseClientMatch',
+        backref='client',
+        lazy=True,
+        cascade='all, delete-orphan'
+    )
+
     def to_dict(self):
         return _to_dict_all(self)
 
@@ -35,7 +47,7 @@ class Vendor(db.Model):
     """Contains registered vendors."""
     __tablename__ = 'vendors'
 
-    vendor_id = db.Column(db.BigInteger, primary_key=True, autoincrement=True)
+    vendor_id = db.Column(BigIntPK, primary_key=True, autoincrement=True)
     email     = db.Column(db.String(255), nullable=False, unique=True)
     username  = db.Column(db.String(100), nullable=False, unique=True)
     password  = db.Column(db.String(255), nullable=False)
@@ -56,7 +68,7 @@ class ClientPreferences(db.Model):
     """Contains client preferences for houuse matching"""
     __tablename__ = 'client_preferences'
 
-    preference_id = db.Column(db.BigInteger, primary_key=True, autoincrement=True)
+    preference_id = db.Column(BigIntPK, primary_key=True, autoincrement=True)
     client_id     = db.Column(
         db.BigInteger,
         db.ForeignKey('clients.client_id', ondelete='CASCADE'),
@@ -233,7 +245,17 @@ class VendorHouse(db.Model):
     """Contains house characteristics and details for sale by vendors."""
     __tablename__ = 'vendor_houses'
 
-    house_id  = db.Column(db.BigInteger, primary_key=True, autoincrement=True)
+    # Secondary indexes for the recommendation predicates and the vendor listing
+    # (see db/migrations/003_vendor_houses_indexes.sql)
+    __table_args__ = (
+        db.Index('idx_vendor_houses_status_neighborhood_price', 'status', 'neighborhood', 'sale_price'),
+        db.Index('idx_vendor_houses_status_price', 'status', 'sale_price'),
+        db.Index('idx_vendor_houses_status_bedrooms', 'status', 'bedroom_abv_gr'),
+        db.Index('idx_vendor_houses_status_living_area', 'status', 'gr_liv_area'),
+        db.Index('idx_vendor_houses_vendor_status', 'vendor_id', 'status'),
+    )
+
+    house_id  = db.Column(BigIntPK, primary_key=True, autoincrement=True)
     vendor_id = db.Column(
         db.BigInteger,
         db.ForeignKey('vendors.vendor_id', ondelete='CASCADE'),
@@ -380,5 +402,52 @@ class VendorHouse(db.Model):
     house_age = db.Column(db.Float)
     garage_score = db.Column(db.Float)
 
+    # Model valuation (filled by AIService; see backfill_predictions.py)
+    predicted_price       = db.Column(db.Float)
+    model_version         = db.Column(db.String(40))
+    scored_at             = db.Column(db.DateTime)
+    scored_features_hash  = db.Column(db.String(40))
+
+    # 1:N with house_client_matches
+    client_matches = db.relationship(
+        'HouseClientMatch',
+        backref='house',
+        lazy=True,
+        cascade='all, delete-orphan'
+    )
+
     def to_dict(self):
         return _to_dict_all(self)
+
+
+class HouseClientMatch(db.Model):
+    """Clients whose preferences accept a house, recorded when the house is created."""
+    __tablename__ = 'house_client_matches'
+
+    house_id  = db.Column(
+        db.BigInteger,
+        db.ForeignKey('vendor_houses.house_id', ondelete='CASCADE'),
+        primary_key=True
+    )
+    client_id = db.Column(
+        db.BigInteger,
+        db.ForeignKey('clients.client_id', ondelete='CASCADE'),
+        primary_key=True,
+        index=True
+    )
+    score            = db.Column(db.Float, nullable=False)
+    matched_criteria = db.Column(db.String(1000))
+    matched_at       = db.Column(db.DateTime)
+
+    def to_dict(self):
+        return _to_dict_all(self)
+
+
+class CacheVersion(db.Model):
+    """Shared version counters that invalidate every worker's in-memory caches."""
+    __tablename__ = 'cache_versions'
+
+    # 'inventory' or 'preferences' (scope_id 0), or 'client' (scope_id = client_id)
+    scope    = db.Column(db.String(20), primary_key=True)
+    scope_id = db.Column(db.BigInteger, primary_key=True, autoincrement=False)
+    version  = db.Column(db.BigInteger, nullable=False, default=0)
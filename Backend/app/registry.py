@@ -0,0 +1,238 @@
+"""
+Registro de modelos con recarga en caliente.
+
+Cada carga produce un ModelSet inmutable (un ModelHandle versionado por modelo).
+El registro lo valida con una predicción de prueba y lo publica con una sola
+asignación: las peticiones toman una referencia al empezar y terminan con esa
+versión aunque en medio se publique otra.
+"""
+import os
+import threading
+import time
+from dataclasses import dataclass, field
+from types import MappingProxyType
+
+# Extensiones de los artefactos que se vigilan en el directorio de recursos
+ARTIFACT_EXTENSIONS = ('.pkl', '.json', '.ubj', '.npz')
+
+
+@dataclass(frozen=True)
+class ModelHandle:
+    """Un modelo cargado: pipeline y/o modelo compilado, con su versión"""
+    model_type: str
+    version: str = None
+    pipeline: object = None
+    compiled: object = None
+    paths: tuple = ()
+    batcher: object = None
+    healthy: bool = True
+    error: str = None
+
+    @property
+    def available(self):
+        return self.pipeline is not None or self.compiled is not None
+
+    @property
+    def format(self):
+        if self.pipeline is not None:
+            return 'pickle'
+        return 'native' if self.compiled is not None else None
+
+    @property
+    def engine(self):
+        return self.compiled.engine if self.compiled is not None else None
+
+
+@dataclass(frozen=True)
+class ModelSet:
+    """Conjunto de modelos publicado de forma atómica por el registro"""
+    version: str
+    resources_dir: str
+    fingerprint: tuple
+    models: MappingProxyType
+    loaded_at: float = field(default_factory=time.time)
+
+    def get(self, model_type):
+        handle = self.models.get(model_type)
+        return handle if handle is not None else ModelHandle(model_type)
+
+    def close(self):
+        """Cierra los micro-batchers de un conjunto reemplazado o rechazado"""
+        for handle in self.models.values():
+            if handle.batcher is not None:
+                handle.batcher.close()
+
+
+def directory_fingerprint(resources_dir):
+    """(nombre, tamaño, mtime) de los artefactos; cambia cuando se reemplaza un modelo"""
+    try:
+        entries = list(os.scandir(resources_dir))
+    except FileNotFoundError:
+        return ()
+    fingerprint = []
+    for entry in entries:
+        if entry.is_file() and entry.name.endswith(ARTIFACT_EXTENSIONS):
+            stat = entry.stat()
+            fingerprint.append((entry.name, stat.st_size, stat.st_mtime_ns))
+    return tuple(sorted(fingerprint))
+
+
+class ModelRegistry:
+    """
+    loader(resources_dir) -> ModelSet
+    validator(nuevo, actual) -> ModelSet validado; lanza ValueError para rechazarlo
+    """
+
+    def __init__(self, loader, validator=None, history_size=10):
+        self._loader = loader
+        self._validator = validator
+        self._current = None
+        # Serializa las cargas: nunca se cargan los mismos artefactos dos veces a la vez
+        self._load_lock = threading.Lock()
+        self._reload_thread = None
+        self._watcher = None
+        self._watcher_stop = threading.Event()
+        self._history = []
+        self._history_size = history_size
+        self.last_error = None
+
+    @property
+    def current(self):
+        return self._current
+
+    def ensure_loaded(self, resources_dir):
+        """Primera carga perezosa; las peticiones concurrentes esperan a la misma carga"""
+        current = self._current
+        if current is not None:
+            return current
+        with self._load_lock:
+            if self._current is None:
+                self._load_locked(resources_dir)
+            return self._current
+
+    def load(self, resources_dir):
+        """Carga, valida y publica un directorio de artefactos; lanza si se rechaza"""
+        with self._load_lock:
+            return self._load_locked(resources_dir)
+
+    def _load_locked(self, resources_dir):
+        started = time.perf_counter()
+        candidate = None
+        try:
+            candidate = self._loader(resources_dir)
+            if self._validator is not None:
+                candidate = self._validator(candidate, self._current)
+        except Exception as e:
+            if candidate is not None:
+                candidate.close()
+            self.last_error = str(e)
+            self._record(resources_dir, None, 'rejected', started, str(e))
+            raise
+        previous = self._current
+        # Publicación atómica: una sola asignación de referencia
+        self._current = candidate
+        self.last_error = None
+        self._record(resources_dir, candidate.version, 'active', started)
+        if previous is not None:
+            # Las peticiones que tomaron el conjunto anterior terminan sin la cola
+            # (MicroBatcher.submit predice en su hilo una vez cerrado)
+            previous.close()
+            print(f"Modelos actualizados: {previous.version} -> {candidate.version}")
+        return candidate
+
+    def reload_async(self, resources_dir):
+        """Recarga en segundo plano; devuelve False si ya hay una recarga en curso"""
+        if self._reload_thread is not None and self._reload_thread.is_alive():
+            return False
+
+        def run():
+            try:
+                self.load(resources_dir)
+            except Exception as e:
+                print(f"❌ Recarga de modelos rechazada: {e}")
+
+        self._reload_thread = threading.Thread(target=run, name='ai-model-reload', daemon=True)
+        self._reload_thread.start()
+        return True
+
+    def wait_for_reload(self, timeout=None):
+        if self._reload_thread is not None:
+            self._reload_thread.join(timeout)
+
+    @property
+    def reloading(self):
+        return self._reload_thread is not None and self._reload_thread.is_alive()
+
+    def _record(self, resources_dir, version, status, started, error=None):
+        for entry in self._history:
+            if entry['status'] == 'active' and status == 'active':
+                entry['status'] = 'replaced'
+        self._history.append({
+            'version': version,
+            'resources_dir': resources_dir,
+            'status': status,
+            'error': error,
+            'finished_at': time.time(),
+            'duration_ms': round((time.perf_counter() - started) * 1000, 3),
+        })
+        del self._history[:-self._history_size]
+
+    def start_watcher(self, interval=2.0):
+        """
+        Vigila el directorio del ModelSet actual y recarga cuando sus artefactos
+        cambian. Espera a que el cambio se mantenga un intervalo (copias a medias)
+        y no reintenta un mismo estado que ya fue rechazado.
+        """
+        if self._watcher is not None and self._watcher.is_alive():
+            return self._watcher
+        self._watcher_stop.clear()
+
+        def run():
+            last_seen = None
+            last_rejected = None
+            while not self._watcher_stop.wait(interval):
+                current = self._current
+                if current is None or self.reloading:
+                    continue
+                fingerprint = directory_fingerprint(current.resources_dir)
+                if fingerprint == current.fingerprint or fingerprint == last_rejected:
+                    last_seen = None
+                    continue
+                if fingerprint != last_seen:
+                    last_seen = fingerprint
+                    continue
+                try:
+                    self.load(current.resources_dir)
+                except Exception as e:
+                    last_rejected = fingerprint
+                    print(f"❌ Recarga de modelos rechazada: {e}")
+
+        self._watcher = threading.Thread(target=run, name='ai-model-watcher', daemon=True)
+        self._watcher.start()
+        return self._watcher
+
+    def stop_watcher(self):
+        self._watcher_stop.set()
+        if self._watcher is not None:
+            self._watcher.join()
+            self._watcher = None
+
+    def status(self):
+        current = self._current
+        return {
+            'version': current.version if current is not None else None,
+            'resources_dir': current.resources_dir if current is not None else None,
+            'loaded_at': current.loaded_at if current is not None else None,
+            'models': {
+                model_type: {
+                    'version': handle.version,
+                    'available': handle.available,
+                    'healthy': handle.healthy,
+                    'error': handle.error,
+                } for model_type, handle in current.models.items()
+            } if current is not None else {},
+            'reloading': self.reloading,
+            'watching': self._watcher is not None and self._watcher.is_alive(),
+            'last_error': self.last_error,
+            'history': list(self._history),
+        }
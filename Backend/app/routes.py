@@ -1,15 +1,96 @@
-from flask import Blueprint, request, jsonify
+import hmac
+import json
+import os
+import time
+
+from flask import Blueprint, Response, request, jsonify, current_app, g
 from .services import ClientService, VendorService, HouseService, PreferencesService, AIService
+from .jobs import JobQueueFull
+from .metrics import metrics
 from pprint import pprint
 
 main = Blueprint("main", __name__)
 
+# Rutas de IA que responden aunque los modelos sigan cargando
+_AI_ALWAYS_AVAILABLE = ("/api/ai/models/status",)
+
+@main.before_request
+def require_models_ready():
+    """Mientras los modelos cargan, /api/ai/* responde 503 con Retry-After"""
+    if not request.path.startswith("/api/ai/"):
+        return None
+    g.ai_started = time.perf_counter()
+    if request.path in _AI_ALWAYS_AVAILABLE:
+        return None
+    if AIService.is_ready():
+        return None
+    state = AIService.get_load_state()
+    response = jsonify({"error": "Modelos de IA no disponibles todavía", **state})
+    response.status_code = 503
+    if state["state"] != "failed":
+        response.headers["Retry-After"] = str(current_app.config.get("AI_RETRY_AFTER_SECONDS", 5))
+    return response
+
+@main.after_request
+def record_ai_request(response):
+    """Contador y latencia de cada petición /api/ai/* por endpoint"""
+    started = g.pop("ai_started", None)
+    if started is not None:
+        endpoint = (request.endpoint or "unknown").rsplit(".", 1)[-1]
+        metrics.inc("ai_requests_total", endpoint=endpoint, status=response.status_code)
+        metrics.observe("ai_request_duration_seconds", time.perf_counter() - started, endpoint=endpoint)
+    return response
+
+def _fields_arg():
+    """?fields=a,b,c como tupla de nombres, o None si no viene"""
+    fields = request.args.get("fields")
+    if not fields:
+        return None
+    return tuple(name.strip() for name in fields.split(",") if name.strip())
+
+def _ai_json(stage_model):
+    """request.get_json midiendo la etapa 'parse'"""
+    started = time.perf_counter()
+    data = request.get_json(silent=True)
+    metrics.observe_stage(stage_model, "parse", time.perf_counter() - started)
+    return data
+
+def _ai_response(stage_model, payload):
+    """jsonify midiendo la etapa 'serialize'"""
+    started = time.perf_counter()
+    response = jsonify(payload)
+    metrics.observe_stage(stage_model, "serialize", time.perf_counter() - started)
+    return response
+
+# HEALTH
+
+@main.route("/healthz", methods=["GET"])
+def healthz():
+    """Liveness: el proceso está vivo y atiende peticiones"""
+    return jsonify({"status": "ok"})
+
+@main.route("/readyz", methods=["GET"])
+def readyz():
+    """Readiness: los modelos de IA están cargados y calentados"""
+    state = AIService.get_load_state()
+    ready = AIService.is_ready()
+    return jsonify({"ready": ready, **state}), 200 if ready else 503
+
+@main.route("/metrics", methods=["GET"])
+def prometheus_metrics():
+    """Métricas de inferencia en formato de texto de Prometheus (por proceso)"""
+    return Response(AIService.metrics_text(), mimetype="text/plain; version=0.0.4")
+
 @main.route("/")
 def home():
     return jsonify({
         "message": "HouseLink API corriendo 🚀",
         "version": "1.0.0",
         "endpoints": {
+            # Health
+            "liveness": "GET /healthz",
+            "readiness": "GET /readyz",
+            "metrics": "GET /metrics",
             # Clients
             "list_clients": "GET /api/clients",
             "get_client": "GET /api/clients/<client_id>",
@@ -25,6 +106,7 @@ def home():
             # Houses
             "create_house_for_vendor": "POST /api/vendors/<vendor_id>/houses",
             "delete_house": "DELETE /api/houses/<house_id>",
+            "interested_clients": "GET /api/vendors/<vendor_id>/houses/<house_id>/interested-clients",
             # Preferences / Matching
             "create_or_update_preferences": "POST /api/clients/<client_id>/preferences",
             "create_specific_preferences": "POST /api/clients/<client_id>/preferences/specific",
@@ -34,7 +116,16 @@ def home():
             "ai_predict_complex": "POST /api/ai/predict/complex",
             "ai_predict_simple": "POST /api/ai/predict/simple",
             "ai_predict_both": "POST /api/ai/predict/both",
-            "ai_models_status": "GET /api/ai/models/status"
+            "ai_predict_batch": "POST /api/ai/predict/batch",
+            "ai_models_status": "GET /api/ai/models/status",
+            "ai_jobs_submit": "POST /api/ai/jobs",
+            "ai_jobs_list": "GET /api/ai/jobs",
+            "ai_job_status": "GET /api/ai/jobs/<job_id>",
+            "ai_job_results": "GET /api/ai/jobs/<job_id>/results",
+            "ai_job_cancel": "POST /api/ai/jobs/<job_id>/cancel",
+            # Admin (header X-Admin-Token)
+            "admin_models": "GET /api/admin/models",
+            "admin_models_reload": "POST /api/admin/models/reload"
         }
     })
 
@@ -178,12 +269,37 @@ def delete_house(house_id):
 def get_houses_by_vendor(vendor_id):
     """
     Obtener todas las casas que pertenecen a un vendor_id.
+    ?fields=title,sale_price,neighborhood devuelve solo esas columnas (y house_id).
     """
     try:
-        houses = HouseService.get_houses_by_vendor(vendor_id)
+        houses = HouseService.get_houses_by_vendor(vendor_id, fields=_fields_arg())
         if houses is None:
             return jsonify({"error": "Vendedor no encontrado"}), 404
         return jsonify(houses)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@main.route("/api/vendors/<int:vendor_id>/houses/<int:house_id>/interested-clients", methods=["GET"])
+def get_interested_clients(vendor_id, house_id):
+    """
+    Clientes cuyas preferencias aceptan la casa (registrados al crearla o al
+    cambiar sus preferencias), ordenados por puntaje, y al final los clientes
+    sin criterios: ?limit=20&offset=0.
+    """
+    try:
+        try:
+            limit = request.args.get("limit", type=int) or current_app.config.get("RECOMMENDATIONS_DEFAULT_LIMIT", 20)
+            offset = max(0, int(request.args.get("offset", 0)))
+        except ValueError:
+            return jsonify({"error": "limit y offset deben ser enteros"}), 400
+        limit = max(1, min(limit, current_app.config.get("RECOMMENDATIONS_MAX_LIMIT", 100)))
+
+        result = HouseService.get_interested_clients(vendor_id, house_id, limit, offset)
+        if result is None:
+            return jsonify({"error": "Casa no encontrada para este vendedor"}), 404
+        return jsonify(result)
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
@@ -372,12 +488,29 @@ def delete_preferences(client_id):
 
 @main.route("/api/clients/<int:client_id>/recommendations", methods=["GET"])
 def get_recommendations(client_id):
+    """
+    Todas las casas que cumplen algún criterio, sin puntaje (mode=all, lo que
+    espera el frontend). ?mode=ranked devuelve una página de casas ordenadas por
+    puntaje: ?limit=20&offset=0 (máximo RECOMMENDATIONS_MAX_LIMIT).
+    ?fields=title,sale_price limita las columnas de cada casa (y house_id).
+    """
     try:
-        result = PreferencesService.find_matching_houses(client_id)
+        mode = request.args.get("mode", "all")
+        try:
+            limit = request.args.get("limit", type=int) or current_app.config.get("RECOMMENDATIONS_DEFAULT_LIMIT", 20)
+            offset = max(0, int(request.args.get("offset", 0)))
+        except ValueError:
+            return jsonify({"error": "limit y offset deben ser enteros"}), 400
+        limit = max(1, min(limit, current_app.config.get("RECOMMENDATIONS_MAX_LIMIT", 100)))
+
+        result = PreferencesService.find_matching_houses(client_id, mode=mode, limit=limit, offset=offset,
+                                                         fields=_fields_arg())
         # result: {'client': {...}|None, 'matches': [...], 'preferences_applied': {...}|None}
         if result.get("client") is None:
             return jsonify({"error": "Cliente no encontrado"}), 404
         return jsonify(result)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
@@ -387,13 +520,15 @@ def get_recommendations(client_id):
 def predict_complex():
     """Predicción de precio usando el modelo complejo (todas las características)"""
     try:
-        data = request.get_json(silent=True) or {}
+        data = _ai_json("complex") or {}
         if not data:
             return jsonify({"error": "Datos de entrada requeridos"}), 400
         
         result = AIService.predict_complex(data)
-        return jsonify(result)
+        return _ai_response("complex", result)
         
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
@@ -401,13 +536,15 @@ def predict_complex():
 def predict_simple():
     """Predicción de precio usando el modelo sencillo (top 20 características)"""
     try:
-        data = request.get_json(silent=True) or {}
+        data = _ai_json("simple") or {}
         if not data:
             return jsonify({"error": "Datos de entrada requeridos"}), 400
         
         result = AIService.predict_simple(data)
-        return jsonify(result)
+        return _ai_response("simple", result)
         
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
@@ -415,16 +552,44 @@ def predict_simple():
 def predict_both():
     """Predicción usando ambos modelos para comparar resultados"""
     try:
-        data = request.get_json(silent=True) or {}
+        data = _ai_json("both") or {}
         if not data:
             return jsonify({"error": "Datos de entrada requeridos"}), 400
         
         result = AIService.predict_both(data)
-        return jsonify(result)
+        return _ai_response("both", result)
         
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+@main.route("/api/ai/predict/batch", methods=["POST"])
+def predict_batch():
+    """
+    Predicción por lotes.
+    Acepta un arreglo JSON de casas o {"rows": [...], "model": "both"}.
+    El modelo también puede indicarse con ?model=complex|simple|both.
+    """
+    try:
+        data = _ai_json("batch")
+        model = request.args.get("model")
+        if isinstance(data, dict):
+            model = model or data.get("model")
+            data = data.get("rows")
+        if not isinstance(data, list) or not data:
+            return jsonify({"error": "Se requiere un arreglo JSON de casas"}), 400
+
+        max_rows = current_app.config.get("AI_BATCH_MAX_ROWS", 10000)
+        if len(data) > max_rows:
+            return jsonify({"error": f"Máximo {max_rows} casas por lote"}), 400
+
+        result = AIService.predict_batch(data, model=model or "both")
+        return _ai_response("batch", result)
+
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
 @main.route("/api/ai/models/status", methods=["GET"])
 def ai_models_status():
     """Obtener el estado de los modelos de IA"""
@@ -434,3 +599,180 @@ def ai_models_status():
         
     except Exception as e:
         return jsonify({"error": str(e)}), 500
+
+# AI JOBS
+
+# Content-Type o extensión del archivo -> formato de entrada del trabajo
+_JOB_FORMATS = {
+    "application/x-ndjson": "jsonl",
+    "application/jsonl": "jsonl",
+    "application/json-lines": "jsonl",
+    "text/csv": "csv",
+    ".jsonl": "jsonl",
+    ".ndjson": "jsonl",
+    ".csv": "csv",
+}
+
+def _job_links(job):
+    base = f"/api/ai/jobs/{job['job_id']}"
+    return {**job, "links": {"self": base, "results": f"{base}/results", "cancel": f"{base}/cancel"}}
+
+@main.route("/api/ai/jobs", methods=["POST"])
+def submit_ai_job():
+    """
+    Encola un lote grande y responde 202 con el id del trabajo.
+    Body: JSON Lines (application/x-ndjson) o CSV (text/csv), o un archivo
+    multipart en el campo "file". ?model=complex|simple|both (por defecto simple)
+    y ?format=jsonl|csv si no se deduce del Content-Type o de la extensión.
+    """
+    try:
+        model = request.args.get("model", "simple")
+        if model not in ("complex", "simple", "both"):
+            return jsonify({"error": "Modelo inválido: usa 'complex', 'simple' o 'both'"}), 400
+
+        max_bytes = current_app.config.get("AI_JOBS_MAX_BYTES")
+        if max_bytes and (request.content_length or 0) > max_bytes:
+            return jsonify({"error": f"Máximo {max_bytes} bytes por trabajo"}), 413
+
+        upload = request.files.get("file")
+        if upload is not None:
+            source = upload
+            extension = os.path.splitext(upload.filename or "")[1].lower()
+            input_format = request.args.get("format") or _JOB_FORMATS.get(upload.mimetype) \
+                or _JOB_FORMATS.get(extension)
+        else:
+            if not request.content_length:
+                return jsonify({"error": "Se requiere un archivo JSON Lines o CSV"}), 400
+            source = request.stream
+            input_format = request.args.get("format") or _JOB_FORMATS.get(request.mimetype)
+        if input_format is None:
+            return jsonify({"error": "Formato no reconocido: usa ?format=jsonl o ?format=csv"}), 415
+
+        job = AIService.jobs().submit(source, input_format, model)
+        response = jsonify(_job_links(job))
+        response.status_code = 202
+        response.headers["Location"] = f"/api/ai/jobs/{job['job_id']}"
+        return response
+
+    except JobQueueFull as e:
+        response = jsonify({"error": str(e)})
+        response.status_code = 429
+        response.headers["Retry-After"] = str(current_app.config.get("AI_RETRY_AFTER_SECONDS", 5))
+        return response
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@main.route("/api/ai/jobs", methods=["GET"])
+def list_ai_jobs():
+    """Trabajos más recientes primero"""
+    try:
+        return jsonify({"jobs": [_job_links(job) for job in AIService.jobs().list()]})
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@main.route("/api/ai/jobs/<job_id>", methods=["GET"])
+def get_ai_job(job_id):
+    """Estado y progreso de un trabajo"""
+    job = AIService.jobs().get(job_id)
+    if job is None:
+        return jsonify({"error": "Trabajo no encontrado"}), 404
+    return jsonify(_job_links(job))
+
+@main.route("/api/ai/jobs/<job_id>/results", methods=["GET"])
+def get_ai_job_results(job_id):
+    """
+    Resultados por página: ?offset=0&limit=1000. Con ?format=jsonl las filas
+    se envían en streaming como JSON Lines (sin limit, todas las disponibles).
+    Mientras el trabajo corre solo se devuelven los bloques ya terminados.
+    """
+    try:
+        offset = max(0, int(request.args.get("offset", 0)))
+        stream = request.args.get("format") == "jsonl"
+        page_max = current_app.config.get("AI_JOBS_PAGE_MAX", 10000)
+        limit = request.args.get("limit")
+        limit = int(limit) if limit is not None else (None if stream else min(1000, page_max))
+        if limit is not None and not stream:
+            limit = max(1, min(limit, page_max))
+    except ValueError:
+        return jsonify({"error": "offset y limit deben ser enteros"}), 400
+
+    jobs = AIService.jobs()
+    job = jobs.get(job_id)
+    if job is None:
+        return jsonify({"error": "Trabajo no encontrado"}), 404
+    lines = jobs.results(job_id, offset, limit)
+    if stream:
+        response = Response(lines, mimetype="application/x-ndjson")
+        response.headers["X-Job-Status"] = job["status"]
+        return response
+
+    results = [json.loads(line) for line in lines]
+    next_offset = offset + len(results)
+    more = next_offset < job["rows_processed"] or job["status"] in ("queued", "running")
+    return jsonify({
+        "job_id": job_id,
+        "status": job["status"],
+        "offset": offset,
+        "limit": limit,
+        "count": len(results),
+        "next_offset": next_offset if more else None,
+        "results": results,
+    })
+
+@main.route("/api/ai/jobs/<job_id>/cancel", methods=["POST"])
+def cancel_ai_job(job_id):
+    """Cancela un trabajo en cola o en curso (se detiene antes de su siguiente bloque)"""
+    job = AIService.jobs().cancel(job_id)
+    if job is None:
+        return jsonify({"error": "Trabajo no encontrado"}), 404
+    if not job.get("cancel_requested"):
+        return jsonify({"error": f"El trabajo ya terminó ({job['status']})", **_job_links(job)}), 409
+    return jsonify(_job_links(job)), 202
+
+# ADMIN
+
+def _require_admin():
+    """Valida el header X-Admin-Token contra Config.ADMIN_TOKEN"""
+    expected = current_app.config.get("ADMIN_TOKEN")
+    if not expected:
+        return jsonify({"error": "Endpoints de administración deshabilitados (ADMIN_TOKEN)"}), 403
+    if not hmac.compare_digest(request.headers.get("X-Admin-Token", ""), expected):
+        return jsonify({"error": "Token de administración inválido"}), 401
+    return None
+
+@main.route("/api/admin/models", methods=["GET"])
+def admin_models():
+    """Versiones de modelos cargadas e historial de recargas"""
+    denied = _require_admin()
+    if denied:
+        return denied
+    return jsonify(AIService.registry().status())
+
+@main.route("/api/admin/models/reload", methods=["POST"])
+def admin_reload_models():
+    """
+    Recarga los modelos en caliente.
+    Body opcional: {"directory": "<subdirectorio de resources>", "wait": true}
+    Sin wait responde 202 y la recarga sigue en segundo plano.
+    """
+    denied = _require_admin()
+    if denied:
+        return denied
+
+    data = request.get_json(silent=True) or {}
+    root = os.path.realpath(current_app.config["AI_RESOURCES_DIR"])
+    directory = os.path.realpath(os.path.join(root, data.get("directory") or ""))
+    # Solo se cargan artefactos dentro del directorio de recursos configurado
+    if os.path.commonpath([root, directory]) != root or not os.path.isdir(directory):
+        return jsonify({"error": "Directorio de modelos inválido"}), 400
+
+    if not AIService.reload_models(directory, wait=bool(data.get("wait"))):
+        return jsonify({"error": "Ya hay una recarga en curso"}), 409
+    status = AIService.registry().status()
+    if not data.get("wait"):
+        return jsonify({"status": "reloading", "registry": status}), 202
+    last = status["history"][-1]
+    code = 200 if last["status"] == "active" else 422
+    return jsonify({"status": last["status"], "registry": status}), code
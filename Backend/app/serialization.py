@@ -0,0 +1,122 @@
+"""
+Serialización rápida de filas y respuestas JSON.
+
+row_serializer(model, fields) arma una vez por modelo (y por proyección) la
+función que convierte una instancia en dict: las llaves se resuelven al
+crearla y los valores se leen en bloque del estado ya cargado de la
+instancia, sin pasar por el descriptor de SQLAlchemy de cada columna. Si la
+instancia tiene columnas vencidas (tras un commit) o diferidas, se cargan con
+getattr como antes.
+
+OrjsonProvider reemplaza al proveedor JSON de Flask cuando orjson está
+instalado. La salida es la misma (fechas en formato HTTP, Decimal como texto)
+salvo NaN e infinito, que salen como null en lugar de los tokens NaN/Infinity
+que JSON no admite.
+"""
+import datetime
+import decimal
+from functools import lru_cache
+from operator import itemgetter
+
+from flask.json.provider import DefaultJSONProvider
+from werkzeug.http import http_date
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson es opcional
+    orjson = None
+
+
+def _columns(model):
+    """[(nombre de la columna, atributo del mapper)] en el orden de la tabla"""
+    from sqlalchemy import inspect
+
+    mapper = inspect(model)
+    return [(column.name, mapper.get_property_by_column(column).key) for column in model.__table__.columns]
+
+
+def model_fields(model, fields):
+    """
+    Normaliza una proyección (?fields=a,b): columnas del modelo en el orden de
+    la tabla, siempre con la llave primaria. ValueError si alguna no existe.
+    """
+    names = [name for name, _ in _columns(model)]
+    unknown = sorted(set(fields) - set(names))
+    if unknown:
+        raise ValueError(f"Campos desconocidos: {', '.join(unknown)}")
+    primary = {column.name for column in model.__table__.primary_key.columns}
+    return tuple(name for name in names if name in fields or name in primary)
+
+
+def load_only_options(model, fields, extra=()):
+    """Opción load_only para traer de la base solo las columnas de la proyección"""
+    from sqlalchemy.orm import load_only
+
+    keys = dict(_columns(model))
+    return load_only(*(getattr(model, keys[name]) for name in dict.fromkeys(fields + tuple(extra))))
+
+
+@lru_cache(maxsize=None)
+def row_serializer(model, fields=None):
+    """
+    Función instancia -> dict de las columnas del modelo (todas, o las de
+    fields ya normalizado con model_fields), generada una sola vez.
+    """
+    columns = _columns(model)
+    if fields is not None:
+        columns = [(name, key) for name, key in columns if name in fields]
+    names = tuple(name for name, _ in columns)
+    keys = tuple(key for _, key in columns)
+    read = itemgetter(*keys) if len(keys) > 1 else (lambda state: (state[keys[0]],))
+
+    def serialize(instance):
+        try:
+            return dict(zip(names, read(instance.__dict__)))
+        except KeyError:
+            # Columnas vencidas o diferidas: getattr las carga
+            return {name: getattr(instance, key) for name, key in columns}
+
+    return serialize
+
+
+def _default(value):
+    """Tipos que orjson no serializa igual que Flask"""
+    if isinstance(value, datetime.date):
+        return http_date(value)
+    if isinstance(value, decimal.Decimal):
+        return str(value)
+    if hasattr(value, '__html__'):
+        return str(value.__html__())
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+class OrjsonProvider(DefaultJSONProvider):
+    """
+    Proveedor JSON de Flask con orjson. Las fechas pasan por _default para
+    conservar el formato HTTP de jsonify; NaN e infinito salen como null.
+    Al leer, lo que orjson rechaza (por ejemplo los tokens NaN que acepta el
+    módulo json) se vuelve a intentar con el proveedor de Flask.
+    """
+
+    def _options(self, pretty=False):
+        options = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+        if self.sort_keys:
+            options |= orjson.OPT_SORT_KEYS
+        if pretty:
+            options |= orjson.OPT_INDENT_2
+        return options
+
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(obj, default=_default, option=self._options()).decode()
+
+    def loads(self, s, **kwargs):
+        try:
+            return orjson.loads(s)
+        except orjson.JSONDecodeError:
+            return super().loads(s, **kwargs)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        pretty = self.compact is False or (self.compact is None and self._app.debug)
+        body = orjson.dumps(obj, default=_default, option=self._options(pretty))
+        return self._app.response_class(body, mimetype=self.mimetype)
@@ -1,5 +1,30 @@
+import dataclasses
+import functools
+import hashlib
+import json
+import math
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from types import MappingProxyType
+
 from . import db
-from .models import Client, Vendor, ClientPreferences, VendorHouse
+from .batching import MicroBatcher
+from .cache import TTLCache
+from .client_index import ClientIndex
+from .house_index import HouseIndex
+from .features import DERIVED_FEATURES, engineer_record, engineer_records
+from .inference import CompiledModel
+from .jobs import JobQueue
+from .matching import (
+    CATEGORICAL_COLUMNS, CRITERIA_BY_NAME, RANGE_COLUMNS, active_criteria, criteria_params, criteria_shape,
+    row_matches, sql_filter, top_k,
+)
+from .metrics import metrics
+from .registry import ModelHandle, ModelRegistry, ModelSet, directory_fingerprint
+from .serialization import load_only_options, model_fields, row_serializer
+from .settings import settings
+from .models import Client, Vendor, ClientPreferences, VendorHouse, HouseClientMatch, CacheVersion
 from werkzeug.security import generate_password_hash, check_password_hash
 
 # Helpers
@@ -15,9 +40,158 @@ def _assign_model_fields(instance, data, *, exclude=()):
         if k in cols:
             setattr(instance, k, v)
 
-def _truthy_strings():
-    # For vendor_houses.central_air (VARCHAR)
-    return {"Y", "Yes", "1", "True", "T", "SI", "SÍ", "ON"}
+# Columnas de vendor_houses -> nombres de características de los modelos (Kaggle)
+HOUSE_FEATURE_COLUMNS = {
+    'ms_sub_class': 'MSSubClass', 'ms_zoning': 'MSZoning',
+    'lot_frontage': 'LotFrontage', 'lot_area': 'LotArea', 'lot_shape': 'LotShape',
+    'land_contour': 'LandContour', 'lot_config': 'LotConfig',
+    'neighborhood': 'Neighborhood', 'condition1': 'Condition1',
+    'bldg_type': 'BldgType', 'house_style': 'HouseStyle',
+    'overall_qual': 'OverallQual', 'overall_cond': 'OverallCond',
+    'year_built': 'YearBuilt', 'year_remod_add': 'YearRemodAdd',
+    'remod_age': 'RemodAge', 'house_age': 'HouseAge',
+    'roof_style': 'RoofStyle', 'exterior1st': 'Exterior1st', 'exterior2nd': 'Exterior2nd',
+    'mas_vnr_area': 'MasVnrArea', 'exter_qual': 'ExterQual', 'exter_cond': 'ExterCond',
+    'foundation': 'Foundation',
+    'bsmt_qual': 'BsmtQual', 'bsmt_cond': 'BsmtCond', 'bsmt_exposure': 'BsmtExposure',
+    'bsmt_fin_type1': 'BsmtFinType1', 'bsmt_fin_sf1': 'BsmtFinSF1',
+    'bsmt_fin_type2': 'BsmtFinType2', 'bsmt_fin_sf2': 'BsmtFinSF2',
+    'bsmt_unf_sf': 'BsmtUnfSF', 'total_bsmt_sf': 'TotalBsmtSF',
+    'heating_qc': 'HeatingQC', 'central_air': 'CentralAir', 'electrical': 'Electrical',
+    'first_flr_sf': '1stFlrSF', 'second_flr_sf': '2ndFlrSF',
+    'gr_liv_area': 'GrLivArea', 'total_sf': 'TotalSF',
+    'bsmt_full_bath': 'BsmtFullBath', 'bsmt_half_bath': 'BsmtHalfBath',
+    'full_bath': 'FullBath', 'half_bath': 'HalfBath', 'total_bath': 'TotalBath',
+    'bedroom_abv_gr': 'BedroomAbvGr', 'kitchen_abv_gr': 'KitchenAbvGr',
+    'kitchen_qual': 'KitchenQual', 'tot_rms_abv_grd': 'TotRmsAbvGrd',
+    'rooms_plus_bath_eq': 'RoomsPlusBathEq', 'functional': 'Functional',
+    'fireplaces': 'Fireplaces', 'fireplace_qu': 'FireplaceQu',
+    'garage_type': 'GarageType', 'garage_yr_blt': 'GarageYrBlt',
+    'garage_finish': 'GarageFinish', 'garage_cars': 'GarageCars', 'garage_area': 'GarageArea',
+    'garage_qual': 'GarageQual', 'garage_cond': 'GarageCond', 'paved_drive': 'PavedDrive',
+    'garage_score': 'GarageScore',
+    'wood_deck_sf': 'WoodDeckSF', 'open_porch_sf': 'OpenPorchSF',
+    'enclosed_porch': 'EnclosedPorch', 'three_ssn_porch': '3SsnPorch',
+    'screen_porch': 'ScreenPorch', 'total_porch_sf': 'TotalPorchSF',
+    'pool_area': 'PoolArea', 'fence': 'Fence',
+    'mo_sold': 'MoSold', 'yr_sold': 'YrSold',
+    'sale_type': 'SaleType', 'sale_condition': 'SaleCondition',
+}
+
+# Características derivadas que vendor_houses guarda (caché de app/features.py)
+HOUSE_DERIVED_COLUMNS = {
+    feature: column for column, feature in HOUSE_FEATURE_COLUMNS.items()
+    if feature in DERIVED_FEATURES
+}
+
+# Columnas calculadas por el servidor; no se aceptan del cliente
+HOUSE_VALUATION_FIELDS = ('predicted_price', 'model_version', 'scored_at', 'scored_features_hash')
+
+def _load_house_index_rows():
+    """Columnas de matching de las casas disponibles, para HouseIndex"""
+    columns = RANGE_COLUMNS + CATEGORICAL_COLUMNS
+    query = (db.session.query(VendorHouse.house_id, *(getattr(VendorHouse, c) for c in columns))
+             .filter(VendorHouse.status == 'available')
+             .order_by(VendorHouse.house_id))
+    for row in query.yield_per(5000):
+        yield row[0], dict(zip(columns, row[1:]))
+
+def _house_projection(fields):
+    """
+    ?fields de las casas: (columnas normalizadas o None si son todas, opciones
+    de la consulta para leer solo esas columnas). ValueError si alguna no existe.
+    """
+    if not fields:
+        return None, ()
+    fields = model_fields(VendorHouse, fields)
+    # El contacto del vendedor en las recomendaciones sale de la casa
+    return fields, (load_only_options(VendorHouse, fields, extra=('contact_phone', 'contact_email')),)
+
+def _house_index_values(house):
+    return {c: getattr(house, c) for c in RANGE_COLUMNS + CATEGORICAL_COLUMNS + ('status',)}
+
+def _inventory_version():
+    return db.session.query(CacheVersion.version).filter_by(scope='inventory', scope_id=0).scalar() or 0
+
+# Índice en memoria de las casas disponibles para find_matching_houses (por proceso);
+# se reconstruye cuando otro worker sube la versión del inventario
+house_index = HouseIndex(_load_house_index_rows, resync_interval=settings.HOUSE_INDEX_RESYNC_SECONDS,
+                         version=_inventory_version)
+
+def _load_client_index_rows():
+    """Criterios de las preferencias vigentes (la fila más reciente) de cada cliente, para ClientIndex"""
+    from sqlalchemy import func
+
+    latest = (db.session.query(func.max(ClientPreferences.preference_id))
+              .group_by(ClientPreferences.client_id))
+    query = ClientPreferences.query.filter(ClientPreferences.preference_id.in_(latest.scalar_subquery()))
+    for prefs in query.yield_per(2000):
+        yield prefs.client_id, active_criteria(prefs)
+
+def _now():
+    from datetime import datetime, timezone
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+def _bump_cache_version(scope, scope_id=0):
+    """
+    Sube (o crea en 1) una versión de cache_versions dentro de la transacción
+    en curso: los demás workers la ven cuando se confirma la escritura que la
+    causó. Devuelve la versión nueva.
+    """
+    if db.session.get_bind().dialect.name == 'mysql':
+        from sqlalchemy.dialects.mysql import insert
+
+        statement = insert(CacheVersion).values(scope=scope, scope_id=scope_id, version=1)
+        statement = statement.on_duplicate_key_update(version=CacheVersion.version + 1)
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+
+        statement = (insert(CacheVersion).values(scope=scope, scope_id=scope_id, version=1)
+                     .on_conflict_do_update(index_elements=['scope', 'scope_id'],
+                                            set_={'version': CacheVersion.version + 1}))
+    db.session.execute(statement)
+    return db.session.query(CacheVersion.version).filter_by(scope=scope, scope_id=scope_id).scalar()
+
+def _upsert_client_matches(rows):
+    """
+    Guarda filas de house_client_matches; si (house_id, client_id) ya existe
+    (una reescritura del cliente que corre a la vez que create_house) se
+    actualizan puntaje, criterios y fecha en lugar de fallar por la llave
+    """
+    if not rows:
+        return
+    columns = ('score', 'matched_criteria', 'matched_at')
+    if db.session.get_bind().dialect.name == 'mysql':
+        from sqlalchemy.dialects.mysql import insert
+
+        statement = insert(HouseClientMatch)
+        statement = statement.on_duplicate_key_update({c: statement.inserted[c] for c in columns})
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+
+        statement = insert(HouseClientMatch)
+        statement = statement.on_conflict_do_update(index_elements=['house_id', 'client_id'],
+                                                    set_={c: statement.excluded[c] for c in columns})
+    db.session.execute(statement, rows)
+
+def _cache_versions(client_id):
+    """(versión de las preferencias del cliente, versión del inventario) en una consulta; 0 si no hay fila"""
+    from sqlalchemy import tuple_
+
+    rows = (db.session.query(CacheVersion.scope, CacheVersion.version)
+            .filter(tuple_(CacheVersion.scope, CacheVersion.scope_id)
+                    .in_([('client', client_id), ('inventory', 0)]))
+            .all())
+    versions = dict(rows)
+    return versions.get('client', 0), versions.get('inventory', 0)
+
+def _preferences_version():
+    return db.session.query(CacheVersion.version).filter_by(scope='preferences', scope_id=0).scalar() or 0
+
+# Índice invertido de las preferencias para saber qué clientes aceptan una casa nueva;
+# se reconstruye cuando otro worker sube la versión de las preferencias
+client_index = ClientIndex(_load_client_index_rows, resync_interval=settings.CLIENT_INDEX_RESYNC_SECONDS,
+                           version=_preferences_version)
 
 # Client Service
 class ClientService:
@@ -55,6 +229,8 @@ class ClientService:
             if "password" in client_data:
                 client_data["password"] = generate_password_hash(client_data["password"])
             _assign_model_fields(c, client_data, exclude=('client_id',))
+            # Las recomendaciones incluyen los datos del cliente; sus criterios no cambian
+            PreferencesService.preferences_changed(client_id, criteria=False)
             db.session.commit()
             return c.to_dict()
         except Exception:
@@ -68,7 +244,9 @@ class ClientService:
             if not c:
                 return False
             db.session.delete(c)
+            version = PreferencesService.preferences_changed(client_id)
             db.session.commit()
+            client_index.remove(client_id, version=version)
             return True
         except Exception:
             db.session.rollback()
@@ -131,6 +309,8 @@ class VendorService:
             if "password" in vendor_data:
                 vendor_data["password"] = generate_password_hash(vendor_data["password"])
             _assign_model_fields(v, vendor_data, exclude=('vendor_id',))
+            # Las recomendaciones incluyen los datos del vendedor
+            PreferencesService.inventory_changed()
             db.session.commit()
             return v.to_dict()
         except Exception:
@@ -144,7 +324,10 @@ class VendorService:
             if not v:
                 return False
             db.session.delete(v)
+            # Sus casas se borraron en cascada
+            PreferencesService.inventory_changed()
             db.session.commit()
+            house_index.invalidate()
             return True
         except Exception:
             db.session.rollback()
@@ -173,15 +356,18 @@ class VendorService:
 # House Service 
 class HouseService:
     @staticmethod
-    def get_houses_by_vendor(vendor_id):
+    def get_houses_by_vendor(vendor_id, fields=None):
         """
         Retorna todas las casas que pertenecen a un vendor_id.
+        fields limita las columnas (se leen de la base solo esas y la llave).
         """
+        fields, options = _house_projection(fields)
         vendor = Vendor.query.get(vendor_id)
         if not vendor:
             return None
-        houses = VendorHouse.query.filter_by(vendor_id=vendor_id).all()
-        return [h.to_dict() for h in houses]
+        houses = VendorHouse.query.filter_by(vendor_id=vendor_id).options(*options).all()
+        serialize = row_serializer(VendorHouse, fields)
+        return [serialize(h) for h in houses]
     
     @staticmethod
     def create_house(vendor_id, house_data):
@@ -193,14 +379,151 @@ class HouseService:
             h = VendorHouse(vendor_id=vendor_id)
             h.title = house_data['title']
             h.sale_price = float(house_data['sale_price'])
-            _assign_model_fields(h, house_data, exclude=('house_id', 'vendor_id', 'title', 'sale_price'))
+            _assign_model_fields(h, house_data, exclude=('house_id', 'vendor_id', 'title', 'sale_price')
+                                 + HOUSE_VALUATION_FIELDS)
+            HouseService.store_derived_features([h])
+            # Si el modelo no está listo la casa queda sin valuar hasta el backfill
+            AIService.score_houses([h])
             db.session.add(h)
+            db.session.flush()
+            # Los clientes interesados se guardan en la misma transacción que la casa
+            if settings.REVERSE_MATCHING_ENABLED:
+                HouseService.record_client_matches(h)
+            version = PreferencesService.inventory_changed()
             db.session.commit()
+            house_index.upsert(h.house_id, _house_index_values(h), version=version)
             return h.to_dict()
         except Exception:
             db.session.rollback()
             raise
 
+    @staticmethod
+    def record_client_matches(house):
+        """
+        Guarda en house_client_matches los clientes cuyas preferencias aceptan la
+        casa, buscándolos en el índice invertido (sin recorrer client_preferences).
+        Los clientes sin criterios no se guardan (ver get_interested_clients).
+        No hace commit; devuelve cuántos se encontraron.
+        """
+        values = _house_index_values(house)
+        if values.get('status') not in (None, 'available'):
+            return 0
+        matches = client_index.match(values)
+        now = _now()
+        _upsert_client_matches([
+            {'house_id': house.house_id, 'client_id': client_id, 'score': score,
+             'matched_criteria': ','.join(matched), 'matched_at': now}
+            for client_id, score, matched in matches
+        ])
+        return len(matches)
+
+    @staticmethod
+    def get_interested_clients(vendor_id, house_id, limit, offset=0):
+        """
+        Clientes interesados en una casa del vendedor, de house_client_matches,
+        ordenados por puntaje; al final, con puntaje 0, los clientes sin criterios
+        (aceptan cualquier casa disponible y no se guardan en la tabla).
+        None si la casa no existe o es de otro vendedor.
+        """
+        house = VendorHouse.query.filter_by(house_id=house_id, vendor_id=vendor_id).first()
+        if not house:
+            return None
+        query = (db.session.query(HouseClientMatch, Client)
+                 .join(Client, Client.client_id == HouseClientMatch.client_id)
+                 .filter(HouseClientMatch.house_id == house_id))
+        stored = query.count()
+        rows = (query.order_by(HouseClientMatch.score.desc(), HouseClientMatch.client_id)
+                .offset(offset).limit(limit).all())
+        clients = [{
+            'client_id': c.client_id,
+            'username': c.username,
+            'email': c.email,
+            'score': m.score,
+            'matched_criteria': m.matched_criteria.split(',') if m.matched_criteria else [],
+            'matched_at': m.matched_at,
+        } for m, c in rows]
+
+        match_all = []
+        if settings.REVERSE_MATCHING_ENABLED and house.status in (None, 'available'):
+            match_all = client_index.match_all()
+        start = max(0, offset - stored)
+        page = match_all[start:start + limit - len(clients)]
+        if page:
+            found = {c.client_id: c for c in Client.query.filter(Client.client_id.in_(page))}
+            clients.extend({
+                'client_id': client_id,
+                'username': found[client_id].username,
+                'email': found[client_id].email,
+                'score': 0.0,
+                'matched_criteria': [],
+                'matched_at': None,
+            } for client_id in page if client_id in found)
+        return {
+            'house_id': house_id,
+            'total_clients': stored + len(match_all),
+            'limit': limit,
+            'offset': offset,
+            # Solo datos de contacto: el vendedor no ve el resto de la cuenta del cliente
+            'clients': clients,
+        }
+
+    @staticmethod
+    def store_derived_features(houses):
+        """
+        Recalcula total_sf, house_age, total_bath, etc. a partir de las columnas
+        originales (como en el entrenamiento). Si faltan entradas de una fórmula
+        se conserva el valor recibido.
+        """
+        rows = [
+            {feature: getattr(h, column) for column, feature in HOUSE_FEATURE_COLUMNS.items()
+             if getattr(h, column) is not None}
+            for h in houses
+        ]
+        for h, row in zip(houses, engineer_records(rows, HOUSE_DERIVED_COLUMNS)):
+            for feature, column in HOUSE_DERIVED_COLUMNS.items():
+                if row.get(feature) is not None:
+                    setattr(h, column, row[feature])
+
+    @staticmethod
+    def backfill_predictions(chunk_size=500, force=False):
+        """
+        Valúa las casas guardadas por bloques de house_id, con un predict por bloque.
+        Solo re-evalúa filas sin valuación, con otra versión del modelo o cuyas
+        columnas de entrada cambiaron (force re-evalúa todas).
+        """
+        totals = {'scanned': 0, 'scored': 0, 'skipped': 0, 'failed': 0}
+        last_id = 0
+        while True:
+            houses = (VendorHouse.query
+                      .filter(VendorHouse.house_id > last_id)
+                      .order_by(VendorHouse.house_id)
+                      .limit(chunk_size)
+                      .all())
+            if not houses:
+                break
+            last_id = houses[-1].house_id
+            try:
+                result = AIService.score_houses(houses, force=force)
+                db.session.commit()
+            except Exception:
+                db.session.rollback()
+                raise
+            totals['scanned'] += len(houses)
+            for key in ('scored', 'skipped', 'failed'):
+                totals[key] += result[key]
+            # Liberar las filas ya procesadas de la sesión
+            db.session.expunge_all()
+        # El backfill puede completar columnas derivadas que usa el matching
+        if totals['scored']:
+            try:
+                PreferencesService.inventory_changed()
+                db.session.commit()
+            except Exception:
+                db.session.rollback()
+                raise
+            house_index.invalidate()
+        return totals
+
     @staticmethod
     def delete_house(house_id):
         try:
@@ -208,7 +531,9 @@ class HouseService:
             if not h:
                 return False
             db.session.delete(h)
+            version = PreferencesService.inventory_changed()
             db.session.commit()
+            house_index.remove(house_id, version=version)
             return True
         except Exception:
             db.session.rollback()
@@ -216,30 +541,70 @@ class HouseService:
 
 # Preferences Service 
 class PreferencesService:
+    # Respuestas de find_matching_houses por (cliente, versión de sus preferencias,
+    # versión del inventario, modo, página); las versiones están en cache_versions,
+    # así que un cambio hecho en cualquier worker invalida la caché de todos
+    _recommendation_cache = TTLCache(
+        max_size=settings.RECOMMENDATIONS_CACHE_SIZE,
+        ttl=settings.RECOMMENDATIONS_CACHE_TTL
+    )
+    # Reescrituras de house_client_matches fuera de la petición (start_match_sync)
+    _match_sync_app = None
+    _match_sync_executor = None
+    _match_sync_max_pending = 1000
+    _match_sync_pending = set()
+    _match_sync_lock = threading.Lock()
+    # Sentencias SQL del matching por forma de las preferencias (matching.criteria_shape):
+    # se arman una vez y SQLAlchemy reutiliza su compilación; no vencen por tiempo
+    _match_statements = TTLCache(max_size=settings.MATCH_STATEMENT_CACHE_SIZE, ttl=float('inf'))
+
+    @staticmethod
+    def preferences_changed(client_id, criteria=True):
+        """
+        Las recomendaciones en caché de este cliente dejan de ser válidas en todos
+        los workers. Si cambiaron sus criterios (criteria) sube además la versión
+        global de las preferencias, que hace reconstruir client_index en los demás
+        workers, y la devuelve. Va en la transacción de la escritura; quien llama
+        hace commit
+        """
+        _bump_cache_version('client', client_id)
+        if criteria:
+            return _bump_cache_version('preferences')
+
+    @staticmethod
+    def inventory_changed():
+        """Como preferences_changed, para las recomendaciones de todos los clientes"""
+        return _bump_cache_version('inventory')
+
+    @classmethod
+    def reset_recommendation_cache(cls):
+        cls._recommendation_cache.clear()
+
+    @classmethod
+    def get_recommendation_stats(cls):
+        return {
+            'cache': cls._recommendation_cache.stats(),
+            'sql_statements': cls._match_statements.stats(),
+            'house_index': house_index.stats(),
+            'client_index': client_index.stats(),
+        }
+
     @staticmethod
     def create_preference(client_id, preferences_data):
         try:
-            print(f"DEBUG: Creating preference for client_id: {client_id}")
-            print(f"DEBUG: Preferences data: {preferences_data}")
-            
             p = ClientPreferences.query.filter_by(client_id=client_id).first()
             if not p:
-                print("DEBUG: Creating new preference record")
                 p = ClientPreferences(client_id=client_id)
                 db.session.add(p)
-            else:
-                print("DEBUG: Updating existing preference record")
-            
             _assign_model_fields(p, preferences_data, exclude=('preference_id', 'client_id'))
+            version = PreferencesService.preferences_changed(client_id)
             db.session.commit()
-            
             result = p.to_dict()
-            print(f"DEBUG: Final result: {result}")
-            return result
-        except Exception as e:
-            print(f"DEBUG: Error occurred: {str(e)}")
+        except Exception:
             db.session.rollback()
             raise
+        PreferencesService.sync_client_matches(client_id, version=version)
+        return result
 
     @staticmethod
     def delete_preference(client_id):
@@ -248,219 +613,287 @@ class PreferencesService:
             if not p:
                 return False
             db.session.delete(p)
+            version = PreferencesService.preferences_changed(client_id)
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+        PreferencesService.sync_client_matches(client_id, version=version)
+        return True
+
+    @classmethod
+    def find_matching_houses(cls, client_id, mode='ranked', limit=None, offset=0, fields=None):
+        """
+        mode='ranked': página de las casas con mayor puntaje (suma de los pesos de
+        los criterios que cumplen), con los criterios cumplidos de cada una.
+        mode='all': todas las casas que cumplen algún criterio, sin orden de puntaje.
+        fields limita las columnas de cada casa (?fields=title,sale_price).
+
+        Las respuestas repetidas salen de la caché, pero un acierto no es gratis:
+        sigue haciendo una consulta por llave primaria a cache_versions (las
+        versiones del cliente y del inventario, WHERE (scope, scope_id) IN ...).
+        Es el precio de que un cambio hecho en otro worker invalide la caché de
+        este al momento, sin esperar el TTL. El resultado se comparte entre
+        llamadas y no debe modificarse.
+        """
+        if mode not in ('ranked', 'all'):
+            raise ValueError("Modo inválido: usa 'ranked' o 'all'")
+        if mode == 'ranked':
+            limit = limit or settings.RECOMMENDATIONS_DEFAULT_LIMIT
+        fields, options = _house_projection(fields)
+        # Las versiones se leen antes de consultar: un cambio que llegue durante
+        # el cálculo deja este resultado bajo una llave que ya no se pedirá
+        key = (client_id, *_cache_versions(client_id), mode, limit, offset, fields)
+        cached = cls._recommendation_cache.get(key)
+        if cached is not None:
+            return cached
+        result = cls._find_matching_houses(client_id, mode, limit, offset, fields, options)
+        # Un cliente inexistente no se guarda: su id puede crearse después
+        if result['client'] is not None:
+            cls._recommendation_cache.set(key, result)
+        return result
+
+    @staticmethod
+    def _latest_preferences(client_id):
+        return ClientPreferences.query.filter_by(client_id=client_id).order_by(ClientPreferences.preference_id.desc()).first()
+
+    @classmethod
+    def sync_client_matches(cls, client_id, version=None):
+        """
+        Tras cambiar las preferencias (version: la que devolvió
+        preferences_changed): actualiza el índice invertido al momento y
+        deja la reescritura de las filas del cliente en house_client_matches, que
+        recorre todo el inventario, a los hilos de start_match_sync.
+
+        Corre después del commit de las preferencias, así que no lanza: si falla,
+        el índice se reconstruye desde la base en la próxima búsqueda y las filas
+        se reescriben con el próximo cambio del cliente
+        """
+        if not settings.REVERSE_MATCHING_ENABLED:
+            return
+        try:
+            prefs = cls._latest_preferences(client_id)
+            if prefs is None:
+                client_index.remove(client_id, version=version)
+            else:
+                client_index.upsert(client_id, active_criteria(prefs), version=version)
+            cls._schedule_match_rewrite(client_id)
+        except Exception as e:
+            db.session.rollback()
+            client_index.invalidate()
+            print(f"⚠️ No se pudo sincronizar house_client_matches del cliente {client_id}: {e}")
+
+    @classmethod
+    def rewrite_client_matches(cls, client_id):
+        """
+        Reescribe las filas del cliente en house_client_matches contra el
+        inventario actual. Los clientes sin criterios activos no tienen filas:
+        get_interested_clients los agrega al leer
+        """
+        prefs = cls._latest_preferences(client_id)
+        criteria = active_criteria(prefs) if prefs is not None else []
+        try:
+            HouseClientMatch.query.filter_by(client_id=client_id).delete()
+            if criteria:
+                _, ranked = cls._ranked_houses(criteria, None, 0)
+                total_weight = sum(criterion.weight for criterion, _ in criteria)
+                now = _now()
+                _upsert_client_matches([
+                    {'house_id': house_id, 'client_id': client_id,
+                     'score': round(score / total_weight, 4),
+                     'matched_criteria': ','.join(matched), 'matched_at': now}
+                    for house_id, score, matched in ranked
+                ])
             db.session.commit()
-            return True
         except Exception:
             db.session.rollback()
             raise
 
+    @classmethod
+    def start_match_sync(cls, app, workers=1, max_pending=1000):
+        """
+        Las reescrituras de house_client_matches corren en un pool de workers
+        hilos con el contexto de app, con hasta max_pending clientes en cola.
+        workers=0 las hace dentro de la petición que cambió las preferencias
+        """
+        executor = None
+        if workers > 0:
+            executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='match-sync')
+        with cls._match_sync_lock:
+            previous = cls._match_sync_executor
+            cls._match_sync_app = app
+            cls._match_sync_executor = executor
+            cls._match_sync_max_pending = max(1, int(max_pending))
+            cls._match_sync_pending = set()
+        if previous is not None:
+            previous.shutdown(wait=False)
+
+    @classmethod
+    def _schedule_match_rewrite(cls, client_id):
+        with cls._match_sync_lock:
+            executor = cls._match_sync_executor
+            if executor is not None and client_id in cls._match_sync_pending:
+                # Ya hay una en cola: lee las preferencias vigentes cuando corre
+                return
+            queued = executor is not None and len(cls._match_sync_pending) < cls._match_sync_max_pending
+            if queued:
+                cls._match_sync_pending.add(client_id)
+                executor.submit(cls._run_match_rewrite, cls._match_sync_app, client_id)
+        if not queued:
+            # Sin pool, o con la cola llena, se hace en la petición (contrapresión)
+            cls.rewrite_client_matches(client_id)
+
+    @classmethod
+    def _run_match_rewrite(cls, app, client_id):
+        # Sale de la cola antes de leer: un cambio posterior vuelve a encolarlo
+        with cls._match_sync_lock:
+            cls._match_sync_pending.discard(client_id)
+        try:
+            with app.app_context():
+                cls.rewrite_client_matches(client_id)
+        except Exception as e:
+            print(f"⚠️ No se pudo reescribir house_client_matches del cliente {client_id}: {e}")
+
     @staticmethod
-    def find_matching_houses(client_id):
+    def _find_matching_houses(client_id, mode, limit, offset, fields=None, options=()):
         client = Client.query.get(client_id)
         if not client:
             return {'client': None, 'matches': [], 'preferences_applied': None}
 
-        prefs = ClientPreferences.query.filter_by(client_id=client_id).order_by(ClientPreferences.preference_id.desc()).first()
+        prefs = PreferencesService._latest_preferences(client_id)
         if not prefs:
             return {'client': client.to_dict(), 'matches': [], 'preferences_applied': None}
 
-        # Crear lista de condiciones OR
-        from sqlalchemy import or_, and_
-        conditions = []
-        
-        # Filtro base: solo casas disponibles
-        base_query = VendorHouse.query.filter(VendorHouse.status == 'available')
-
-        # Precio
-        if prefs.min_sale_price is not None and prefs.max_sale_price is not None:
-            conditions.append(
-                and_(VendorHouse.sale_price >= float(prefs.min_sale_price),
-                     VendorHouse.sale_price <= float(prefs.max_sale_price))
-            )
-        elif prefs.min_sale_price is not None:
-            conditions.append(VendorHouse.sale_price >= float(prefs.min_sale_price))
-        elif prefs.max_sale_price is not None:
-            conditions.append(VendorHouse.sale_price <= float(prefs.max_sale_price))
-
-        # Ubicación
-        if prefs.preferred_neighborhood:
-            conditions.append(VendorHouse.neighborhood == prefs.preferred_neighborhood)
-        if prefs.preferred_ms_zoning:
-            conditions.append(VendorHouse.ms_zoning == prefs.preferred_ms_zoning)
-
-        # Características exactas
-        exact_string_cols = [
-            ('preferred_bldg_type', 'bldg_type'),
-            ('preferred_house_style', 'house_style'),
-            ('preferred_roof_style', 'roof_style'),
-            ('preferred_exterior1st', 'exterior1st'),
-            ('preferred_exterior2nd', 'exterior2nd'),
-            ('preferred_foundation', 'foundation'),
-            ('preferred_condition1', 'condition1'),
-            ('preferred_functional', 'functional'),
-            ('preferred_fireplace_qu', 'fireplace_qu'),
-            ('preferred_garage_type', 'garage_type'),
-            ('preferred_garage_finish', 'garage_finish'),
-            ('preferred_garage_qual', 'garage_qual'),
-            ('preferred_garage_cond', 'garage_cond'),
-            ('preferred_paved_drive', 'paved_drive'),
-            ('preferred_pool_qc', 'pool_qc'),
-            ('preferred_fence', 'fence'),
-            ('preferred_misc_feature', 'misc_feature'),
-            ('preferred_bsmt_qual', 'bsmt_qual'),
-            ('preferred_bsmt_cond', 'bsmt_cond'),
-            ('preferred_bsmt_exposure', 'bsmt_exposure'),
-            ('preferred_bsmt_fin_type1', 'bsmt_fin_type1'),
-            ('preferred_bsmt_fin_type2', 'bsmt_fin_type2'),
-            ('preferred_heating_qc', 'heating_qc'),
-            ('preferred_electrical', 'electrical'),
-        ]
-        for pref_attr, house_col in exact_string_cols:
-            val = getattr(prefs, pref_attr)
-            if val:
-                conditions.append(getattr(VendorHouse, house_col) == val)
-
-        # Aire acondicionado
-        if prefs.central_air_required:
-            conditions.append(VendorHouse.central_air.in_(_truthy_strings()))
-
-        # Rangos numéricos
-        if prefs.min_bedroom_abv_gr is not None and prefs.max_bedroom_abv_gr is not None:
-            conditions.append(
-                and_(VendorHouse.bedroom_abv_gr >= float(prefs.min_bedroom_abv_gr),
-                     VendorHouse.bedroom_abv_gr <= float(prefs.max_bedroom_abv_gr))
-            )
-        elif prefs.min_bedroom_abv_gr is not None:
-            conditions.append(VendorHouse.bedroom_abv_gr >= float(prefs.min_bedroom_abv_gr))
-        elif prefs.max_bedroom_abv_gr is not None:
-            conditions.append(VendorHouse.bedroom_abv_gr <= float(prefs.max_bedroom_abv_gr))
-
-        if prefs.min_full_bath is not None and prefs.max_full_bath is not None:
-            conditions.append(
-                and_(VendorHouse.full_bath >= float(prefs.min_full_bath),
-                     VendorHouse.full_bath <= float(prefs.max_full_bath))
-            )
-        elif prefs.min_full_bath is not None:
-            conditions.append(VendorHouse.full_bath >= float(prefs.min_full_bath))
-        elif prefs.max_full_bath is not None:
-            conditions.append(VendorHouse.full_bath <= float(prefs.max_full_bath))
-
-        if prefs.min_gr_liv_area is not None and prefs.max_gr_liv_area is not None:
-            conditions.append(
-                and_(VendorHouse.gr_liv_area >= float(prefs.min_gr_liv_area),
-                     VendorHouse.gr_liv_area <= float(prefs.max_gr_liv_area))
-            )
-        elif prefs.min_gr_liv_area is not None:
-            conditions.append(VendorHouse.gr_liv_area >= float(prefs.min_gr_liv_area))
-        elif prefs.max_gr_liv_area is not None:
-            conditions.append(VendorHouse.gr_liv_area <= float(prefs.max_gr_liv_area))
-
-        # Nuevas columnas - Total Bath
-        if prefs.min_total_bath is not None and prefs.max_total_bath is not None:
-            conditions.append(
-                and_(VendorHouse.total_bath >= float(prefs.min_total_bath),
-                     VendorHouse.total_bath <= float(prefs.max_total_bath))
-            )
-        elif prefs.min_total_bath is not None:
-            conditions.append(VendorHouse.total_bath >= float(prefs.min_total_bath))
-        elif prefs.max_total_bath is not None:
-            conditions.append(VendorHouse.total_bath <= float(prefs.max_total_bath))
-
-        # Total SF
-        if prefs.min_total_sf is not None and prefs.max_total_sf is not None:
-            conditions.append(
-                and_(VendorHouse.total_sf >= float(prefs.min_total_sf),
-                     VendorHouse.total_sf <= float(prefs.max_total_sf))
-            )
-        elif prefs.min_total_sf is not None:
-            conditions.append(VendorHouse.total_sf >= float(prefs.min_total_sf))
-        elif prefs.max_total_sf is not None:
-            conditions.append(VendorHouse.total_sf <= float(prefs.max_total_sf))
-
-        # Remod Age
-        if prefs.min_remod_age is not None and prefs.max_remod_age is not None:
-            conditions.append(
-                and_(VendorHouse.remod_age >= float(prefs.min_remod_age),
-                     VendorHouse.remod_age <= float(prefs.max_remod_age))
-            )
-        elif prefs.min_remod_age is not None:
-            conditions.append(VendorHouse.remod_age >= float(prefs.min_remod_age))
-        elif prefs.max_remod_age is not None:
-            conditions.append(VendorHouse.remod_age <= float(prefs.max_remod_age))
-
-        # House Age
-        if prefs.min_house_age is not None and prefs.max_house_age is not None:
-            conditions.append(
-                and_(VendorHouse.house_age >= float(prefs.min_house_age),
-                     VendorHouse.house_age <= float(prefs.max_house_age))
-            )
-        elif prefs.min_house_age is not None:
-            conditions.append(VendorHouse.house_age >= float(prefs.min_house_age))
-        elif prefs.max_house_age is not None:
-            conditions.append(VendorHouse.house_age <= float(prefs.max_house_age))
-
-        # Garage Score
-        if prefs.min_garage_score is not None and prefs.max_garage_score is not None:
-            conditions.append(
-                and_(VendorHouse.garage_score >= float(prefs.min_garage_score),
-                     VendorHouse.garage_score <= float(prefs.max_garage_score))
-            )
-        elif prefs.min_garage_score is not None:
-            conditions.append(VendorHouse.garage_score >= float(prefs.min_garage_score))
-        elif prefs.max_garage_score is not None:
-            conditions.append(VendorHouse.garage_score <= float(prefs.max_garage_score))
-
-        # Total Porch SF
-        if prefs.min_total_porch_sf is not None and prefs.max_total_porch_sf is not None:
-            conditions.append(
-                and_(VendorHouse.total_porch_sf >= float(prefs.min_total_porch_sf),
-                     VendorHouse.total_porch_sf <= float(prefs.max_total_porch_sf))
-            )
-        elif prefs.min_total_porch_sf is not None:
-            conditions.append(VendorHouse.total_porch_sf >= float(prefs.min_total_porch_sf))
-        elif prefs.max_total_porch_sf is not None:
-            conditions.append(VendorHouse.total_porch_sf <= float(prefs.max_total_porch_sf))
-
-        # Rooms Plus Bath Eq
-        if prefs.min_rooms_plus_bath_eq is not None and prefs.max_rooms_plus_bath_eq is not None:
-            conditions.append(
-                and_(VendorHouse.rooms_plus_bath_eq >= float(prefs.min_rooms_plus_bath_eq),
-                     VendorHouse.rooms_plus_bath_eq <= float(prefs.max_rooms_plus_bath_eq))
-            )
-        elif prefs.min_rooms_plus_bath_eq is not None:
-            conditions.append(VendorHouse.rooms_plus_bath_eq >= float(prefs.min_rooms_plus_bath_eq))
-        elif prefs.max_rooms_plus_bath_eq is not None:
-            conditions.append(VendorHouse.rooms_plus_bath_eq <= float(prefs.max_rooms_plus_bath_eq))
-
-        # Aplicar condiciones OR si hay alguna
-        if conditions:
-            q = base_query.filter(or_(*conditions))
-        else:
-            q = base_query
+        criteria = active_criteria(prefs)
+        serialize = row_serializer(VendorHouse, fields)
+        if mode == 'all':
+            return {
+                'client': client.to_dict(),
+                'matches': [PreferencesService._match_dict(h, v, serialize)
+                            for h, v in PreferencesService._matching_rows(criteria, options)],
+                'preferences_applied': prefs.to_dict()
+            }
+
+        total, ranked = PreferencesService._ranked_houses(criteria, limit, offset)
 
-        houses = q.all()
+        # Solo las casas de la página se leen completas de la base
+        rows = {}
+        if ranked:
+            rows = {h.house_id: (h, v) for h, v in PreferencesService._houses_query().options(*options)
+                    .filter(VendorHouse.house_id.in_([house_id for house_id, _, _ in ranked])).all()}
+        total_weight = sum(criterion.weight for criterion, _ in criteria)
         matches = []
-        for h in houses:
-            v = Vendor.query.get(h.vendor_id)
-            vendor_info = v.to_dict() if v else None
-            if vendor_info is None:
+        for house_id, score, matched in ranked:
+            if house_id not in rows:
+                # Borrada o vendida después de que se leyó el índice: no cuenta en el total
+                total -= 1
                 continue
-
-            vendor_info_with_contact = {
-                **vendor_info,
-                'contact_phone': h.contact_phone,
-                'contact_email': h.contact_email,
-            }
-
             matches.append({
-                'house': h.to_dict(),
-                'vendor': vendor_info_with_contact
+                **PreferencesService._match_dict(*rows[house_id], serialize),
+                'score': round(score / total_weight, 4) if total_weight else 0.0,
+                'matched_criteria': matched,
             })
 
         return {
             'client': client.to_dict(),
             'matches': matches,
-            'preferences_applied': prefs.to_dict()
+            'preferences_applied': prefs.to_dict(),
+            'mode': 'ranked',
+            'total_matches': total,
+            'limit': limit,
+            'offset': offset,
+        }
+
+    @staticmethod
+    def _ranked_houses(criteria, limit, offset):
+        """(total, [(house_id, puntaje, criterios)]) del índice en memoria o de SQL"""
+        if settings.HOUSE_INDEX_ENABLED:
+            return house_index.rank(criteria, limit, offset)
+        return PreferencesService._rank_with_sql(criteria, limit, offset)
+
+    @staticmethod
+    def _houses_query():
+        # Casas y vendedores en una sola consulta: el JOIN interno deja fuera las
+        # casas sin vendedor, sin una consulta extra por casa
+        return (VendorHouse.query
+                .filter(VendorHouse.status == 'available')
+                .join(Vendor, Vendor.vendor_id == VendorHouse.vendor_id)
+                .add_entity(Vendor)
+                .order_by(VendorHouse.house_id))
+
+    @staticmethod
+    def _matching_rows(criteria, options=()):
+        """(casa, vendedor) de las casas que cumplen cualquiera de los criterios"""
+        query = PreferencesService._houses_query().options(*options)
+        if settings.HOUSE_INDEX_ENABLED:
+            # El índice en memoria resuelve los criterios; la base solo trae las
+            # casas que coinciden por llave primaria
+            house_ids = house_index.match(criteria)
+            if len(house_ids) == 0:
+                return []
+            return query.filter(VendorHouse.house_id.in_(house_ids.tolist())).all()
+
+        statement = PreferencesService._match_statement('rows', criteria_shape(criteria))
+        if options:
+            statement = statement.options(*options)
+        return db.session.execute(statement, criteria_params(criteria)).all()
+
+    @classmethod
+    def _match_statement(cls, kind, shape):
+        """
+        Sentencia parametrizada para una forma de preferencias: 'rows' trae
+        (casa, vendedor) como _houses_query y 'scores' solo house_id y las
+        columnas de los criterios, en el orden de la forma.
+        """
+        key = (kind, shape)
+        statement = cls._match_statements.get(key)
+        if statement is not None:
+            return statement
+
+        from sqlalchemy import select
+
+        if kind == 'rows':
+            statement = (select(VendorHouse, Vendor)
+                         .join(Vendor, Vendor.vendor_id == VendorHouse.vendor_id)
+                         .order_by(VendorHouse.house_id))
+        else:
+            columns = dict.fromkeys(CRITERIA_BY_NAME[name].column for name, _ in shape)
+            statement = select(VendorHouse.house_id, *(getattr(VendorHouse, c) for c in columns))
+        statement = statement.where(VendorHouse.status == 'available')
+        if shape:
+            statement = statement.where(sql_filter(VendorHouse, shape))
+        cls._match_statements.set(key, statement)
+        return statement
+
+    @staticmethod
+    def _rank_with_sql(criteria, limit, offset):
+        """Como HouseIndex.rank, recorriendo en streaming solo las columnas de los criterios"""
+        columns = list(dict.fromkeys(criterion.column for criterion, _ in criteria))
+        statement = PreferencesService._match_statement('scores', criteria_shape(criteria))
+
+        total = 0
+
+        def scored():
+            nonlocal total
+            rows = db.session.execute(statement, criteria_params(criteria), execution_options={'yield_per': 1000})
+            for row in rows:
+                values = dict(zip(columns, row[1:]))
+                matched = [c for c, v in criteria if row_matches(c, v, values[c.column])]
+                total += 1
+                yield row[0], float(sum(c.weight for c in matched)), [c.name for c in matched]
+
+        best = top_k(scored(), None if limit is None else offset + limit)
+        return total, best[offset:]
+
+    @staticmethod
+    def _match_dict(h, v, serialize=None):
+        return {
+            'house': serialize(h) if serialize else h.to_dict(),
+            'vendor': {
+                **v.to_dict(),
+                'contact_phone': h.contact_phone,
+                'contact_email': h.contact_email,
+            }
         }
 
 
@@ -468,152 +901,850 @@ class PreferencesService:
 
 class AIService:
     """Servicio para manejar predicciones de modelos de IA"""
-    
-    _full_pipeline = None
-    _top20_pipeline = None
-    _models_loaded = False
-    
+
+    # Prefijo de los artefactos de cada modelo dentro del directorio de recursos
+    MODEL_STEMS = {
+        'complex': 'xgb_full',
+        'simple': 'xgb_top20',
+    }
+    # Casas de ejemplo para calentar y validar los modelos
+    SAMPLE_FILES = {
+        'complex': 'sample_data_full.json',
+        'simple': 'sample_data_top20.json',
+    }
+
+    # Registro de modelos: cada recarga publica un ModelSet inmutable de forma atómica
+    _registry = None
+
+    # Estado de la carga en segundo plano: idle, loading, ready o failed
+    _load_state = 'idle'
+    _load_error = None
+    _load_thread = None
+    _warmup_results = None
+
+    # Pool compartido para evaluar ambos modelos en paralelo (XGBoost libera el GIL)
+    _executor = None
+    _executor_lock = threading.Lock()
+
+    # Cola de trabajos asíncronos (/api/ai/jobs), creada con el primer trabajo
+    _jobs = None
+    _jobs_lock = threading.Lock()
+
+    # Caché de predicciones: la llave incluye la versión del modelo
+    _prediction_cache = TTLCache(
+        max_size=settings.AI_PREDICTION_CACHE_SIZE,
+        ttl=settings.AI_PREDICTION_CACHE_TTL
+    )
+
+    @classmethod
+    def registry(cls):
+        if cls._registry is None:
+            cls._registry = ModelRegistry(cls._build_model_set, cls._validate_model_set)
+        return cls._registry
+
     @classmethod
-    def load_models(cls):
-        """Cargar los modelos de IA desde la carpeta resources"""
+    def _models(cls):
+        """ModelSet vigente; la primera llamada carga los modelos (una sola vez)"""
+        return cls.registry().ensure_loaded(settings.AI_RESOURCES_DIR)
+
+    @classmethod
+    def load_models(cls, resources_dir=None):
+        """
+        Cargar los modelos de IA desde la carpeta resources (o resources_dir).
+        Por defecto se usa el formato nativo exportado con export_models.py
+        (JSON de preprocesamiento + booster .ubj); el .pkl queda como respaldo.
+        """
         try:
-            import joblib
-            import os
-            import warnings
-            
-            # Suprimir warnings de compatibilidad
-            warnings.filterwarnings("ignore", category=UserWarning)
-            
-            # Ruta a la carpeta resources
-            current_dir = os.path.dirname(os.path.abspath(__file__))
-            resources_dir = os.path.join(current_dir, '../resources')
-            
-            # Cargar modelo complejo
-            full_pipeline_path = os.path.join(resources_dir, 'xgb_full_pipeline.pkl')
-            if os.path.exists(full_pipeline_path):
-                try:
-                    cls._full_pipeline = joblib.load(full_pipeline_path)
-                    print(f"Modelo complejo cargado desde: {full_pipeline_path}")
-                except Exception as e:
-                    print(f"Error cargando modelo complejo: {e}")
-                    cls._full_pipeline = None
-            else:
-                print(f"Archivo no encontrado: {full_pipeline_path}")
-            
-            # Cargar modelo sencillo
-            top20_pipeline_path = os.path.join(resources_dir, 'xgb_top20_pipeline.pkl')
-            if os.path.exists(top20_pipeline_path):
+            cls.registry().load(resources_dir or settings.AI_RESOURCES_DIR)
+            return True
+        except Exception as e:
+            print(f"❌ Error al cargar modelos de IA: {e}")
+            return False
+
+    @classmethod
+    def reload_models(cls, resources_dir=None, wait=False):
+        """
+        Recarga en caliente: carga en segundo plano, valida con una predicción de
+        prueba y publica la nueva versión. Las peticiones en curso no se afectan.
+        """
+        registry = cls.registry()
+        started = registry.reload_async(resources_dir or settings.AI_RESOURCES_DIR)
+        if wait:
+            registry.wait_for_reload()
+        return started
+
+    @classmethod
+    def start_watcher(cls, interval=None):
+        """Recarga automática cuando cambian los artefactos del directorio de recursos"""
+        return cls.registry().start_watcher(interval or settings.AI_WATCH_INTERVAL)
+
+    @classmethod
+    def _build_model_set(cls, resources_dir):
+        """Carga todos los modelos de un directorio en un ModelSet nuevo"""
+        import os
+
+        # La huella se toma antes de cargar: si un archivo cambia durante la carga,
+        # el watcher verá la diferencia y volverá a cargar
+        fingerprint = directory_fingerprint(resources_dir)
+        handles = {}
+        version = hashlib.sha1()
+        for model_type, stem in cls.MODEL_STEMS.items():
+            pipeline, compiled, paths = cls._load_artifacts(model_type, os.path.join(resources_dir, stem))
+            model_version = cls._artifacts_version(paths)
+            batcher = None
+            if compiled is not None and model_type in settings.AI_MICROBATCH_MODELS:
+                batcher = MicroBatcher(
+                    cls._instrumented_predict(model_type, compiled),
+                    max_batch_size=settings.AI_MICROBATCH_MAX_SIZE,
+                    max_wait_ms=settings.AI_MICROBATCH_MAX_WAIT_MS,
+                    name=f'ai-batch-{model_type}',
+                    observe_delay=functools.partial(metrics.observe_queue_delay, model_type)
+                )
+            handles[model_type] = ModelHandle(
+                model_type, model_version, pipeline, compiled, tuple(paths), batcher
+            )
+            version.update((model_version or '').encode())
+        return ModelSet(version.hexdigest()[:12], resources_dir, fingerprint, MappingProxyType(handles))
+
+    @classmethod
+    def _validate_model_set(cls, candidate, current):
+        """
+        Predicción de prueba con las casas de ejemplo. Se rechaza el conjunto nuevo
+        si un modelo que hoy funciona deja de funcionar; en la primera carga se
+        acepta tal cual y los modelos con error quedan marcados como no sanos.
+        """
+        handles = {}
+        for model_type, handle in candidate.models.items():
+            error = None
+            if handle.available:
                 try:
-                    cls._top20_pipeline = joblib.load(top20_pipeline_path)
-                    print(f"Modelo sencillo cargado desde: {top20_pipeline_path}")
+                    result = cls._predict_single(
+                        handle, cls._sample(model_type), use_cache=False, use_batcher=False
+                    )
+                    price = result['predicted_price']
+                    if not math.isfinite(price) or price <= 0:
+                        error = f"Predicción de prueba inválida: {price}"
                 except Exception as e:
-                    print(f"Error cargando modelo sencillo: {e}")
-                    cls._top20_pipeline = None
+                    error = str(e)
             else:
-                print(f"Archivo no encontrado: {top20_pipeline_path}")
-            
-            cls._models_loaded = True
-            return True
-            
+                error = "Modelo no disponible"
+            handles[model_type] = dataclasses.replace(handle, healthy=error is None, error=error)
+
+        if current is not None:
+            for model_type, handle in handles.items():
+                if current.get(model_type).healthy and not handle.healthy:
+                    raise ValueError(f"El modelo {model_type} no pasó la predicción de prueba: {handle.error}")
+        return dataclasses.replace(candidate, models=MappingProxyType(handles))
+
+    @classmethod
+    def _sample(cls, model_type):
+        import os
+
+        backend_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+        with open(os.path.join(backend_dir, cls.SAMPLE_FILES[model_type]), encoding='utf-8') as f:
+            return json.load(f)
+
+    @classmethod
+    def start_background_load(cls, warmup=True):
+        """
+        Carga los modelos y hace una predicción de calentamiento en un hilo aparte
+        para que la aplicación pueda atender rutas CRUD mientras tanto.
+        """
+        if cls._load_thread is not None and cls._load_thread.is_alive():
+            return cls._load_thread
+        cls._load_state = 'loading'
+        cls._load_error = None
+        cls._load_thread = threading.Thread(
+            target=cls._background_load, args=(warmup,), name='ai-model-loader', daemon=True
+        )
+        cls._load_thread.start()
+        return cls._load_thread
+
+    @classmethod
+    def _background_load(cls, warmup):
+        started = time.perf_counter()
+        try:
+            print("🔄 Cargando modelos de IA en segundo plano...")
+            if not cls.load_models():
+                raise Exception("No se pudieron cargar los modelos")
+            models = cls.registry().current
+            if not any(handle.available for handle in models.models.values()):
+                raise Exception("Ningún modelo de IA disponible")
+            if warmup:
+                cls._warmup_results = cls.warm_up()
+            cls._load_state = 'ready'
+            print(f"✅ Modelos de IA listos en {time.perf_counter() - started:.2f}s")
         except Exception as e:
+            cls._load_error = str(e)
+            cls._load_state = 'failed'
             print(f"❌ Error al cargar modelos de IA: {e}")
-            cls._models_loaded = False
-            return False
+
+    @classmethod
+    def warm_up(cls):
+        """Predicción de calentamiento con sample_data_full.json y sample_data_top20.json"""
+        predictors = {
+            'complex': cls.predict_complex,
+            'simple': cls.predict_simple,
+        }
+        models = cls._models()
+        results = {}
+        for model_type, predict in predictors.items():
+            if not models.get(model_type).available:
+                continue
+            t0 = time.perf_counter()
+            try:
+                predict(cls._sample(model_type))
+                results[model_type] = {'status': 'success'}
+            except Exception as e:
+                print(f"Calentamiento del modelo {model_type} falló: {e}")
+                results[model_type] = {'status': 'error', 'error': str(e)}
+            results[model_type]['ms'] = round((time.perf_counter() - t0) * 1000, 3)
+        return results
+
+    @classmethod
+    def is_ready(cls):
+        """Listo para predecir: carga en segundo plano terminada o carga síncrona hecha"""
+        loaded = cls._registry is not None and cls._registry.current is not None
+        return cls._load_state == 'ready' or (cls._load_state == 'idle' and loaded)
+
+    @classmethod
+    def get_load_state(cls):
+        return {
+            'state': 'ready' if cls.is_ready() else cls._load_state,
+            'error': cls._load_error,
+            'warmup': cls._warmup_results
+        }
+
+    @classmethod
+    def _load_artifacts(cls, model_type, stem):
+        """
+        Devuelve (pipeline, compiled, rutas usadas) para un modelo.
+        Con el formato nativo no se carga el pipeline de sklearn.
+        """
+        import os
+
+        label = 'complejo' if model_type == 'complex' else 'sencillo'
+        use_numpy = model_type in settings.AI_NUMPY_TREE_MODELS
+        spec_path = f'{stem}_preprocess.json'
+        booster_path = f'{stem}_booster.ubj'
+        trees_path = f'{stem}_trees.npz'
+        if settings.AI_MODEL_FORMAT == 'native' and os.path.exists(spec_path):
+            try:
+                # Con el evaluador NumPy y los árboles exportados no se importa xgboost
+                if use_numpy and os.path.exists(trees_path):
+                    compiled = CompiledModel.load(spec_path, trees_path=trees_path)
+                    print(f"Modelo {label} cargado (árboles NumPy) desde: {trees_path}")
+                    return None, compiled, [spec_path, trees_path]
+                if os.path.exists(booster_path):
+                    compiled = cls._select_engine(model_type, CompiledModel.load(spec_path, booster_path))
+                    print(f"Modelo {label} cargado (formato nativo) desde: {booster_path}")
+                    return None, compiled, [spec_path, booster_path]
+            except Exception as e:
+                print(f"Error cargando modelo {label} en formato nativo, se usa el pickle: {e}")
+
+        pipeline_path = f'{stem}_pipeline.pkl'
+        if not os.path.exists(pipeline_path):
+            print(f"Archivo no encontrado: {pipeline_path}")
+            return None, None, []
+        try:
+            import joblib
+            import warnings
+
+            # Suprimir warnings de compatibilidad
+            warnings.filterwarnings("ignore", category=UserWarning)
+
+            pipeline = joblib.load(pipeline_path)
+            print(f"Modelo {label} cargado desde: {pipeline_path}")
+        except Exception as e:
+            print(f"Error cargando modelo {label}: {e}")
+            return None, None, []
+        return pipeline, cls._select_engine(model_type, cls._compile_model(model_type, pipeline)), [pipeline_path]
+
+    @staticmethod
+    def _select_engine(model_type, compiled):
+        """
+        Activa el evaluador NumPy si el modelo está en AI_NUMPY_TREE_MODELS, o el
+        booster para lotes en CSR si está en AI_SPARSE_BATCH_MODELS
+        """
+        if compiled is None:
+            return compiled
+        if model_type in settings.AI_NUMPY_TREE_MODELS:
+            try:
+                return compiled.use_numpy_trees()
+            except Exception as e:
+                print(f"Evaluador NumPy no disponible para modelo {model_type}, se usa XGBoost: {e}")
+        if model_type in settings.AI_SPARSE_BATCH_MODELS and compiled.trees is None:
+            try:
+                compiled.use_sparse_booster()
+            except Exception as e:
+                print(f"Ruta dispersa no disponible para modelo {model_type}, se usa la densa: {e}")
+        return compiled
     
     @classmethod
     def get_model_status(cls):
         """Obtener el estado de los modelos"""
-        return {
-            'models_loaded': cls._models_loaded,
-            'complex_model_available': cls._full_pipeline is not None,
-            'simple_model_available': cls._top20_pipeline is not None
+        models = cls.registry().current
+        status = {
+            'models_loaded': models is not None,
+            'load_state': cls.get_load_state(),
+            'model_version': models.version if models is not None else None,
+            'registry': cls.registry().status(),
+            'prediction_cache': cls._prediction_cache.stats(),
+            'recommendations': PreferencesService.get_recommendation_stats(),
+            'micro_batching': cls.get_batching_stats(),
+            'metrics': metrics.summary()
         }
+        for model_type in cls.MODEL_STEMS:
+            handle = models.get(model_type) if models is not None else ModelHandle(model_type)
+            status[f'{model_type}_model_available'] = handle.available
+            status[f'{model_type}_fast_path'] = handle.compiled is not None
+            status[f'{model_type}_format'] = handle.format
+            status[f'{model_type}_engine'] = handle.engine
+            status[f'{model_type}_sparse_batch'] = (
+                handle.compiled is not None and handle.compiled.sparse_booster is not None
+            )
+        return status
+
+    @staticmethod
+    def _compile_model(model_type, pipeline):
+        """Compila encoder + booster; si no es posible se usa el pipeline completo"""
+        if pipeline is None:
+            return None
+        try:
+            return CompiledModel.from_pipeline(model_type, pipeline)
+        except Exception as e:
+            print(f"Ruta rápida no disponible para modelo {model_type}: {e}")
+            return None
+
+    @classmethod
+    def _artifacts_version(cls, paths):
+        if not paths:
+            return None
+        version = hashlib.sha1()
+        for path in paths:
+            version.update(cls._file_digest(path).encode())
+        return version.hexdigest()[:12]
+
+    @staticmethod
+    def _file_digest(path):
+        """Hash del contenido de un artefacto para versionar el modelo"""
+        digest = hashlib.sha1()
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(1 << 20), b''):
+                digest.update(block)
+        return digest.hexdigest()
+
+    @staticmethod
+    def _normalize_value(value):
+        """Normaliza tipos para que 7, 7.0 y np.float64(7) generen la misma llave"""
+        if value is None or isinstance(value, bool):
+            return value
+        if isinstance(value, (int, float)) or hasattr(value, 'item'):
+            try:
+                number = float(value)
+            except (TypeError, ValueError):
+                return str(value)
+            return None if math.isnan(number) else number
+        return value
+
+    @classmethod
+    def _cache_key(cls, handle, data):
+        """Llave estable: modelo, versión y el diccionario ordenado y normalizado"""
+        canonical = json.dumps(
+            [handle.model_type, handle.version,
+             sorted((str(k), cls._normalize_value(v)) for k, v in data.items())],
+            separators=(',', ':'), default=str
+        )
+        return hashlib.sha1(canonical.encode()).hexdigest()
     
     @classmethod
-    def predict_complex(cls, data):
-        """Predicción usando el modelo complejo (todas las características)"""
-        if not cls._models_loaded:
-            cls.load_models()
-        
-        if cls._full_pipeline is None:
-            raise Exception("Modelo complejo no disponible")
-        
+    def _get_executor(cls):
+        if cls._executor is None:
+            with cls._executor_lock:
+                if cls._executor is None:
+                    cls._executor = ThreadPoolExecutor(
+                        max_workers=settings.AI_PREDICT_WORKERS,
+                        thread_name_prefix='ai-predict'
+                    )
+        return cls._executor
+
+    @classmethod
+    def jobs(cls):
+        if cls._jobs is None:
+            with cls._jobs_lock:
+                if cls._jobs is None:
+                    cls._jobs = JobQueue(
+                        settings.AI_JOBS_DIR,
+                        cls._score_job_rows,
+                        workers=settings.AI_JOBS_WORKERS,
+                        max_pending=settings.AI_JOBS_MAX_PENDING,
+                        chunk_size=settings.AI_JOBS_CHUNK_SIZE,
+                        max_rows=settings.AI_JOBS_MAX_ROWS,
+                        heartbeat_interval=settings.AI_JOBS_HEARTBEAT_SECONDS,
+                        heartbeat_timeout=settings.AI_JOBS_HEARTBEAT_TIMEOUT,
+                    )
+        return cls._jobs
+
+    @classmethod
+    def _score_job_rows(cls, rows, model):
+        """Un bloque de un trabajo se valúa igual que /api/ai/predict/batch"""
+        return cls.predict_batch(rows, model=model)['results']
+
+    @classmethod
+    def get_batching_stats(cls):
+        models = cls.registry().current
+        if models is None:
+            return {}
+        return {
+            model_type: handle.batcher.stats()
+            for model_type, handle in models.models.items()
+            if handle.batcher is not None
+        }
+
+    @classmethod
+    def metrics_text(cls):
+        """Métricas en formato Prometheus, con los indicadores de caché, batcher y modelos"""
+        lines = []
+
+        def gauge(name, help_text, samples, kind='gauge'):
+            if not samples:
+                return
+            lines.append(f'# HELP {name} {help_text}')
+            lines.append(f'# TYPE {name} {kind}')
+            for labels, value in samples:
+                label_text = ','.join(f'{k}="{v}"' for k, v in labels)
+                lines.append(f'{name}{{{label_text}}} {value}' if label_text else f'{name} {value}')
+
+        cache = cls._prediction_cache.stats()
+        gauge('ai_prediction_cache_size', 'Entradas en la caché de predicciones', [((), cache['size'])])
+        gauge('ai_prediction_cache_hits_total', 'Aciertos de la caché de predicciones',
+              [((), cache['hits'])], 'counter')
+        gauge('ai_prediction_cache_misses_total', 'Fallos de la caché de predicciones',
+              [((), cache['misses'])], 'counter')
+
+        recommendations = PreferencesService.get_recommendation_stats()
+        cache = recommendations['cache']
+        gauge('recommendation_cache_size', 'Entradas en la caché de recomendaciones', [((), cache['size'])])
+        gauge('recommendation_cache_hits_total', 'Aciertos de la caché de recomendaciones',
+              [((), cache['hits'])], 'counter')
+        gauge('recommendation_cache_misses_total', 'Fallos de la caché de recomendaciones',
+              [((), cache['misses'])], 'counter')
+        gauge('recommendation_cache_hit_ratio', 'Proporción de aciertos de la caché de recomendaciones',
+              [((), cache['hit_rate'])])
+        gauge('house_index_houses', 'Casas disponibles en el índice en memoria',
+              [((), recommendations['house_index']['houses'])])
+
+        batching = cls.get_batching_stats()
+        gauge('ai_microbatch_queue_depth', 'Filas esperando en la cola del micro-batcher',
+              [((('model', m),), s['queue_depth']) for m, s in batching.items()])
+        gauge('ai_microbatch_batches_total', 'Lotes enviados por el micro-batcher',
+              [((('model', m),), s['batches']) for m, s in batching.items()], 'counter')
+
+        models = cls.registry().current
+        if models is not None:
+            gauge('ai_model_info', 'Versión y motor de cada modelo cargado', [
+                ((('model', m), ('version', h.version or ''), ('engine', h.engine or h.format or '')), 1)
+                for m, h in models.models.items() if h.available
+            ])
+        return metrics.render_prometheus(lines)
+
+    @staticmethod
+    def _instrumented_predict(model_type, compiled):
+        """predict_matrix del MicroBatcher, registrando el tamaño de cada lote"""
+        def predict_matrix(X):
+            metrics.observe_batch(model_type, len(X), 'microbatch')
+            return compiled.predict_matrix(X)
+        return predict_matrix
+
+    @classmethod
+    def _predict_single(cls, handle, data, df=None, use_cache=True, use_batcher=True):
+        """
+        Predicción de una casa con caché; usa la ruta rápida si está compilada.
+        df permite reutilizar un DataFrame ya construido para la ruta con pipeline.
+        Cada etapa (preprocess, dataframe, predict) alimenta las métricas del modelo.
+        """
+        model_type, pipeline, compiled = handle.model_type, handle.pipeline, handle.compiled
+        started = time.perf_counter()
+        key = cls._cache_key(handle, data) if use_cache else None
+        cached = cls._prediction_cache.get(key) if use_cache else None
+        if cached is not None:
+            metrics.inc('ai_predictions_total', model=model_type, source='cache')
+            return dict(cached)
+
+        # Validar campos antes de cualquier trabajo del modelo (ValueError -> 400)
+        if compiled is not None:
+            try:
+                X = compiled.encoder.encode(data)
+            except ValueError:
+                metrics.inc('ai_prediction_errors_total', model=model_type, kind='validation')
+                raise
+            t0 = time.perf_counter()
+            metrics.observe_stage(model_type, 'preprocess', t0 - started)
+
         try:
-            import pandas as pd
-            import numpy as np
-            
-            # Convertir datos a DataFrame
-            df = pd.DataFrame([data])
-            
-            # Realizar predicción
-            prediction = cls._full_pipeline.predict(df)[0]
-            
-            return {
-                'model_type': 'complex',
+            if handle.batcher is not None and use_batcher:
+                # Se une a las peticiones concurrentes en una sola llamada al booster
+                prediction = handle.batcher.predict(X)
+            elif compiled is not None:
+                prediction = compiled.predict_matrix(X)[0]
+            else:
+                import pandas as pd
+
+                # Convertir datos a DataFrame
+                t0 = time.perf_counter()
+                if df is None:
+                    df = pd.DataFrame([data])
+                    metrics.observe_stage(model_type, 'dataframe', time.perf_counter() - t0)
+
+                # Preprocesar y predecir por separado para medir cada etapa
+                t0 = time.perf_counter()
+                Xt = pipeline[:-1].transform(df)
+                metrics.observe_stage(model_type, 'preprocess', time.perf_counter() - t0)
+                t0 = time.perf_counter()
+                prediction = pipeline[-1].predict(Xt)[0]
+            metrics.observe_stage(model_type, 'predict', time.perf_counter() - t0)
+
+            result = {
+                'model_type': model_type,
                 'predicted_price': float(prediction),
                 'status': 'success'
             }
-            
+
         except Exception as e:
-            raise Exception(f"Error en predicción compleja: {str(e)}")
+            metrics.inc('ai_prediction_errors_total', model=model_type, kind='model')
+            label = 'compleja' if model_type == 'complex' else 'sencilla'
+            raise Exception(f"Error en predicción {label}: {str(e)}")
+
+        if use_cache:
+            cls._prediction_cache.set(key, result)
+        metrics.inc('ai_predictions_total', model=model_type, source='model')
+        metrics.observe_stage(model_type, 'total', time.perf_counter() - started)
+        return dict(result)
+
+    @classmethod
+    def _model_columns(cls, handle):
+        """Columnas que el modelo usa (limita qué características derivadas se calculan)"""
+        if handle.compiled is not None:
+            return frozenset(handle.compiled.encoder.required_columns)
+        if handle.pipeline is not None:
+            return frozenset(cls._required_columns(handle.pipeline))
+        return frozenset()
+
+    @classmethod
+    def predict_complex(cls, data):
+        """Predicción usando el modelo complejo (todas las características)"""
+        handle = cls._models().get('complex')
+        if not handle.available:
+            raise Exception("Modelo complejo no disponible")
+        
+        data = engineer_record(data, cls._model_columns(handle))
+        return cls._predict_single(handle, data)
     
     @classmethod
     def predict_simple(cls, data):
         """Predicción usando el modelo sencillo (top 20 características)"""
-        if not cls._models_loaded:
-            cls.load_models()
-        
-        if cls._top20_pipeline is None:
+        handle = cls._models().get('simple')
+        if not handle.available:
             raise Exception("Modelo sencillo no disponible")
         
-        try:
-            import pandas as pd
-            import numpy as np
-            
-            # Convertir datos a DataFrame
-            df = pd.DataFrame([data])
-            
-            # Realizar predicción
-            prediction = cls._top20_pipeline.predict(df)[0]
-            
-            return {
-                'model_type': 'simple',
-                'predicted_price': float(prediction),
-                'status': 'success'
-            }
-            
-        except Exception as e:
-            raise Exception(f"Error en predicción sencilla: {str(e)}")
+        data = engineer_record(data, cls._model_columns(handle))
+        return cls._predict_single(handle, data)
     
     @classmethod
     def predict_both(cls, data):
-        """Predicción usando ambos modelos para comparar"""
-        if not cls._models_loaded:
-            cls.load_models()
-        
-        results = {}
-        
-        # Predicción compleja
-        if cls._full_pipeline is not None:
+        """
+        Predicción usando ambos modelos para comparar.
+        El DataFrame se construye una sola vez y los modelos se evalúan en paralelo.
+        """
+        # Ambos modelos salen del mismo ModelSet aunque llegue una recarga en medio
+        models = cls._models()
+        handles = [
+            models.get(model_type)
+            for model_type in ('complex', 'simple')
+            if models.get(model_type).available
+        ]
+        if not handles:
+            raise Exception("Ningún modelo de IA disponible")
+
+        started = time.perf_counter()
+
+        # Características derivadas (TotalSF, HouseAge, ...) una sola vez para ambos modelos
+        needed = set().union(*(cls._model_columns(handle) for handle in handles))
+        data = engineer_record(data, needed)
+
+        # Preprocesamiento compartido para los modelos que usan el pipeline completo
+        df = None
+        if any(handle.compiled is None for handle in handles):
+            import pandas as pd
+            df = pd.DataFrame([data])
+
+        def run(handle):
+            t0 = time.perf_counter()
             try:
-                complex_result = cls.predict_complex(data)
-                results['complex_prediction'] = complex_result
+                return cls._predict_single(handle, data, df), None, time.perf_counter() - t0
             except Exception as e:
-                results['complex_error'] = str(e)
-        
-        # Predicción sencilla
-        if cls._top20_pipeline is not None:
+                return None, str(e), time.perf_counter() - t0
+
+        # El último modelo corre en el hilo actual para ahorrar un cambio de hilo
+        executor = cls._get_executor() if len(handles) > 1 else None
+        futures = [executor.submit(run, handle) for handle in handles[:-1]]
+        last = run(handles[-1])
+        outcomes = [f.result() for f in futures] + [last]
+
+        results = {}
+        timings = {}
+        for handle, (prediction, error, elapsed) in zip(handles, outcomes):
+            if error is None:
+                results[f'{handle.model_type}_prediction'] = prediction
+            else:
+                results[f'{handle.model_type}_error'] = error
+            timings[handle.model_type] = round(elapsed * 1000, 3)
+
+        timings['total'] = round((time.perf_counter() - started) * 1000, 3)
+        results['timings_ms'] = timings
+        return results
+    
+    @classmethod
+    def _required_columns(cls, pipeline):
+        """Columnas de entrada que el preprocesador del pipeline realmente usa"""
+        pre = pipeline.steps[0][1]
+        required = []
+        for _, transformer, columns in getattr(pre, 'transformers_', []):
+            if transformer == 'drop':
+                continue
+            required.extend(c for c in columns if c not in required)
+        return required
+
+    @classmethod
+    def _predict_rows(cls, handle, rows):
+        """
+        Predice varias filas con una sola matriz y una sola llamada a predict.
+        Devuelve (predicciones, errores) alineados con rows; si el lote falla
+        se parte para reportar el error de cada fila.
+        """
+        import pandas as pd
+
+        model_type, pipeline, compiled = handle.model_type, handle.pipeline, handle.compiled
+        predictions = [None] * len(rows)
+        errors = [None] * len(rows)
+
+        if compiled is not None:
+            validate = compiled.encoder.validate
+
+            def predict(chunk):
+                t0 = time.perf_counter()
+                # Lotes grandes en CSR: sin la columna densa por categoría
+                if compiled.sparse_booster is not None and len(chunk) >= settings.AI_SPARSE_BATCH_MIN_ROWS:
+                    X = compiled.encoder.encode_sparse(chunk)
+                    t1 = time.perf_counter()
+                    values = compiled.predict_sparse(X)
+                else:
+                    X = compiled.encoder.encode_many(chunk)
+                    t1 = time.perf_counter()
+                    values = compiled.predict_matrix(X)
+                metrics.observe_stage(model_type, 'batch_preprocess', t1 - t0)
+                metrics.observe_stage(model_type, 'batch_predict', time.perf_counter() - t1)
+                return values
+        else:
+            required = cls._required_columns(pipeline)
+
+            def validate(row):
+                missing = [c for c in required if c not in row]
+                if missing:
+                    raise ValueError(f"Columnas faltantes: {', '.join(missing)}")
+
+            def predict(chunk):
+                t0 = time.perf_counter()
+                df = pd.DataFrame(chunk)
+                t1 = time.perf_counter()
+                Xt = pipeline[:-1].transform(df)
+                t2 = time.perf_counter()
+                values = pipeline[-1].predict(Xt)
+                metrics.observe_stage(model_type, 'batch_dataframe', t1 - t0)
+                metrics.observe_stage(model_type, 'batch_preprocess', t2 - t1)
+                metrics.observe_stage(model_type, 'batch_predict', time.perf_counter() - t2)
+                return values
+
+        valid_idx = []
+        for i, row in enumerate(rows):
+            try:
+                validate(row)
+                valid_idx.append(i)
+            except ValueError as e:
+                errors[i] = str(e)
+
+        if not valid_idx:
+            return predictions, errors
+        metrics.observe_batch(model_type, len(valid_idx), 'batch')
+
+        # Si un lote falla se parte a la mitad hasta aislar las filas con error,
+        # así unas pocas filas malas no obligan a predecir fila por fila
+        pending = [valid_idx]
+        while pending:
+            chunk = pending.pop()
             try:
-                simple_result = cls.predict_simple(data)
-                results['simple_prediction'] = simple_result
+                values = predict([rows[i] for i in chunk])
+                for i, value in zip(chunk, values):
+                    predictions[i] = float(value)
             except Exception as e:
-                results['simple_error'] = str(e)
-        
-        if not results:
+                if len(chunk) == 1:
+                    errors[chunk[0]] = str(e)
+                else:
+                    mid = len(chunk) // 2
+                    pending.extend((chunk[mid:], chunk[:mid]))
+
+        return predictions, errors
+
+    @classmethod
+    def predict_batch(cls, rows, model='both'):
+        """
+        Predicción por lotes: una matriz y un predict por modelo.
+        model: 'complex', 'simple' o 'both'. Los errores se reportan por fila.
+        """
+        if model not in ('complex', 'simple', 'both'):
+            raise ValueError("Modelo inválido: usa 'complex', 'simple' o 'both'")
+        if not isinstance(rows, list) or not rows:
+            raise ValueError("Se requiere una lista de casas no vacía")
+
+        models = cls._models()
+        handles = [
+            models.get(model_type)
+            for model_type in ('complex', 'simple')
+            if model in (model_type, 'both')
+        ]
+        if not any(handle.available for handle in handles):
             raise Exception("Ningún modelo de IA disponible")
-        
-        return results
-    
+
+        # Solo los objetos no vacíos llegan a los modelos
+        results = []
+        valid_idx = []
+        for i, row in enumerate(rows):
+            results.append({'index': i, 'predictions': {}, 'errors': {}})
+            if isinstance(row, dict) and row:
+                valid_idx.append(i)
+            else:
+                results[i]['errors']['input'] = "Cada casa debe ser un objeto JSON no vacío"
+        valid_rows = [rows[i] for i in valid_idx]
+
+        # Características derivadas de todo el lote en una pasada por columna
+        needed = set().union(*(cls._model_columns(handle) for handle in handles if handle.available))
+        valid_rows = engineer_records(valid_rows, needed)
+
+        for handle in handles:
+            model_type = handle.model_type
+            if not handle.available:
+                for i in valid_idx:
+                    results[i]['errors'][model_type] = f"Modelo {model_type} no disponible"
+                continue
+            predictions, errors = cls._predict_rows(handle, valid_rows)
+            for i, prediction, error in zip(valid_idx, predictions, errors):
+                if error is not None:
+                    results[i]['errors'][model_type] = error
+                else:
+                    results[i]['predictions'][model_type] = prediction
+
+        for r in results:
+            if not r['errors']:
+                r['status'] = 'success'
+            elif r['predictions']:
+                r['status'] = 'partial'
+            else:
+                r['status'] = 'error'
+
+        return {
+            'model_type': model,
+            'count': len(results),
+            'success_count': sum(1 for r in results if r['status'] == 'success'),
+            'error_count': sum(1 for r in results if r['status'] != 'success'),
+            'results': results
+        }
+
+    @classmethod
+    def house_features(cls, house, handle):
+        """
+        Diccionario de entrada del modelo a partir de una fila de vendor_houses
+        (solo las características que el modelo conoce) y su hash.
+        """
+        return cls.house_features_many([house], handle)[0]
+
+    @classmethod
+    def house_features_many(cls, houses, handle):
+        """
+        house_features para varias casas. Las características derivadas guardadas
+        en la fila se reutilizan; solo se calculan (vectorizadas) las que faltan.
+        """
+        if handle.compiled is not None:
+            known = handle.compiled.encoder.known_columns
+        else:
+            known = set(cls._required_columns(handle.pipeline))
+        needed = cls._model_columns(handle)
+        stored = [
+            {feature: getattr(house, column)
+             for column, feature in HOUSE_FEATURE_COLUMNS.items()
+             if feature in known or feature in DERIVED_FEATURES}
+            for house in houses
+        ]
+        present = [{k: v for k, v in row.items() if v is not None} for row in stored]
+        derived = engineer_records(present, needed, overwrite=False)
+
+        result = []
+        for row, filled in zip(stored, derived):
+            features = {k: v for k, v in row.items() if k in known}
+            features.update((k, filled[k]) for k in needed if k in DERIVED_FEATURES and k in filled)
+            canonical = json.dumps(
+                sorted((k, cls._normalize_value(v)) for k, v in features.items()),
+                separators=(',', ':'), default=str
+            )
+            result.append((features, hashlib.sha1(canonical.encode()).hexdigest()))
+        return result
+
+    @classmethod
+    def score_houses(cls, houses, force=False):
+        """
+        Llena predicted_price, model_version, scored_at y scored_features_hash
+        de objetos VendorHouse con un solo predict. No hace commit.
+        """
+        from datetime import datetime, timezone
+
+        result = {'scored': 0, 'skipped': 0, 'failed': 0}
+        if not cls.is_ready():
+            result['skipped'] = len(houses)
+            return result
+        handle = cls._models().get(settings.HOUSE_VALUATION_MODEL)
+        if not handle.available:
+            result['skipped'] = len(houses)
+            return result
+
+        version = f"{handle.model_type}-{handle.version}"
+        pending = []
+        for house, (features, features_hash) in zip(houses, cls.house_features_many(houses, handle)):
+            # Las derivadas calculadas aquí se guardan en la fila para no repetirlas
+            for feature, column in HOUSE_DERIVED_COLUMNS.items():
+                if getattr(house, column) is None and features.get(feature) is not None:
+                    setattr(house, column, features[feature])
+            if (not force and house.predicted_price is not None
+                    and house.model_version == version
+                    and house.scored_features_hash == features_hash):
+                result['skipped'] += 1
+                continue
+            pending.append((house, features, features_hash))
+        if not pending:
+            return result
+
+        predictions, errors = cls._predict_rows(handle, [f for _, f, _ in pending])
+        now = datetime.now(timezone.utc).replace(tzinfo=None)
+        for (house, _, features_hash), prediction, error in zip(pending, predictions, errors):
+            if error is not None:
+                print(f"No se pudo valuar la casa {house.house_id}: {error}")
+                result['failed'] += 1
+                continue
+            house.predicted_price = prediction
+            house.model_version = version
+            house.scored_at = now
+            house.scored_features_hash = features_hash
+            result['scored'] += 1
+        return result
+
     @classmethod
     def predict_house_price(cls, house_data):
         """Predicción de precio para una casa existente en la base de datos"""
@@ -622,7 +1753,7 @@ class AIService:
             excluded_fields = [
                 'house_id', 'vendor_id', 'title', 'description', 
                 'images', 'features', 'status', 'is_featured', 
-                'contact_phone', 'contact_email'
+                'contact_phone', 'contact_email', *HOUSE_VALUATION_FIELDS
             ]
             
             # Crear datos limpios para predicción
@@ -636,4 +1767,24 @@ class AIService:
         except Exception as e:
             raise Exception(f"Error al predecir precio de casa: {str(e)}")
 
-        
\ No newline at end of file
+        
+
+def configure_services(config):
+    """
+    create_app: los servicios pasan a leer la configuración de la app y se
+    rehacen las cachés e intervalos que se fijaron al importar con la de Config
+    """
+    settings.use(config)
+    house_index.resync_interval = float(settings.HOUSE_INDEX_RESYNC_SECONDS)
+    client_index.resync_interval = float(settings.CLIENT_INDEX_RESYNC_SECONDS)
+    house_index.invalidate()
+    client_index.invalidate()
+    PreferencesService._recommendation_cache = TTLCache(
+        max_size=settings.RECOMMENDATIONS_CACHE_SIZE,
+        ttl=settings.RECOMMENDATIONS_CACHE_TTL
+    )
+    PreferencesService._match_statements = TTLCache(max_size=settings.MATCH_STATEMENT_CACHE_SIZE, ttl=float('inf'))
+    AIService._prediction_cache = TTLCache(
+        max_size=settings.AI_PREDICTION_CACHE_SIZE,
+        ttl=settings.AI_PREDICTION_CACHE_TTL
+    )
@@ -0,0 +1,30 @@
+"""
+Configuración que leen los servicios (app/services.py).
+
+create_app la apunta a app.config, así que las rutas (current_app.config) y
+los servicios, también desde sus hilos de fondo sin contexto de app, leen
+los mismos valores. Sin app (scripts, pruebas unitarias) se leen los de Config.
+"""
+from config import Config
+
+
+class Settings:
+
+    def __init__(self, defaults=Config):
+        self._defaults = defaults
+        self._config = {}
+
+    def use(self, config):
+        """Lee de este mapeo (app.config); None vuelve a los valores de Config"""
+        self._config = config if config is not None else {}
+
+    def __getattr__(self, name):
+        if name.startswith('_'):
+            raise AttributeError(name)
+        try:
+            return self._config[name]
+        except KeyError:
+            return getattr(self._defaults, name)
+
+
+settings = Settings()
@@ -0,0 +1,41 @@
+#!/usr/bin/env python3
+"""
+Valúa las casas de vendor_houses con el modelo HOUSE_VALUATION_MODEL y guarda
+predicted_price, model_version y scored_at. Procesa por bloques con un predict
+por bloque y solo re-evalúa filas nuevas, con columnas de entrada modificadas
+o valuadas con otra versión del modelo.
+
+Uso:
+    python backfill_predictions.py [--chunk-size 500] [--force]
+"""
+import argparse
+import time
+
+from app import create_app
+from app.services import HouseService
+from config import Config
+
+
+class BackfillConfig(Config):
+    # Carga síncrona: el job necesita los modelos antes de empezar
+    AI_BACKGROUND_LOAD = False
+    DEBUG = False
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--chunk-size', type=int, default=500)
+    parser.add_argument('--force', action='store_true', help='Re-evaluar todas las casas')
+    args = parser.parse_args()
+
+    app = create_app(BackfillConfig)
+    with app.app_context():
+        started = time.perf_counter()
+        totals = HouseService.backfill_predictions(chunk_size=args.chunk_size, force=args.force)
+        elapsed = time.perf_counter() - started
+    print(f"Casas revisadas: {totals['scanned']}, valuadas: {totals['scored']}, "
+          f"sin cambios: {totals['skipped']}, con error: {totals['failed']} ({elapsed:.2f}s)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,290 @@
+#!/usr/bin/env python3
+"""
+Benchmark reproducible de inferencia de AIService (en proceso, sin HTTP).
+
+Reproduce las filas de Model/Data/test.csv (con la limpieza e ingeniería de
+características del notebook) y los payloads sample_data_*.json contra
+predict_simple, predict_complex, predict_both y predict_batch, con varios
+tamaños de lote y números de hilos. Por cada combinación reporta filas/s,
+llamadas/s, errores y latencia por llamada (p50/p95/p99/max).
+
+La caché de predicciones se desactiva para medir el modelo y no la caché.
+El resultado es un JSON con metadatos (commit, versiones, versión de los
+modelos); con --baseline se compara contra un JSON anterior y el proceso
+termina con código 1 si algún caso empeora más de --max-regression.
+
+Uso:
+    python benchmarks/inference.py --output bench.json
+    python benchmarks/inference.py --workloads simple batch --batch-sizes 1 100 1000 \\
+        --threads 1 4 --duration 3 --baseline bench_main.json
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import threading
+import time
+import warnings
+
+import numpy as np
+
+BACKEND_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+TEST_CSV = os.path.join(BACKEND_DIR, '..', 'Model', 'Data', 'test.csv')
+SAMPLE_FILES = {
+    'simple': ['sample_data_top20.json', 'sample_data_full.json'],
+    'complex': ['sample_data_full.json'],
+    'both': ['sample_data_full.json'],
+}
+WORKLOADS = ('simple', 'complex', 'both', 'batch')
+
+
+def load_test_rows(path=TEST_CSV, limit=None):
+    """Filas de test.csv con la limpieza e ingeniería de características del notebook"""
+    import pandas as pd
+    from app.features import prepare_kaggle_frame
+
+    return prepare_kaggle_frame(pd.read_csv(path, nrows=limit)).to_dict('records')
+
+
+def load_samples(model):
+    samples = []
+    for name in SAMPLE_FILES[model]:
+        with open(os.path.join(BACKEND_DIR, name), encoding='utf-8') as f:
+            samples.append(json.load(f))
+    return samples
+
+
+def percentile(values, q):
+    return round(float(np.percentile(values, q)), 4) if len(values) else None
+
+
+def measure(call, payloads, threads, duration, rows_per_call, warmup=5):
+    """
+    Ejecuta call(payload) desde `threads` hilos durante `duration` segundos.
+    Cada hilo recorre los payloads desde un desplazamiento distinto.
+    """
+    for payload in payloads[:warmup]:
+        try:
+            call(payload)
+        except Exception:
+            pass
+
+    latencies = [[] for _ in range(threads)]
+    errors = [0] * threads
+    first_error = []
+    barrier = threading.Barrier(threads + 1)
+    deadline = [0.0]
+
+    def worker(n):
+        local = latencies[n]
+        i = n * max(1, len(payloads) // threads)
+        barrier.wait()
+        end = deadline[0]
+        while True:
+            t0 = time.perf_counter()
+            if t0 >= end:
+                return
+            try:
+                call(payloads[i % len(payloads)])
+                local.append(time.perf_counter() - t0)
+            except Exception as e:
+                errors[n] += 1
+                if not first_error:
+                    first_error.append(str(e))
+            i += 1
+
+    pool = [threading.Thread(target=worker, args=(n,)) for n in range(threads)]
+    for thread in pool:
+        thread.start()
+    deadline[0] = time.perf_counter() + duration
+    started = time.perf_counter()
+    barrier.wait()
+    for thread in pool:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    ms = np.array([lat for local in latencies for lat in local]) * 1000
+    calls = len(ms)
+    return {
+        'calls': calls,
+        'errors': sum(errors),
+        'first_error': first_error[0] if first_error else None,
+        'seconds': round(elapsed, 3),
+        'calls_per_s': round(calls / elapsed, 1),
+        'rows_per_s': round(calls * rows_per_call / elapsed, 1),
+        'latency_ms': {
+            'mean': round(float(ms.mean()), 4) if calls else None,
+            'p50': percentile(ms, 50),
+            'p95': percentile(ms, 95),
+            'p99': percentile(ms, 99),
+            'max': round(float(ms.max()), 4) if calls else None,
+        },
+    }
+
+
+def run_suite(args, AIService):
+    test_rows = load_test_rows(limit=args.rows)
+    results = []
+
+    for workload in args.workloads:
+        if workload == 'batch':
+            for model in args.batch_models:
+                pool = test_rows + load_samples(model)
+                for batch_size in args.batch_sizes:
+                    batches = [
+                        [pool[(start + k) % len(pool)] for k in range(batch_size)]
+                        for start in range(0, len(pool), batch_size)
+                    ]
+                    for threads in args.threads:
+                        result = measure(
+                            lambda rows, m=model: AIService.predict_batch(rows, model=m),
+                            batches, threads, args.duration, batch_size
+                        )
+                        results.append({'workload': 'batch', 'model': model,
+                                        'batch_size': batch_size, 'threads': threads, **result})
+                        _print_row(results[-1])
+            continue
+
+        call = getattr(AIService, f'predict_{workload}')
+        pool = load_samples(workload) + test_rows
+        for threads in args.threads:
+            result = measure(call, pool, threads, args.duration, 1)
+            results.append({'workload': workload, 'model': workload,
+                            'batch_size': 1, 'threads': threads, **result})
+            _print_row(results[-1])
+    return results
+
+
+def _print_row(result):
+    latency = result['latency_ms']
+    print(f"{result['workload']:>8} {result['model']:>8} batch={result['batch_size']:<6} "
+          f"threads={result['threads']:<3} rows/s={result['rows_per_s']:>10} "
+          f"p50={latency['p50']} p95={latency['p95']} p99={latency['p99']} errors={result['errors']}",
+          file=sys.stderr)
+
+
+def _key(result):
+    return f"{result['workload']}/{result['model']}/b{result['batch_size']}/t{result['threads']}"
+
+
+def compare(report, baseline, max_regression):
+    """Compara filas/s y p95 contra un reporte anterior; devuelve la lista de regresiones"""
+    previous = {_key(r): r for r in baseline.get('results', [])}
+    regressions = []
+    for result in report['results']:
+        old = previous.get(_key(result))
+        if old is None or not old['rows_per_s'] or not result['calls']:
+            continue
+        throughput = result['rows_per_s'] / old['rows_per_s'] - 1
+        p95_old, p95_new = old['latency_ms']['p95'], result['latency_ms']['p95']
+        latency = p95_new / p95_old - 1 if p95_old else 0.0
+        result['vs_baseline'] = {'rows_per_s': round(throughput, 4), 'p95': round(latency, 4)}
+        if throughput < -max_regression or latency > max_regression:
+            regressions.append({'case': _key(result), **result['vs_baseline']})
+    return regressions
+
+
+def _git_commit():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], cwd=BACKEND_DIR,
+                                       stderr=subprocess.DEVNULL, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _metadata(args, AIService):
+    import pandas
+    import sklearn
+
+    try:
+        import xgboost
+        xgboost_version = xgboost.__version__
+    except ImportError:
+        xgboost_version = None
+    status = AIService.get_model_status()
+    return {
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        'git_commit': _git_commit(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'numpy': np.__version__,
+        'pandas': pandas.__version__,
+        'sklearn': sklearn.__version__,
+        'xgboost': xgboost_version,
+        'model_version': status['model_version'],
+        'models': {m: {'format': status[f'{m}_format'], 'engine': status[f'{m}_engine']}
+                   for m in AIService.MODEL_STEMS},
+        'config': {
+            'format': args.format,
+            'numpy_trees': args.numpy_trees,
+            'microbatch': args.microbatch,
+            'duration': args.duration,
+            'rows': args.rows,
+        },
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--workloads', nargs='+', choices=WORKLOADS, default=list(WORKLOADS))
+    # Un lote que falla se parte en mitades para reportar el error por fila: con un
+    # modelo que falla siempre (complex) un lote grande tarda mucho; se pide explícito
+    parser.add_argument('--batch-models', nargs='+', choices=('simple', 'complex', 'both'),
+                        default=['simple'])
+    parser.add_argument('--batch-sizes', type=int, nargs='+', default=[1, 10, 100, 1000])
+    parser.add_argument('--threads', type=int, nargs='+', default=[1, 4, 16])
+    parser.add_argument('--duration', type=float, default=2.0, help='Segundos por caso')
+    parser.add_argument('--rows', type=int, default=None, help='Filas de test.csv (por defecto todas)')
+    parser.add_argument('--format', choices=('native', 'pickle'), default='native')
+    parser.add_argument('--numpy-trees', nargs='*', default=[], metavar='MODEL',
+                        help='Modelos evaluados con el evaluador NumPy')
+    parser.add_argument('--microbatch', nargs='*', default=['simple'], metavar='MODEL',
+                        help='Modelos con micro-batching (vacío para desactivarlo)')
+    parser.add_argument('--output', help='Archivo JSON de salida (por defecto stdout)')
+    parser.add_argument('--baseline', help='Reporte JSON anterior con el que comparar')
+    parser.add_argument('--max-regression', type=float, default=0.15,
+                        help='Empeoramiento relativo tolerado en filas/s y p95 (0.15 = 15%%)')
+    args = parser.parse_args()
+
+    # Config lee el entorno al importarse: se fija antes de importar la app
+    os.environ.update(
+        AI_PREDICTION_CACHE_SIZE='0',
+        AI_MODEL_FORMAT=args.format,
+        AI_NUMPY_TREE_MODELS=','.join(args.numpy_trees),
+        AI_MICROBATCH_MODELS=','.join(args.microbatch),
+        AI_METRICS_ENABLED='false',
+    )
+    warnings.filterwarnings('ignore')
+    sys.path.insert(0, BACKEND_DIR)
+    from app.services import AIService
+
+    if not AIService.load_models():
+        sys.exit('No se pudieron cargar los modelos')
+
+    report = {'meta': _metadata(args, AIService), 'results': run_suite(args, AIService)}
+    exit_code = 0
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            baseline = json.load(f)
+        report['baseline'] = {'file': args.baseline, 'git_commit': baseline.get('meta', {}).get('git_commit'),
+                              'max_regression': args.max_regression}
+        report['regressions'] = compare(report, baseline, args.max_regression)
+        for regression in report['regressions']:
+            print(f"REGRESIÓN {regression['case']}: rows/s {regression['rows_per_s']:+.1%}, "
+                  f"p95 {regression['p95']:+.1%}", file=sys.stderr)
+        exit_code = 1 if report['regressions'] else 0
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(text + '\n')
+    else:
+        print(text)
+    sys.exit(exit_code)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+"""
+Mide el servidor pre-fork (gunicorn.conf.py) con 1..N workers:
+  - memoria por proceso (RSS, PSS y privada) leída de /proc/<pid>/smaps_rollup;
+    PSS reparte las páginas compartidas copy-on-write entre los procesos
+  - throughput y latencia de POST /api/ai/predict/simple
+
+Solo Linux. Usa una base SQLite temporal y desactiva la caché de predicciones
+para medir el modelo y no la caché.
+
+Uso:
+    python benchmarks/prefork.py --workers 1 2 4 --clients 8 --duration 10 [--output prefork.json]
+"""
+import argparse
+import http.client
+import json
+import multiprocessing
+import os
+import signal
+import subprocess
+import sys
+import tempfile
+import time
+
+BACKEND_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+SAMPLE_FILE = os.path.join(BACKEND_DIR, 'sample_data_top20.json')
+
+
+def _smaps_rollup(pid):
+    """Rss, Pss y memoria privada en MB de un proceso"""
+    values = {}
+    with open(f'/proc/{pid}/smaps_rollup') as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) == 3 and parts[2] == 'kB':
+                values[parts[0].rstrip(':')] = int(parts[1]) / 1024
+    private = values.get('Private_Clean', 0) + values.get('Private_Dirty', 0)
+    return {
+        'rss_mb': round(values.get('Rss', 0), 1),
+        'pss_mb': round(values.get('Pss', 0), 1),
+        'private_mb': round(private, 1),
+        'shared_mb': round(values.get('Rss', 0) - private, 1),
+    }
+
+
+def _children(pid):
+    try:
+        with open(f'/proc/{pid}/task/{pid}/children') as f:
+            return [int(p) for p in f.read().split()]
+    except FileNotFoundError:
+        return []
+
+
+def _request(port, method, path, body=None):
+    conn = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+    try:
+        headers = {'Content-Type': 'application/json'} if body is not None else {}
+        conn.request(method, path, body=body, headers=headers)
+        response = conn.getresponse()
+        response.read()
+        return response.status
+    finally:
+        conn.close()
+
+
+def _wait_ready(port, master_pid, workers, timeout=120):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            if _request(port, 'GET', '/readyz') == 200 and len(_children(master_pid)) == workers:
+                # Cada worker calienta los modelos en post_worker_init
+                time.sleep(2)
+                return
+        except OSError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError(f"El servidor no estuvo listo en {timeout}s")
+
+
+def _client(args):
+    port, duration, payload = args
+    latencies = []
+    errors = 0
+    deadline = time.perf_counter() + duration
+    while time.perf_counter() < deadline:
+        t0 = time.perf_counter()
+        try:
+            status = _request(port, 'POST', '/api/ai/predict/simple', payload)
+        except OSError:
+            status = None
+        if status == 200:
+            latencies.append(time.perf_counter() - t0)
+        else:
+            errors += 1
+    return latencies, errors
+
+
+def _percentile(values, q):
+    if not values:
+        return None
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+def run(workers, clients, duration, port):
+    with open(SAMPLE_FILE, encoding='utf-8') as f:
+        payload = f.read().encode('utf-8')
+
+    db_file = tempfile.NamedTemporaryFile(suffix='.db', delete=False)
+    db_file.close()
+    env = dict(
+        os.environ,
+        WEB_WORKERS=str(workers),
+        WEB_BIND=f'127.0.0.1:{port}',
+        WEB_MAX_REQUESTS='0',
+        DATABASE_URL=f'sqlite:///{db_file.name}',
+        AI_PREDICTION_CACHE_SIZE='0',
+        PYTHONWARNINGS='ignore',
+    )
+    server = subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py', 'wsgi:app'],
+        cwd=BACKEND_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    try:
+        _wait_ready(port, server.pid, workers)
+        master = _smaps_rollup(server.pid)
+
+        with multiprocessing.Pool(clients) as pool:
+            started = time.perf_counter()
+            results = pool.map(_client, [(port, duration, payload)] * clients)
+            elapsed = time.perf_counter() - started
+
+        worker_memory = [_smaps_rollup(pid) for pid in _children(server.pid)]
+        latencies = [lat for lats, _ in results for lat in lats]
+        errors = sum(err for _, err in results)
+        return {
+            'workers': workers,
+            'clients': clients,
+            'requests': len(latencies),
+            'errors': errors,
+            'throughput_rps': round(len(latencies) / elapsed, 1),
+            'latency_ms': {
+                'p50': round(_percentile(latencies, 0.5) * 1000, 2) if latencies else None,
+                'p99': round(_percentile(latencies, 0.99) * 1000, 2) if latencies else None,
+            },
+            'memory': {
+                'master': master,
+                'workers': worker_memory,
+                'total_pss_mb': round(master['pss_mb'] + sum(w['pss_mb'] for w in worker_memory), 1),
+            },
+        }
+    finally:
+        server.send_signal(signal.SIGTERM)
+        server.wait(timeout=60)
+        os.unlink(db_file.name)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4])
+    parser.add_argument('--clients', type=int, default=8)
+    parser.add_argument('--duration', type=float, default=10.0)
+    parser.add_argument('--port', type=int, default=5055)
+    parser.add_argument('--output', help='Archivo JSON de salida (por defecto stdout)')
+    args = parser.parse_args()
+
+    report = {
+        'cpu_count': os.cpu_count(),
+        'runs': [run(n, args.clients, args.duration, args.port) for n in args.workers],
+    }
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(text + '\n')
+    print(text)
+
+
+if __name__ == '__main__':
+    main()
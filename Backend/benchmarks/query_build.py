@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+Microbenchmark del armado de las consultas SQL del matching.
+
+Compara, por llamada, armar la consulta desde cero con los valores en línea
+(como lo hacía find_matching_houses) contra la sentencia parametrizada que
+PreferencesService guarda por forma de preferencias (matching.criteria_shape).
+Mide solo el armado y también armado + ejecución sobre una tabla vacía en
+SQLite en memoria, que incluye la llave de caché y la compilación de
+SQLAlchemy pero no el costo de leer filas.
+
+Uso:
+    python benchmarks/query_build.py --calls 2000
+"""
+import argparse
+import os
+import random
+import sys
+import time
+import warnings
+
+BACKEND_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+
+def _random_preferences(rng, MATCH_CRITERIA):
+    prefs = {}
+    for criterion in rng.sample(MATCH_CRITERIA, rng.randint(1, 6)):
+        if criterion.kind == 'range':
+            low, high = sorted(rng.uniform(1, 300000) for _ in range(2))
+            prefs[criterion.attrs[0]] = rng.choice([low, None])
+            prefs[criterion.attrs[1]] = high
+        elif criterion.kind == 'equals':
+            prefs[criterion.attrs[0]] = rng.choice(['A', 'B', 'C'])
+        else:
+            prefs[criterion.attrs[0]] = True
+    return prefs
+
+
+def _per_call_statement(VendorHouse, criteria, TRUTHY_STRINGS):
+    """Un árbol de expresiones nuevo por petición, con los valores en línea"""
+    from sqlalchemy import and_, or_, select
+
+    clauses = []
+    for criterion, value in criteria:
+        column = getattr(VendorHouse, criterion.column)
+        if criterion.kind == 'range':
+            low, high = value
+            if low is not None and high is not None:
+                clauses.append(and_(column >= float(low), column <= float(high)))
+            else:
+                clauses.append(column >= float(low) if low is not None else column <= float(high))
+        elif criterion.kind == 'equals':
+            clauses.append(column == value)
+        else:
+            clauses.append(column.in_(TRUTHY_STRINGS))
+    columns = dict.fromkeys(criterion.column for criterion, _ in criteria)
+    return (select(VendorHouse.house_id, *(getattr(VendorHouse, c) for c in columns))
+            .where(VendorHouse.status == 'available')
+            .where(or_(*clauses)), {})
+
+
+def _timed(calls, fn):
+    started = time.perf_counter()
+    for args in calls:
+        fn(*args)
+    return (time.perf_counter() - started) / len(calls) * 1e6
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--calls', type=int, default=2000)
+    parser.add_argument('--shapes', type=int, default=50, help='Formas de preferencias distintas')
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args(argv)
+
+    sys.path.insert(0, BACKEND_DIR)
+    warnings.filterwarnings('ignore')
+    from sqlalchemy import create_engine
+
+    from app import db
+    from app.matching import MATCH_CRITERIA, TRUTHY_STRINGS, active_criteria, criteria_params, criteria_shape
+    from app.models import ClientPreferences, VendorHouse
+    from app.services import PreferencesService
+
+    rng = random.Random(args.seed)
+    shapes = [_random_preferences(rng, MATCH_CRITERIA) for _ in range(args.shapes)]
+    calls = []
+    for _ in range(args.calls):
+        # Misma forma que una de las plantillas, con otros valores
+        template = rng.choice(shapes)
+        prefs = {k: (v * rng.uniform(0.9, 1.1) if isinstance(v, float) else v) for k, v in template.items()}
+        calls.append((active_criteria(ClientPreferences(**prefs)),))
+
+    def per_call(criteria):
+        return _per_call_statement(VendorHouse, criteria, TRUTHY_STRINGS)
+
+    def cached(criteria):
+        return PreferencesService._match_statement('scores', criteria_shape(criteria)), criteria_params(criteria)
+
+    engine = create_engine('sqlite://')
+    db.metadata.create_all(engine, tables=[VendorHouse.__table__])
+    with engine.connect() as conn:
+        def run(build):
+            def execute(criteria):
+                statement, params = build(criteria)
+                conn.execute(statement, params).all()
+            return execute
+
+        # Calentar las cachés (sentencias por forma y compilación de SQLAlchemy)
+        for fn in (per_call, cached, run(per_call), run(cached)):
+            _timed(calls[:args.shapes * 4], fn)
+
+        results = {
+            'armado': (_timed(calls, per_call), _timed(calls, cached)),
+            'armado + ejecución': (_timed(calls, run(per_call)), _timed(calls, run(cached))),
+        }
+
+    stats = PreferencesService._match_statements.stats()
+    print(f"{args.calls} llamadas, {args.shapes} formas ({stats['size']} sentencias en caché)")
+    print(f"{'µs por llamada':<22}{'por petición':>14}{'por forma':>12}{'mejora':>9}")
+    for name, (before, after) in results.items():
+        print(f"{name:<22}{before:>14.1f}{after:>12.1f}{before / after:>8.1f}x")
+
+
+if __name__ == '__main__':
+    main()
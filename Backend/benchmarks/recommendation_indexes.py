@@ -0,0 +1,213 @@
+#!/usr/bin/env python3
+"""
+Benchmark de los índices secundarios de vendor_houses (migración 003).
+
+Siembra un inventario sintético (--houses, 100k por defecto) en una base
+nueva y corre las consultas SQL de las recomendaciones (las que usa
+find_matching_houses con HOUSE_INDEX_ENABLED=false: la lista de mode=all y el
+recorrido del ranking) y el listado de casas de un vendedor, para varios
+perfiles de preferencias. Por cada consulta guarda el plan (EXPLAIN) y la
+mediana de la latencia, primero sin los índices y después con ellos.
+
+Por defecto usa un archivo SQLite temporal; con --database-uri se puede
+apuntar a un MySQL de pruebas (las tablas se recrean: no usar una base con
+datos reales).
+
+Uso:
+    python benchmarks/recommendation_indexes.py --houses 100000 --output indexes.json
+"""
+import argparse
+import json
+import os
+import random
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+import warnings
+
+BACKEND_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+NEIGHBORHOODS = ['NAmes', 'CollgCr', 'OldTown', 'Edwards', 'Somerst', 'Gilbert', 'NridgHt',
+                 'Sawyer', 'NWAmes', 'SawyerW', 'BrkSide', 'Crawfor', 'Mitchel', 'NoRidge',
+                 'Timber', 'IDOTRR', 'ClearCr', 'StoneBr', 'SWISU', 'MeadowV', 'Blmngtn',
+                 'BrDale', 'Veenker', 'NPkVill', 'Blueste']
+
+# Perfiles de preferencias: uno por predicado que cubren los índices
+PROFILES = {
+    'price': {'min_sale_price': 180000, 'max_sale_price': 200000},
+    'neighborhood_price': {'preferred_neighborhood': 'NoRidge',
+                           'min_sale_price': 300000, 'max_sale_price': 320000},
+    'bedrooms': {'min_bedroom_abv_gr': 5, 'max_bedroom_abv_gr': 6},
+    'living_area': {'min_gr_liv_area': 3500, 'max_gr_liv_area': 3600},
+}
+
+
+def _seed(db, VendorHouse, Vendor, houses, seed):
+    from sqlalchemy import insert
+
+    rng = random.Random(seed)
+    vendors = max(1, houses // 200)
+    db.session.execute(insert(Vendor), [
+        {'email': f'v{n}@example.com', 'username': f'vendor{n}', 'password': 'x'} for n in range(vendors)
+    ])
+    db.session.commit()
+    vendor_ids = [v for (v,) in db.session.query(Vendor.vendor_id)]
+
+    rows = []
+    for n in range(houses):
+        rows.append({
+            'vendor_id': rng.choice(vendor_ids),
+            'title': f'Casa {n}',
+            'sale_price': round(rng.lognormvariate(12.0, 0.4), -2),
+            'status': 'available' if rng.random() < 0.9 else 'sold',
+            'neighborhood': rng.choice(NEIGHBORHOODS),
+            'bedroom_abv_gr': float(rng.choice([1, 2, 2, 3, 3, 3, 4, 4, 5, 6])),
+            'gr_liv_area': float(int(rng.gauss(1500, 500)) if rng.random() < 0.97 else rng.randint(3000, 4500)),
+            'full_bath': float(rng.randint(1, 3)),
+        })
+        if len(rows) == 5000:
+            db.session.execute(insert(VendorHouse), rows)
+            rows = []
+    if rows:
+        db.session.execute(insert(VendorHouse), rows)
+    db.session.commit()
+    return vendor_ids
+
+
+def _capture(engine, fn):
+    """Ejecuta fn y devuelve (resultado, [(sentencia, parámetros)] que envió a la base)"""
+    from sqlalchemy import event
+
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append((statement, parameters))
+
+    event.listen(engine, 'before_cursor_execute', record)
+    try:
+        return fn(), statements
+    finally:
+        event.remove(engine, 'before_cursor_execute', record)
+
+
+def _explain(engine, statement, parameters):
+    prefix = 'EXPLAIN QUERY PLAN ' if engine.dialect.name == 'sqlite' else 'EXPLAIN '
+    with engine.connect() as conn:
+        result = conn.exec_driver_sql(prefix + statement, parameters)
+        return [' | '.join(str(v) for v in row) for row in result]
+
+
+def _analyze(db):
+    from sqlalchemy import text
+
+    statement = 'ANALYZE' if db.engine.dialect.name == 'sqlite' else 'ANALYZE TABLE vendor_houses'
+    db.session.execute(text(statement))
+    db.session.commit()
+
+
+def _measure(db, queries, repeat):
+    results = {}
+    for name, fn in queries.items():
+        rows, statements = _capture(db.engine, fn)
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            fn()
+            timings.append(time.perf_counter() - started)
+            db.session.expunge_all()
+        statement, parameters = statements[-1]
+        results[name] = {
+            'rows': rows,
+            'median_ms': round(statistics.median(timings) * 1000, 2),
+            'plan': _explain(db.engine, statement, parameters),
+        }
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--houses', type=int, default=100000)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--database-uri', help='Base de pruebas (por defecto SQLite temporal)')
+    parser.add_argument('--output', help='Archivo JSON con planes y latencias')
+    args = parser.parse_args(argv)
+
+    sys.path.insert(0, BACKEND_DIR)
+    warnings.filterwarnings('ignore')
+    from app import create_app, db
+    from app.matching import active_criteria
+    from app.models import ClientPreferences, Vendor, VendorHouse
+    from app.services import PreferencesService
+    from config import Config
+
+    workdir = tempfile.mkdtemp(prefix='houselink-indexes-')
+
+    class BenchConfig(Config):
+        SQLALCHEMY_DATABASE_URI = args.database_uri or f"sqlite:///{os.path.join(workdir, 'bench.db')}"
+        DEBUG = False
+        AI_BACKGROUND_LOAD = False
+        # Se miden las consultas SQL, no el índice en memoria
+        HOUSE_INDEX_ENABLED = False
+
+    app = create_app(BenchConfig)
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        started = time.perf_counter()
+        vendor_ids = _seed(db, VendorHouse, Vendor, args.houses, args.seed)
+        print(f"Inventario: {args.houses} casas en {time.perf_counter() - started:.1f}s")
+
+        queries = {}
+        for profile, values in PROFILES.items():
+            criteria = active_criteria(ClientPreferences(**values))
+            queries[f'{profile}/all'] = (
+                lambda criteria=criteria: len(PreferencesService._matching_rows(criteria)))
+            queries[f'{profile}/ranked'] = (
+                lambda criteria=criteria: PreferencesService._rank_with_sql(criteria, 20, 0)[0])
+        vendor_id = vendor_ids[len(vendor_ids) // 2]
+        queries['vendor_listing'] = lambda: len(VendorHouse.query.filter_by(vendor_id=vendor_id).all())
+
+        indexes = sorted(VendorHouse.__table__.indexes, key=lambda index: index.name)
+        for index in indexes:
+            index.drop(db.engine)
+        _analyze(db)
+        before = _measure(db, queries, args.repeat)
+
+        started = time.perf_counter()
+        for index in indexes:
+            index.create(db.engine)
+        _analyze(db)
+        build_s = time.perf_counter() - started
+        after = _measure(db, queries, args.repeat)
+        dialect = db.engine.dialect.name
+        db.engine.dispose()
+    shutil.rmtree(workdir, ignore_errors=True)
+
+    report = {
+        'dialect': dialect,
+        'houses': args.houses,
+        'indexes': [index.name for index in indexes],
+        'index_build_s': round(build_s, 2),
+        'before': before,
+        'after': after,
+    }
+
+    print(f"Índices creados en {build_s:.1f}s: {', '.join(report['indexes'])}\n")
+    print(f"{'consulta':<28}{'filas':>8}{'sin índices ms':>16}{'con índices ms':>16}")
+    for name in queries:
+        print(f"{name:<28}{before[name]['rows']:>8}{before[name]['median_ms']:>16}{after[name]['median_ms']:>16}")
+    for name in queries:
+        print(f"\n{name}\n  antes:   " + "\n           ".join(before[name]['plan'])
+              + "\n  después: " + "\n           ".join(after[name]['plan']))
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"\nResultados en {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+Benchmark de la serialización de los listados de casas.
+
+Siembra --rows casas (1k y 10k por defecto) en SQLite en memoria y mide, por
+listado completo:
+  - to_dict: el dict por comprensión con getattr por columna (como lo hacía
+    _to_dict_all) contra row_serializer, con todas las columnas y con la
+    proyección de --fields;
+  - jsonify: el mismo listado con el proveedor JSON de Flask y con
+    OrjsonProvider (si orjson está instalado);
+  - consulta: leer las filas con todas las columnas y con load_only.
+
+Uso:
+    python benchmarks/serialization.py --rows 1000 10000
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+import warnings
+
+BACKEND_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+
+def _median_ms(fn, repeat):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings) * 1000
+
+
+def _seed(db, Vendor, VendorHouse, rows, seed):
+    from sqlalchemy import insert
+
+    rng = random.Random(seed)
+    vendor = Vendor(email='bench@example.com', username='bench', password='x')
+    db.session.add(vendor)
+    db.session.commit()
+    db.session.execute(insert(VendorHouse), [{
+        'vendor_id': vendor.vendor_id,
+        'title': f'Casa {n}',
+        'description': 'Casa de prueba para el benchmark',
+        'sale_price': round(rng.lognormvariate(12.0, 0.4), -2),
+        'neighborhood': rng.choice(['NAmes', 'CollgCr', 'OldTown', 'Edwards']),
+        'bedroom_abv_gr': float(rng.randint(1, 5)),
+        'gr_liv_area': float(rng.randint(600, 3500)),
+        'year_built': rng.randint(1900, 2010),
+        'central_air': rng.choice(['Y', 'N']),
+    } for n in range(rows)])
+    db.session.commit()
+    return vendor.vendor_id
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, nargs='+', default=[1000, 10000])
+    parser.add_argument('--fields', default='title,sale_price,neighborhood')
+    parser.add_argument('--repeat', type=int, default=7)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args(argv)
+
+    sys.path.insert(0, BACKEND_DIR)
+    warnings.filterwarnings('ignore')
+    from flask.json.provider import DefaultJSONProvider
+
+    from app import create_app, db
+    from app.models import Vendor, VendorHouse
+    from app.serialization import OrjsonProvider, load_only_options, model_fields, orjson, row_serializer
+    from config import Config
+
+    class BenchConfig(Config):
+        SQLALCHEMY_DATABASE_URI = 'sqlite://'
+        DEBUG = False
+        AI_BACKGROUND_LOAD = False
+
+    app = create_app(BenchConfig)
+    fields = model_fields(VendorHouse, args.fields.split(','))
+    columns = VendorHouse.__table__.columns
+    providers = {'flask': DefaultJSONProvider(app)}
+    if orjson is not None:
+        providers['orjson'] = OrjsonProvider(app)
+    else:
+        print('orjson no está instalado: solo se mide el proveedor de Flask')
+
+    print(f"{'filas':>7}  {'medición':<34}{'ms':>9}")
+    for rows in args.rows:
+        with app.app_context():
+            db.drop_all()
+            db.create_all()
+            vendor_id = _seed(db, Vendor, VendorHouse, rows, args.seed)
+            query = VendorHouse.query.filter_by(vendor_id=vendor_id)
+            houses = query.all()
+            serialize, project = row_serializer(VendorHouse), row_serializer(VendorHouse, fields)
+            payload = [serialize(h) for h in houses]
+            assert payload == [{c.name: getattr(h, c.name) for c in columns} for h in houses]
+
+            results = {
+                'to_dict getattr': lambda: [{c.name: getattr(h, c.name) for c in columns} for h in houses],
+                'to_dict row_serializer': lambda: [serialize(h) for h in houses],
+                f'to_dict ?fields ({len(fields)} columnas)': lambda: [project(h) for h in houses],
+            }
+            with app.test_request_context():
+                for name, provider in providers.items():
+                    results[f'jsonify {name}'] = lambda provider=provider: provider.response(payload)
+            results['consulta todas las columnas'] = lambda: (query.all(), db.session.expunge_all())
+            results['consulta load_only ?fields'] = lambda: (
+                query.options(load_only_options(VendorHouse, fields)).all(), db.session.expunge_all())
+
+            with app.test_request_context():
+                for name, fn in results.items():
+                    print(f"{rows:>7}  {name:<34}{_median_ms(fn, args.repeat):>9.2f}")
+            db.session.remove()
+            db.drop_all()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+"""
+Benchmark de la ruta dispersa (CSR) contra la densa en lotes grandes.
+
+Por cada modelo, tamaño de lote y ruta se lanza un proceso aparte que carga el
+modelo, arma el lote con las filas de Model/Data/test.csv (repetidas hasta
+--rows) y mide codificación y predicción. Medir en un proceso nuevo permite
+reportar el pico de memoria real (ru_maxrss, incluye lo que reserva XGBoost)
+y cuánto crece por el lote respecto al proceso ya cargado.
+
+Si el modelo no tiene un booster entrenado (el pickle del modelo complejo)
+solo se mide la codificación.
+
+Uso:
+    python benchmarks/sparse_batch.py --rows 10000 100000 --output sparse.json
+"""
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import time
+import warnings
+
+BACKEND_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+PATHS = ('dense', 'sparse')
+
+
+def _max_rss_mb():
+    # En Linux ru_maxrss está en KB
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def _matrix_bytes(X):
+    if hasattr(X, 'indptr'):
+        return X.data.nbytes + X.indices.nbytes + X.indptr.nbytes
+    return X.nbytes
+
+
+def _load(model):
+    """Devuelve (encoder, compiled o None) sin activar la ruta dispersa"""
+    from app.inference import CompiledModel, FeatureEncoder
+    from app.services import AIService
+
+    AIService.load_models()
+    handle = AIService.registry().current.get(model)
+    if handle.compiled is not None:
+        return handle.compiled.encoder, handle.compiled
+    if handle.pipeline is None:
+        raise RuntimeError(f"Modelo {model} no disponible")
+    encoder = FeatureEncoder.from_pipeline(handle.pipeline)
+    try:
+        return encoder, CompiledModel.from_pipeline(model, handle.pipeline)
+    except Exception:
+        return encoder, None
+
+
+def run_case(model, path, rows, repeat):
+    """Se ejecuta en el proceso hijo: mide una ruta con un tamaño de lote"""
+    from inference import load_test_rows
+
+    encoder, compiled = _load(model)
+    if path == 'sparse' and compiled is not None:
+        compiled.use_sparse_booster()
+    pool = load_test_rows()
+    batch = [pool[i % len(pool)] for i in range(rows)]
+
+    if path == 'sparse':
+        encode = encoder.encode_sparse
+        predict = compiled.predict_sparse if compiled is not None else None
+    else:
+        encode = encoder.encode_many
+        predict = compiled.predict_matrix if compiled is not None else None
+
+    # Calentamiento con un lote chico para no contar la inicialización de XGBoost
+    X = encode(batch[:100])
+    if predict is not None:
+        predict(X)
+    del X
+    baseline_rss = _max_rss_mb()
+
+    encode_s, predict_s = [], []
+    matrix_bytes = 0
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        X = encode(batch)
+        t1 = time.perf_counter()
+        if predict is not None:
+            predict(X)
+        t2 = time.perf_counter()
+        matrix_bytes = _matrix_bytes(X)
+        encode_s.append(t1 - t0)
+        predict_s.append(t2 - t1)
+        del X
+
+    total = min(e + p for e, p in zip(encode_s, predict_s))
+    return {
+        'model': model,
+        'path': path,
+        'rows': rows,
+        'predicted': predict is not None,
+        'encode_s': round(min(encode_s), 4),
+        'predict_s': round(min(predict_s), 4) if predict is not None else None,
+        'rows_per_s': round(rows / total, 1),
+        'matrix_mb': round(matrix_bytes / 2 ** 20, 2),
+        'peak_rss_mb': round(_max_rss_mb(), 1),
+        'batch_rss_mb': round(_max_rss_mb() - baseline_rss, 1),
+    }
+
+
+def _spawn(model, path, rows, repeat):
+    command = [sys.executable, os.path.abspath(__file__), '--case', model, path, str(rows),
+               '--repeat', str(repeat)]
+    output = subprocess.run(command, cwd=BACKEND_DIR, check=True, capture_output=True, text=True).stdout
+    # El hijo imprime mensajes de carga; el resultado es la última línea
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--models', nargs='+', choices=('simple', 'complex'), default=['simple', 'complex'])
+    parser.add_argument('--rows', type=int, nargs='+', default=[10000, 100000])
+    parser.add_argument('--repeat', type=int, default=3, help='Repeticiones por caso (se reporta la mejor)')
+    parser.add_argument('--output', help='Archivo JSON de salida (por defecto stdout)')
+    parser.add_argument('--case', nargs=3, metavar=('MODEL', 'PATH', 'ROWS'), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    # Un hilo de OpenMP para que ambas rutas se comparen igual; antes de importar xgboost
+    os.environ.setdefault('OMP_NUM_THREADS', '1')
+    warnings.filterwarnings('ignore')
+    sys.path.insert(0, BACKEND_DIR)
+
+    if args.case:
+        model, path, rows = args.case
+        print(json.dumps(run_case(model, path, int(rows), args.repeat)))
+        return
+
+    results = []
+    for model in args.models:
+        for rows in args.rows:
+            for path in PATHS:
+                result = _spawn(model, path, rows, args.repeat)
+                results.append(result)
+                print(f"{model:>8} {path:>6} rows={rows:<7} rows/s={result['rows_per_s']:>10} "
+                      f"encode={result['encode_s']}s predict={result['predict_s']}s "
+                      f"matrix={result['matrix_mb']}MB peak_rss={result['peak_rss_mb']}MB "
+                      f"(+{result['batch_rss_mb']}MB)", file=sys.stderr)
+
+    text = json.dumps({'omp_num_threads': os.environ['OMP_NUM_THREADS'], 'results': results}, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(text + '\n')
+    else:
+        print(text)
+
+
+if __name__ == '__main__':
+    main()
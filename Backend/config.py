@@ -13,9 +13,102 @@ class Config:
     DB_PASSWORD = os.getenv('DB_PASSWORD', 'password')
     
     # URL de conexión a la base de datos
-    SQLALCHEMY_DATABASE_URI = f"mysql+pymysql://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
+    SQLALCHEMY_DATABASE_URI = os.getenv(
+        'DATABASE_URL', f"mysql+pymysql://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
+    )
     SQLALCHEMY_TRACK_MODIFICATIONS = False
     
     # Configuración de Flask
     SECRET_KEY = os.getenv('SECRET_KEY', 'dev-secret-key-change-in-production')
     DEBUG = os.getenv('FLASK_ENV', 'development') == 'development'
+
+    # Servidor de producción (gunicorn.conf.py): un proceso maestro carga los
+    # modelos y hace fork de WEB_WORKERS procesos que los comparten
+    WEB_BIND = os.getenv('WEB_BIND', '0.0.0.0:5001')
+    WEB_WORKERS = int(os.getenv('WEB_WORKERS', str(os.cpu_count() or 1)))
+    # Hilos por worker (gthread); con más de uno el micro-batching agrupa peticiones
+    WEB_THREADS = int(os.getenv('WEB_THREADS', '4'))
+    WEB_TIMEOUT = int(os.getenv('WEB_TIMEOUT', '60'))
+    WEB_GRACEFUL_TIMEOUT = int(os.getenv('WEB_GRACEFUL_TIMEOUT', '30'))
+    # Reciclar cada worker tras N peticiones (0 = nunca)
+    WEB_MAX_REQUESTS = int(os.getenv('WEB_MAX_REQUESTS', '2000'))
+
+    # Configuración de IA
+    AI_BATCH_MAX_ROWS = int(os.getenv('AI_BATCH_MAX_ROWS', '10000'))
+    AI_PREDICTION_CACHE_SIZE = int(os.getenv('AI_PREDICTION_CACHE_SIZE', '2048'))
+    AI_PREDICTION_CACHE_TTL = float(os.getenv('AI_PREDICTION_CACHE_TTL', '600'))
+    AI_PREDICT_WORKERS = int(os.getenv('AI_PREDICT_WORKERS', '4'))
+    # Directorio con los artefactos de los modelos; se puede recargar en caliente
+    AI_RESOURCES_DIR = os.getenv(
+        'AI_RESOURCES_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'resources')
+    )
+    # Recargar automáticamente cuando cambian los archivos de AI_RESOURCES_DIR
+    AI_WATCH_RESOURCES = os.getenv('AI_WATCH_RESOURCES', 'false').lower() in ('1', 'true', 'yes')
+    AI_WATCH_INTERVAL = float(os.getenv('AI_WATCH_INTERVAL', '2'))
+    # Token para /api/admin/* (header X-Admin-Token); sin token los endpoints están deshabilitados
+    ADMIN_TOKEN = os.getenv('ADMIN_TOKEN')
+    # 'native' (JSON + booster .ubj de export_models.py) o 'pickle'
+    AI_MODEL_FORMAT = os.getenv('AI_MODEL_FORMAT', 'native')
+    # Modelos evaluados con el evaluador de árboles en NumPy (app/trees.py) en lugar
+    # de XGBoost; con el formato nativo y <modelo>_trees.npz no se importa xgboost
+    AI_NUMPY_TREE_MODELS = [m.strip() for m in os.getenv('AI_NUMPY_TREE_MODELS', '').split(',') if m.strip()]
+    # Micro-batching: peticiones concurrentes de estos modelos se agrupan en un
+    # solo predict de hasta AI_MICROBATCH_MAX_SIZE filas o AI_MICROBATCH_MAX_WAIT_MS
+    AI_MICROBATCH_MODELS = [m.strip() for m in os.getenv('AI_MICROBATCH_MODELS', 'simple').split(',') if m.strip()]
+    AI_MICROBATCH_MAX_SIZE = int(os.getenv('AI_MICROBATCH_MAX_SIZE', '32'))
+    AI_MICROBATCH_MAX_WAIT_MS = float(os.getenv('AI_MICROBATCH_MAX_WAIT_MS', '2'))
+    # Lotes de al menos AI_SPARSE_BATCH_MIN_ROWS filas de estos modelos se codifican
+    # en CSR en lugar de una matriz densa (conviene con muchas columnas one-hot)
+    AI_SPARSE_BATCH_MODELS = [m.strip() for m in os.getenv('AI_SPARSE_BATCH_MODELS', 'complex').split(',') if m.strip()]
+    AI_SPARSE_BATCH_MIN_ROWS = int(os.getenv('AI_SPARSE_BATCH_MIN_ROWS', '1000'))
+
+    # Trabajos asíncronos (/api/ai/jobs): archivos en AI_JOBS_DIR, AI_JOBS_WORKERS trabajos
+    # a la vez y hasta AI_JOBS_MAX_PENDING pendientes por proceso, por bloques de AI_JOBS_CHUNK_SIZE
+    AI_JOBS_DIR = os.getenv('AI_JOBS_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'jobs'))
+    AI_JOBS_WORKERS = int(os.getenv('AI_JOBS_WORKERS', '1'))
+    AI_JOBS_MAX_PENDING = int(os.getenv('AI_JOBS_MAX_PENDING', '8'))
+    AI_JOBS_CHUNK_SIZE = int(os.getenv('AI_JOBS_CHUNK_SIZE', '1000'))
+    AI_JOBS_MAX_ROWS = int(os.getenv('AI_JOBS_MAX_ROWS', '1000000'))
+    AI_JOBS_MAX_BYTES = int(os.getenv('AI_JOBS_MAX_BYTES', str(512 * 1024 * 1024)))
+    AI_JOBS_PAGE_MAX = int(os.getenv('AI_JOBS_PAGE_MAX', '10000'))
+    # El proceso que corre un trabajo renueva su latido en meta.json cada
+    # AI_JOBS_HEARTBEAT_SECONDS; sin latido por AI_JOBS_HEARTBEAT_TIMEOUT se da por huérfano
+    AI_JOBS_HEARTBEAT_SECONDS = float(os.getenv('AI_JOBS_HEARTBEAT_SECONDS', '10'))
+    AI_JOBS_HEARTBEAT_TIMEOUT = float(os.getenv('AI_JOBS_HEARTBEAT_TIMEOUT', '60'))
+
+    # Índice en memoria de casas disponibles para las recomendaciones (app/house_index.py);
+    # cada proceso lo reconstruye cuando cambia la versión del inventario (cache_versions)
+    # y cada HOUSE_INDEX_RESYNC_SECONDS, para las escrituras directas a la base
+    HOUSE_INDEX_ENABLED = os.getenv('HOUSE_INDEX_ENABLED', 'true').lower() in ('1', 'true', 'yes')
+    HOUSE_INDEX_RESYNC_SECONDS = float(os.getenv('HOUSE_INDEX_RESYNC_SECONDS', '300'))
+    # Página por defecto y máxima de /recommendations en modo por ranking
+    RECOMMENDATIONS_DEFAULT_LIMIT = int(os.getenv('RECOMMENDATIONS_DEFAULT_LIMIT', '20'))
+    RECOMMENDATIONS_MAX_LIMIT = int(os.getenv('RECOMMENDATIONS_MAX_LIMIT', '100'))
+    # Caché de respuestas de /recommendations por cliente (0 la desactiva). La
+    # llave lleva las versiones de cache_versions, así que las escrituras de
+    # cualquier worker la invalidan al momento; el TTL solo acota la memoria
+    RECOMMENDATIONS_CACHE_SIZE = int(os.getenv('RECOMMENDATIONS_CACHE_SIZE', '4096'))
+    RECOMMENDATIONS_CACHE_TTL = float(os.getenv('RECOMMENDATIONS_CACHE_TTL', '60'))
+    # Sentencias SQL parametrizadas del matching, una por forma de preferencias
+    MATCH_STATEMENT_CACHE_SIZE = int(os.getenv('MATCH_STATEMENT_CACHE_SIZE', '512'))
+    # Serializar las respuestas con orjson cuando está instalado
+    ORJSON_ENABLED = os.getenv('ORJSON_ENABLED', 'true').lower() in ('1', 'true', 'yes')
+    # Matching inverso: al crear una casa se guardan en house_client_matches los
+    # clientes que la aceptan, buscados en un índice invertido de las preferencias
+    REVERSE_MATCHING_ENABLED = os.getenv('REVERSE_MATCHING_ENABLED', 'true').lower() in ('1', 'true', 'yes')
+    # El índice se reconstruye cuando otro worker sube la versión de las
+    # preferencias (cache_versions) y, además, cada CLIENT_INDEX_RESYNC_SECONDS
+    CLIENT_INDEX_RESYNC_SECONDS = float(os.getenv('CLIENT_INDEX_RESYNC_SECONDS', '300'))
+    # Al cambiar las preferencias de un cliente sus filas de house_client_matches se
+    # reescriben en hilos de fondo (0 lo hace dentro de la petición), con hasta
+    # CLIENT_MATCHES_SYNC_MAX_PENDING clientes en cola; con la cola llena, en la petición
+    CLIENT_MATCHES_SYNC_WORKERS = int(os.getenv('CLIENT_MATCHES_SYNC_WORKERS', '1'))
+    CLIENT_MATCHES_SYNC_MAX_PENDING = int(os.getenv('CLIENT_MATCHES_SYNC_MAX_PENDING', '1000'))
+
+    # Métricas de inferencia (/metrics y /api/ai/models/status); cada worker lleva las suyas
+    AI_METRICS_ENABLED = os.getenv('AI_METRICS_ENABLED', 'true').lower() == 'true'
+    # Modelo con el que se valúan las casas guardadas (vendor_houses.predicted_price)
+    HOUSE_VALUATION_MODEL = os.getenv('HOUSE_VALUATION_MODEL', 'simple')
+    AI_BACKGROUND_LOAD = os.getenv('AI_BACKGROUND_LOAD', 'true').lower() in ('1', 'true', 'yes')
+    AI_WARMUP = os.getenv('AI_WARMUP', 'true').lower() in ('1', 'true', 'yes')
+    AI_RETRY_AFTER_SECONDS = int(os.getenv('AI_RETRY_AFTER_SECONDS', '5'))
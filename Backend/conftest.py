@@ -0,0 +1,42 @@
+"""
+Shared fixtures: a Flask app over an in-memory SQLite database that loads the
+models synchronously, so tests do not wait on the background loader.
+"""
+
+import pytest
+
+from app import create_app, db
+from app.settings import settings
+from config import Config
+
+
+class _TestConfig(Config):
+    SQLALCHEMY_DATABASE_URI = "sqlite://"
+    DEBUG = False
+    AI_BACKGROUND_LOAD = False
+    # The in-memory database is a single shared connection: no background writers
+    CLIENT_MATCHES_SYNC_WORKERS = 0
+
+
+@pytest.fixture(scope="session")
+def make_app():
+    """create_app(_TestConfig); keyword arguments override config values"""
+    def make(**overrides):
+        config = type("_TestConfig", (_TestConfig,), overrides) if overrides else _TestConfig
+        return create_app(config)
+    return make
+
+
+@pytest.fixture
+def app(make_app):
+    app = make_app()
+    with app.app_context():
+        yield app
+        db.drop_all()
+
+
+@pytest.fixture(autouse=True)
+def _reset_settings():
+    """Tests without an app read Config, not the last app's config"""
+    yield
+    settings.use(None)
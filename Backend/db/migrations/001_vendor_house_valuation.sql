@@ -0,0 +1,11 @@
+-- Valuación persistida del modelo en vendor_houses.
+-- predicted_price se llena al crear la casa y con backfill_predictions.py;
+-- model_version y scored_features_hash permiten re-evaluar solo las filas
+-- cuyo modelo o columnas de entrada cambiaron.
+USE houselink;
+
+ALTER TABLE vendor_houses
+    ADD COLUMN predicted_price      FLOAT,
+    ADD COLUMN model_version        VARCHAR(40),
+    ADD COLUMN scored_at            DATETIME,
+    ADD COLUMN scored_features_hash VARCHAR(40);
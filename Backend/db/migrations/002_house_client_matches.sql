@@ -0,0 +1,19 @@
+-- Matching inverso: clientes cuyas preferencias aceptan cada casa.
+-- HouseService.create_house inserta las filas al crear la casa (índice
+-- invertido en memoria, app/client_index.py) y
+-- PreferencesService.sync_client_matches reescribe las de un cliente cuando
+-- cambian sus preferencias. El vendedor las lista con
+-- GET /api/vendors/<vendor_id>/houses/<house_id>/interested-clients.
+USE houselink;
+
+CREATE TABLE house_client_matches (
+    house_id         BIGINT NOT NULL,
+    client_id        BIGINT NOT NULL,
+    score            FLOAT NOT NULL,
+    matched_criteria VARCHAR(1000),
+    matched_at       DATETIME,
+    PRIMARY KEY (house_id, client_id),
+    INDEX idx_house_client_matches_client (client_id),
+    FOREIGN KEY (house_id) REFERENCES vendor_houses(house_id) ON DELETE CASCADE,
+    FOREIGN KEY (client_id) REFERENCES clients(client_id) ON DELETE CASCADE
+);
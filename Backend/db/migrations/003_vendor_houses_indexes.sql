@@ -0,0 +1,23 @@
+-- Índices secundarios de vendor_houses elegidos a partir de los predicados
+-- reales (benchmarks/recommendation_indexes.py mide los planes y latencias).
+--
+-- Las recomendaciones por SQL filtran status = 'available' y un OR de los
+-- criterios del cliente; con status como prefijo MySQL puede resolver cada
+-- rama del OR con un rango del índice (index_merge union) en lugar de
+-- recorrer la tabla, y el ranking (que solo lee house_id y las columnas del
+-- criterio) queda cubierto por el índice.
+--   precio:                  (status, sale_price)
+--   barrio + precio:         (status, neighborhood, sale_price)
+--   dormitorios / área útil: (status, bedroom_abv_gr), (status, gr_liv_area)
+-- Listado del vendedor (get_houses_by_vendor): (vendor_id, status); InnoDB
+-- reemplaza con este el índice implícito de la llave foránea vendor_id.
+USE houselink;
+
+ALTER TABLE vendor_houses
+    ADD INDEX idx_vendor_houses_status_neighborhood_price (status, neighborhood, sale_price),
+    ADD INDEX idx_vendor_houses_status_price (status, sale_price),
+    ADD INDEX idx_vendor_houses_status_bedrooms (status, bedroom_abv_gr),
+    ADD INDEX idx_vendor_houses_status_living_area (status, gr_liv_area),
+    ADD INDEX idx_vendor_houses_vendor_status (vendor_id, status);
+
+ANALYZE TABLE vendor_houses;
@@ -0,0 +1,16 @@
+-- Versiones compartidas de las cachés en memoria de cada worker.
+-- La caché de recomendaciones y el índice de casas viven en cada proceso de
+-- gunicorn; cada escritura sube en su misma transacción la versión del
+-- inventario ('inventory', 0) o la de las preferencias de un cliente
+-- ('client', client_id). Cada worker lee las versiones al atender una
+-- recomendación: si cambiaron, la respuesta en caché ya no se usa y el
+-- índice de casas se reconstruye, aunque el cambio se haya hecho en otro
+-- worker.
+USE houselink;
+
+CREATE TABLE cache_versions (
+    scope    VARCHAR(20) NOT NULL,
+    scope_id BIGINT NOT NULL,
+    version  BIGINT NOT NULL DEFAULT 0,
+    PRIMARY KEY (scope, scope_id)
+);
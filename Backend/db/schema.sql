@@ -306,5 +306,41 @@ CREATE TABLE vendor_houses (
     
     -- Información de contacto
     contact_phone  VARCHAR(20),
-    contact_email  VARCHAR(255)
+    contact_email  VARCHAR(255),
+    
+    -- Valuación del modelo (AIService / backfill_predictions.py)
+    predicted_price      FLOAT,
+    model_version        VARCHAR(40),
+    scored_at            DATETIME,
+    scored_features_hash VARCHAR(40),
+
+    -- Índices para las recomendaciones y el listado del vendedor (migración 003)
+    INDEX idx_vendor_houses_status_neighborhood_price (status, neighborhood, sale_price),
+    INDEX idx_vendor_houses_status_price (status, sale_price),
+    INDEX idx_vendor_houses_status_bedrooms (status, bedroom_abv_gr),
+    INDEX idx_vendor_houses_status_living_area (status, gr_liv_area),
+    INDEX idx_vendor_houses_vendor_status (vendor_id, status)
+);
+
+-- 5) House ↔ Client Matches
+-- Clients whose preferences accept each house (reverse matching).
+CREATE TABLE house_client_matches (
+    house_id         BIGINT NOT NULL,
+    client_id        BIGINT NOT NULL,
+    score            FLOAT NOT NULL,
+    matched_criteria VARCHAR(1000),
+    matched_at       DATETIME,
+    PRIMARY KEY (house_id, client_id),
+    INDEX idx_house_client_matches_client (client_id),
+    FOREIGN KEY (house_id) REFERENCES vendor_houses(house_id) ON DELETE CASCADE,
+    FOREIGN KEY (client_id) REFERENCES clients(client_id) ON DELETE CASCADE
+-- Shared counters behind the per-worker recommendation cache, house index and client index.
+
+-- 6) Cache Versions
+-- Shared counters behind the per-worker recommendation cache and house index.
+CREATE TABLE cache_versions (
+    scope    VARCHAR(20) NOT NULL,
+    scope_id BIGINT NOT NULL,
+    version  BIGINT NOT NULL DEFAULT 0,
+    PRIMARY KEY (scope, scope_id)
 );
@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+"""
+Exporta los pipelines .pkl de resources/ al formato que AIService carga por defecto:
+  - <modelo>_preprocess.json : especificación del preprocesamiento (one-hot, imputación, orden)
+  - <modelo>_booster.ubj     : booster de XGBoost en su formato nativo (UBJSON)
+  - <modelo>_trees.npz       : árboles aplanados para el evaluador NumPy (app/trees.py)
+
+Uso:
+    python export_models.py [--resources-dir resources]
+"""
+import argparse
+import os
+import warnings
+
+import joblib
+
+from app.inference import CompiledModel
+
+MODELS = {
+    'complex': 'xgb_full',
+    'simple': 'xgb_top20',
+}
+
+
+def export_models(resources_dir):
+    warnings.filterwarnings("ignore", category=UserWarning)
+    exported = []
+    for model_type, stem in MODELS.items():
+        pipeline_path = os.path.join(resources_dir, f'{stem}_pipeline.pkl')
+        if not os.path.exists(pipeline_path):
+            print(f"Archivo no encontrado: {pipeline_path}")
+            continue
+        try:
+            compiled = CompiledModel.from_pipeline(model_type, joblib.load(pipeline_path))
+        except Exception as e:
+            print(f"No se exportó el modelo {model_type} ({pipeline_path}): {e}")
+            continue
+
+        spec_path = os.path.join(resources_dir, f'{stem}_preprocess.json')
+        booster_path = os.path.join(resources_dir, f'{stem}_booster.ubj')
+        trees_path = os.path.join(resources_dir, f'{stem}_trees.npz')
+        compiled.save(spec_path, booster_path, trees_path)
+        exported.append((spec_path, booster_path, trees_path))
+        print(f"Modelo {model_type} exportado: {spec_path}, {booster_path}, {trees_path}")
+    return exported
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--resources-dir', default=os.path.join(os.path.dirname(os.path.abspath(__file__)), 'resources'))
+    args = parser.parse_args()
+    export_models(args.resources_dir)
@@ -0,0 +1,71 @@
+"""
+Configuración de gunicorn: un maestro con los modelos precargados y
+Config.WEB_WORKERS workers creados con fork.
+
+    gunicorn -c gunicorn.conf.py wsgi:app
+
+Reinicio ordenado:
+    kill -HUP <pid del maestro>    # reemplaza los workers uno a uno sin cortar peticiones
+                                   # (con preload_app no recarga el código: para eso USR2 + QUIT)
+    kill -TERM <pid del maestro>   # apagado: espera hasta WEB_GRACEFUL_TIMEOUT a las peticiones en curso
+"""
+import gc
+import os
+
+# Un hilo de OpenMP por worker: el paralelismo viene de los procesos.
+# Debe fijarse antes de que se importe xgboost (preload_app lo importa después).
+# También es lo que permite el fork: la predicción de prueba de load_models
+# corre en el maestro, y con un solo hilo OpenMP no crea un pool de hilos que
+# los workers hereden a medias. No subirlo mientras preload_app esté activo.
+os.environ.setdefault('OMP_NUM_THREADS', '1')
+
+from config import Config  # noqa: E402
+
+bind = Config.WEB_BIND
+workers = Config.WEB_WORKERS
+threads = Config.WEB_THREADS
+worker_class = 'gthread' if threads > 1 else 'sync'
+preload_app = True
+timeout = Config.WEB_TIMEOUT
+graceful_timeout = Config.WEB_GRACEFUL_TIMEOUT
+max_requests = Config.WEB_MAX_REQUESTS
+max_requests_jitter = max_requests // 10
+accesslog = os.getenv('WEB_ACCESS_LOG') or None
+errorlog = '-'
+
+
+def when_ready(server):
+    # Los objetos ya cargados no vuelven a recorrerse por el GC, así que los
+    # workers no escriben en esas páginas y siguen compartidas con el maestro
+    gc.freeze()
+    server.log.info("Modelos precargados; %s workers", workers)
+    if os.environ.get('OMP_NUM_THREADS') != '1':
+        server.log.warning("OMP_NUM_THREADS=%s: el maestro ya predijo con varios hilos de OpenMP "
+                           "y los workers pueden bloquearse", os.environ.get('OMP_NUM_THREADS'))
+
+
+def post_fork(server, worker):
+    # Las conexiones a la base de datos abiertas por el maestro no se comparten.
+    # La app es la que cargó el maestro, sea cual sea el módulo indicado a gunicorn
+    from app import db
+
+    app = server.app.wsgi()
+    with app.app_context():
+        db.engine.dispose(close=False)
+
+
+def post_worker_init(worker):
+    # El calentamiento se repite en cada worker: lo que inicializa (los hilos
+    # del micro-batching y del ejecutor de predict_both) es de cada proceso y
+    # los hilos del maestro no sobreviven al fork
+    from app.services import AIService
+    from app.settings import settings
+
+    results = AIService.warm_up()
+    worker.log.info("Worker %s calentado: %s", worker.pid,
+                    {model: r['status'] for model, r in results.items()})
+    # Cada worker tiene su propio registro: el watcher es lo que mantiene a todos
+    # en la misma versión (también a los workers recién creados desde el maestro,
+    # que arrancan con los modelos que éste precargó)
+    if settings.AI_WATCH_RESOURCES:
+        AIService.start_watcher()
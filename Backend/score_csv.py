@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+"""
+Valúa un CSV con el formato de Kaggle (como Model/Data/test.csv) y escribe
+Id,SalePrice en el formato de los submission_*.csv del modelo.
+
+El archivo se lee por bloques de --chunk-size filas: una primera pasada solo
+lee las columnas imputadas para calcular la moda y la media de limpiar_df sobre
+todo el archivo; la segunda limpia, agrega las características derivadas y
+valúa cada bloque en un pool de procesos, escribiendo los resultados en orden
+conforme terminan. Nunca hay más de 2 x --workers bloques en memoria.
+
+Uso:
+    python score_csv.py ../Model/Data/test.csv --output submission.csv \\
+        [--model simple] [--chunk-size 5000] [--workers 4]
+"""
+import os
+
+# Un hilo de OpenMP por proceso: el paralelismo viene del pool.
+# Debe fijarse antes de que se importe xgboost.
+os.environ.setdefault('OMP_NUM_THREADS', '1')
+
+import argparse  # noqa: E402
+import sys  # noqa: E402
+import time  # noqa: E402
+import warnings  # noqa: E402
+from concurrent.futures import ProcessPoolExecutor  # noqa: E402
+
+import pandas as pd  # noqa: E402
+
+from app.features import MEAN_COLUMNS, MODE_COLUMNS, KaggleFillValues, prepare_kaggle_frame  # noqa: E402
+from config import Config  # noqa: E402
+
+# Estado de cada proceso del pool (se llena en _init_worker)
+_worker = {}
+
+
+def _init_worker(model_type, resources_dir, fill_values):
+    """Carga los modelos una vez por proceso y valida que el elegido prediga"""
+    warnings.filterwarnings('ignore')
+    from app.services import AIService
+
+    if not AIService.load_models(resources_dir):
+        raise RuntimeError("No se pudieron cargar los modelos")
+    handle = AIService.registry().current.get(model_type)
+    if not handle.available or not handle.healthy:
+        raise RuntimeError(f"Modelo {model_type} no disponible: {handle.error}")
+    _worker.update(handle=handle, fill_values=fill_values,
+                   columns=list(AIService._model_columns(handle)))
+
+
+def _score_chunk(index, chunk):
+    """Limpia, deriva características y valúa un bloque; devuelve (índice, ids, precios, errores)"""
+    from app.services import AIService
+
+    ids = chunk['Id'].tolist()
+    frame = prepare_kaggle_frame(chunk, _worker['fill_values'])
+    rows = frame[_worker['columns']].to_dict('records')
+    predictions, errors = AIService._predict_rows(_worker['handle'], rows)
+    return index, ids, predictions, [e for e in errors if e is not None]
+
+
+def fill_values_for(path, chunk_size):
+    """Primera pasada: moda y media de las columnas imputadas sobre todo el archivo"""
+    stats = KaggleFillValues()
+    header = pd.read_csv(path, nrows=0).columns
+    usecols = [c for c in MODE_COLUMNS + MEAN_COLUMNS if c in header]
+    missing = sorted(set(MODE_COLUMNS + MEAN_COLUMNS) - set(usecols))
+    if missing:
+        raise ValueError(f"Columnas faltantes en {path}: {', '.join(missing)}")
+    for chunk in pd.read_csv(path, usecols=usecols, chunksize=chunk_size):
+        stats.update(chunk)
+    return stats.values()
+
+
+class _InlineExecutor:
+    """Misma interfaz que el pool para --workers 1 (sin procesos extra)"""
+
+    def __init__(self, initializer, initargs):
+        initializer(*initargs)
+
+    def submit(self, fn, *args):
+        from concurrent.futures import Future
+
+        future = Future()
+        try:
+            future.set_result(fn(*args))
+        except Exception as e:
+            future.set_exception(e)
+        return future
+
+    def shutdown(self, wait=True, cancel_futures=False):
+        pass
+
+
+def score_csv(path, output, model_type='simple', chunk_size=5000, workers=1,
+              resources_dir=None, progress=True):
+    started = time.perf_counter()
+    fill_values = fill_values_for(path, chunk_size)
+    initargs = (model_type, resources_dir or Config.AI_RESOURCES_DIR, fill_values)
+    if workers > 1:
+        executor = ProcessPoolExecutor(workers, initializer=_init_worker, initargs=initargs)
+    else:
+        executor = _InlineExecutor(_init_worker, initargs)
+
+    totals = {'rows': 0, 'scored': 0, 'failed': 0, 'chunks': 0}
+    first_error = None
+    in_flight = {}
+    next_index = 0
+    max_in_flight = 2 * max(1, workers)
+
+    def write(result):
+        nonlocal first_error
+        _, ids, predictions, errors = result
+        for row_id, prediction in zip(ids, predictions):
+            out.write(f"{row_id},{'' if prediction is None else f'{prediction:.2f}'}\n")
+        totals['rows'] += len(ids)
+        totals['scored'] += sum(1 for p in predictions if p is not None)
+        totals['failed'] += len(errors)
+        totals['chunks'] += 1
+        if errors and first_error is None:
+            first_error = errors[0]
+        if progress:
+            elapsed = time.perf_counter() - started
+            print(f"  {totals['rows']} filas ({totals['rows'] / elapsed:,.0f} filas/s)", file=sys.stderr)
+
+    try:
+        with open(output, 'w', encoding='utf-8', newline='') as out:
+            out.write('Id,SalePrice\n')
+            for index, chunk in enumerate(pd.read_csv(path, chunksize=chunk_size)):
+                in_flight[index] = executor.submit(_score_chunk, index, chunk)
+                # Escribir en orden y acotar los bloques pendientes (memoria constante)
+                while len(in_flight) >= max_in_flight or (next_index in in_flight and in_flight[next_index].done()):
+                    write(in_flight.pop(next_index).result())
+                    next_index += 1
+            while in_flight:
+                write(in_flight.pop(next_index).result())
+                next_index += 1
+    finally:
+        executor.shutdown(wait=True, cancel_futures=True)
+
+    elapsed = time.perf_counter() - started
+    return {
+        **totals,
+        'model': model_type,
+        'workers': workers,
+        'chunk_size': chunk_size,
+        'seconds': round(elapsed, 3),
+        'rows_per_s': round(totals['rows'] / elapsed, 1) if elapsed else 0.0,
+        'first_error': first_error,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('input', help='CSV con el formato de Kaggle (con columna Id)')
+    parser.add_argument('--output', required=True, help='CSV de salida Id,SalePrice')
+    parser.add_argument('--model', choices=('simple', 'complex'), default='simple')
+    parser.add_argument('--chunk-size', type=int, default=5000)
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--resources-dir', help='Carpeta de artefactos (por defecto AI_RESOURCES_DIR)')
+    parser.add_argument('--quiet', action='store_true', help='Sin progreso por bloque')
+    args = parser.parse_args()
+
+    warnings.filterwarnings('ignore')
+    try:
+        result = score_csv(args.input, args.output, args.model, args.chunk_size,
+                           args.workers, args.resources_dir, progress=not args.quiet)
+    except (RuntimeError, ValueError) as e:
+        sys.exit(f"❌ {e}")
+    print(f"Filas: {result['rows']}, valuadas: {result['scored']}, con error: {result['failed']} "
+          f"({result['seconds']:.2f}s, {result['rows_per_s']:,.0f} filas/s, "
+          f"{result['workers']} procesos, bloques de {result['chunk_size']})")
+    if result['first_error']:
+        print(f"Primer error: {result['first_error']}")
+
+
+if __name__ == '__main__':
+    main()
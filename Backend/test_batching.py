@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+MicroBatcher: concurrent rows are coalesced into one predict call, each caller
+gets its own result back and the queueing metrics are recorded.
+"""
+
+import threading
+
+import numpy as np
+import pytest
+
+from app.batching import MicroBatcher
+
+
+class _RecordingModel:
+    def __init__(self, fail=False):
+        self.batch_sizes = []
+        self.fail = fail
+
+    def __call__(self, X):
+        self.batch_sizes.append(len(X))
+        if self.fail:
+            raise RuntimeError("booster failed")
+        return X[:, 0] * 10
+
+
+def _submit_concurrently(batcher, values):
+    barrier = threading.Barrier(len(values))
+    results = [None] * len(values)
+
+    def call(i):
+        barrier.wait()
+        results[i] = batcher.predict(np.array([[values[i], 0.0]], dtype=np.float32), timeout=5)
+
+    threads = [threading.Thread(target=call, args=(i,)) for i in range(len(values))]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return results
+
+
+def test_concurrent_rows_share_a_batch_and_get_their_own_result():
+    model = _RecordingModel()
+    batcher = MicroBatcher(model, max_batch_size=64, max_wait_ms=200)
+    values = list(range(16))
+
+    results = _submit_concurrently(batcher, values)
+    batcher.close()
+
+    assert results == [v * 10.0 for v in values]
+    assert sum(model.batch_sizes) == 16
+    assert max(model.batch_sizes) > 1
+    stats = batcher.stats()
+    assert stats["rows"] == 16 and stats["batches"] == len(model.batch_sizes)
+    assert stats["queue_depth"] == 0
+    assert stats["queue_delay_ms"]["buckets"]["+Inf"] == 16
+
+
+def test_max_batch_size_is_respected():
+    model = _RecordingModel()
+    delays = []
+    batcher = MicroBatcher(model, max_batch_size=4, max_wait_ms=200, observe_delay=delays.append)
+
+    _submit_concurrently(batcher, list(range(10)))
+    batcher.close()
+
+    assert max(model.batch_sizes) <= 4
+    assert sum(model.batch_sizes) == 10
+    # One queueing delay (in seconds) per row for the Prometheus histogram
+    assert len(delays) == 10 and all(0 <= d < 5 for d in delays)
+
+
+def test_batch_failure_is_raised_to_every_caller():
+    batcher = MicroBatcher(_RecordingModel(fail=True), max_wait_ms=0)
+
+    with pytest.raises(RuntimeError, match="booster failed"):
+        batcher.predict(np.zeros((1, 2), dtype=np.float32), timeout=5)
+    batcher.close()
+
+
+def test_closed_batcher_predicts_in_the_callers_thread():
+    model = _RecordingModel()
+    batcher = MicroBatcher(model, max_wait_ms=0)
+    batcher.close()
+
+    assert batcher.closed
+    assert batcher.predict(np.array([[3.0, 0.0]], dtype=np.float32), timeout=5) == 30.0
+    assert batcher.stats()["batches"] == 0
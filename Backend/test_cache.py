@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""
+TTLCache: hits and misses, expiry, LRU eviction order and the zero-size
+(disabled) cache.
+"""
+
+import pytest
+
+from app import cache
+from app.cache import TTLCache
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = _Clock()
+    monkeypatch.setattr(cache.time, "monotonic", clock)
+    return clock
+
+
+def test_hits_and_misses_are_counted():
+    c = TTLCache(max_size=4, ttl=60)
+    assert c.get("a") is None
+    assert c.get("a", "default") == "default"
+    c.set("a", 1)
+    assert c.get("a") == 1
+
+    stats = c.stats()
+    assert (stats["hits"], stats["misses"], stats["size"]) == (1, 2, 1)
+    assert stats["hit_rate"] == pytest.approx(1 / 3, abs=1e-4)
+
+
+def test_entries_expire_after_ttl(clock):
+    c = TTLCache(max_size=4, ttl=10)
+    c.set("a", 1)
+    clock.now += 9.9
+    assert c.get("a") == 1
+    clock.now += 0.1
+    assert c.get("a") is None
+    assert len(c) == 0
+    assert c.stats()["expirations"] == 1
+
+
+def test_least_recently_used_entry_is_evicted():
+    c = TTLCache(max_size=2, ttl=60)
+    c.set("a", 1)
+    c.set("b", 2)
+    c.get("a")          # "b" is now the least recently used
+    c.set("c", 3)
+
+    assert c.get("b") is None
+    assert (c.get("a"), c.get("c")) == (1, 3)
+    assert c.stats()["evictions"] == 1
+
+
+def test_zero_size_cache_stores_nothing():
+    c = TTLCache(max_size=0, ttl=60)
+    c.set("a", 1)
+    assert c.get("a") is None and len(c) == 0
+
@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+Server-side feature engineering (app/features.py) against the notebook's
+add_engineered_features, for DataFrames, request dicts and stored houses.
+"""
+
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.impute import SimpleImputer
+
+from app import db
+from app.features import DERIVED_FEATURES, engineer_record, engineer_records, prepare_kaggle_frame
+from app.models import Vendor
+from app.services import HouseService
+
+pytestmark = pytest.mark.filterwarnings("ignore::UserWarning")
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+TEST_CSV = os.path.join(BACKEND_DIR, "..", "Model", "Data", "test.csv")
+
+
+def _notebook_frame():
+    """DataCleansing.ipynb verbatim: drop_columns, limpiar_df, add_engineered_features"""
+    df = pd.read_csv(TEST_CSV)
+    df = df.drop(columns=["Id", "Utilities", "Condition2", "LandSlope", "LowQualFinSF",
+                          "MiscVal", "Street", "RoofMatl", "Heating"])
+
+    cols_moda = ["MSZoning", "BsmtQual", "BsmtCond", "BsmtExposure", "BsmtFinType1",
+                 "BsmtFinType2", "FireplaceQu", "GarageType", "GarageYrBlt",
+                 "GarageFinish", "GarageQual", "GarageCond"]
+    df[cols_moda] = SimpleImputer(strategy="most_frequent").fit_transform(df[cols_moda])
+    cols_media = ["LotFrontage", "MasVnrArea"]
+    df[cols_media] = SimpleImputer(strategy="mean").fit_transform(df[cols_media])
+    df = df.drop(columns=["MasVnrType", "MiscFeature", "PoolQC", "Alley"])
+
+    df["HouseAge"] = df["YrSold"] - df["YearBuilt"]
+    df["RemodAge"] = df["YrSold"] - df["YearRemodAdd"]
+    df["AgeAtRemodel"] = df["YearRemodAdd"] - df["YearBuilt"]
+    df["GarageAge"] = df["YrSold"] - df["GarageYrBlt"]
+    df.loc[df["GarageYrBlt"].isna(), "GarageAge"] = np.nan
+    df.loc[df["GarageAge"] < 0, "GarageAge"] = np.nan
+    df["BsmtFinSF"] = df["BsmtFinSF1"].fillna(0) + df["BsmtFinSF2"].fillna(0)
+    df["TotalSF"] = df["1stFlrSF"].fillna(0) + df["2ndFlrSF"].fillna(0) + df["TotalBsmtSF"].fillna(0)
+    df["TotalPorchSF"] = (df["OpenPorchSF"].fillna(0) + df["EnclosedPorch"].fillna(0)
+                          + df["3SsnPorch"].fillna(0) + df["WoodDeckSF"].fillna(0))
+    df["TotalBath"] = (df["FullBath"].fillna(0) + 0.5 * df["HalfBath"].fillna(0)
+                       + df["BsmtFullBath"].fillna(0) + 0.5 * df["BsmtHalfBath"].fillna(0))
+    df["RoomsPlusBathEq"] = (df["TotRmsAbvGrd"].fillna(0) + df["FullBath"].fillna(0)
+                             + 0.5 * df["HalfBath"].fillna(0))
+    df["LotFrontageRatio"] = df["LotFrontage"] / df["LotArea"].replace(0, np.nan)
+    df["LotAreaPerRoom"] = df["LotArea"] / df["TotRmsAbvGrd"].replace(0, np.nan)
+    df["GarageScore"] = df["GarageCars"].fillna(0) * df["GarageArea"].fillna(0)
+    df["HasPool"] = (df["PoolArea"].fillna(0) > 0).astype(int)
+    df["HasFireplace"] = (df["Fireplaces"].fillna(0) > 0).astype(int)
+    df["Remodeled"] = (df["YearRemodAdd"] != df["YearBuilt"]).astype(int)
+    df["Has2ndFlr"] = (df["2ndFlrSF"].fillna(0) > 0).astype(int)
+    df["HasBsmt"] = (df["TotalBsmtSF"].fillna(0) > 0).astype(int)
+    df["HasGarage"] = (df["GarageArea"].fillna(0) > 0).astype(int)
+    df["HasFence"] = (~df["Fence"].isna()).astype(int)
+    season = {12: "Invierno", 1: "Invierno", 2: "Invierno", 3: "Primavera", 4: "Primavera",
+              5: "Primavera", 6: "Verano", 7: "Verano", 8: "Verano", 9: "Otoño",
+              10: "Otoño", 11: "Otoño"}
+    df["SeasonSold"] = df["MoSold"].map(season)
+    return df
+
+
+@pytest.fixture(scope="module")
+def notebook_frame():
+    return _notebook_frame()
+
+
+def _assert_same(actual, expected):
+    if expected.dtype == object:
+        assert list(actual.astype(object).where(actual.notna(), None)) == \
+            list(expected.where(expected.notna(), None))
+    else:
+        np.testing.assert_allclose(actual.astype(float), expected.astype(float))
+
+
+def test_prepare_kaggle_frame_matches_notebook(notebook_frame):
+    frame = prepare_kaggle_frame(pd.read_csv(TEST_CSV))
+
+    assert list(frame.columns) == list(notebook_frame.columns)
+    for name in DERIVED_FEATURES:
+        _assert_same(frame[name], notebook_frame[name])
+    # GarageAge stays object like in the notebook; the full pipeline's encoder needs it
+    assert frame["GarageAge"].dtype == notebook_frame["GarageAge"].dtype
+
+
+def test_engineer_records_matches_notebook_row_by_row(notebook_frame):
+    raw = notebook_frame.drop(columns=list(DERIVED_FEATURES)).to_dict("records")
+    rows = engineer_records(raw)
+
+    for name in DERIVED_FEATURES:
+        values = pd.Series([row[name] for row in rows])
+        _assert_same(values.astype(notebook_frame[name].dtype), notebook_frame[name])
+    # Inputs are not modified
+    assert "TotalSF" not in raw[0]
+    # Single rows take the scalar path; it must agree with the vectorized one
+    for raw_row, row in zip(raw[:200], rows[:200]):
+        single = engineer_record(raw_row)
+        for name in DERIVED_FEATURES:
+            assert single[name] == pytest.approx(row[name], nan_ok=True) or single[name] == row[name]
+
+
+def test_engineer_record_keeps_provided_values_without_inputs():
+    data = {"TotalSF": 2500.0, "GarageCars": 2.0, "GarageArea": 400.0, "GarageScore": 6.0}
+    result = engineer_record(data, {"TotalSF", "GarageScore", "HouseAge"})
+
+    assert result["TotalSF"] == 2500.0    # 1stFlrSF/2ndFlrSF/TotalBsmtSF not sent
+    assert result["GarageScore"] == 800.0  # recomputed like in training
+    assert "HouseAge" not in result        # YrSold not sent
+    assert data["GarageScore"] == 6.0
+
+
+def test_create_house_stores_derived_columns(app):
+    vendor = Vendor(email="f@example.com", username="features", password="x")
+    db.session.add(vendor)
+    db.session.commit()
+    created = HouseService.create_house(vendor.vendor_id, {
+        "title": "Casa", "sale_price": 150000, "total_sf": 1.0,
+        "first_flr_sf": 1000.0, "second_flr_sf": 500.0, "total_bsmt_sf": 800.0,
+        "garage_cars": 2.0, "garage_area": 500.0,
+        "full_bath": 2.0, "half_bath": 1.0, "bsmt_full_bath": 1.0, "bsmt_half_bath": 0.0,
+        "year_built": 2000.0, "year_remod_add": 2005.0, "yr_sold": 2010.0,
+        "house_age": 3.0,
+    })
+
+    assert created["total_sf"] == 2300.0
+    assert created["garage_score"] == 1000.0
+    assert created["total_bath"] == 3.5
+    assert created["house_age"] == 10.0
+    assert created["remod_age"] == 5.0
+    # Inputs missing for the porch total: nothing stored
+    assert created["total_porch_sf"] is None
@@ -0,0 +1,226 @@
+#!/usr/bin/env python3
+"""
+In-memory house index: matching and ranking over the NumPy columns return the
+same houses as the SQL path, and create_house/delete_house update it without
+a rebuild.
+"""
+
+import random
+import threading
+import time
+
+import pytest
+
+from app import db
+from app.matching import CATEGORICAL_COLUMNS, CRITERIA_BY_NAME, MATCH_CRITERIA, RANGE_COLUMNS, row_matches
+from app.cache import TTLCache
+from app.house_index import HouseIndex
+from app.models import Client, ClientPreferences, Vendor, VendorHouse
+from app.services import HouseService, PreferencesService, house_index
+
+pytestmark = pytest.mark.filterwarnings("ignore::UserWarning")
+
+CATEGORIES = ["A", "B", "C", None]
+AIR = ["Y", "N", "1", "SÍ", None]
+
+
+def _random_inventory(rng, vendor_id, count):
+    for n in range(count):
+        house = VendorHouse(vendor_id=vendor_id, title=f"Casa {n}",
+                            sale_price=rng.choice([90000, 150000, 210000, 300000]),
+                            status=rng.choice(["available", "available", "sold"]))
+        for column in RANGE_COLUMNS:
+            if column != "sale_price":
+                setattr(house, column, rng.choice([None, 1.0, 2.0, 3.0, 5.0, 1500.0]))
+        for column in CATEGORICAL_COLUMNS:
+            setattr(house, column, rng.choice(AIR if column == "central_air" else CATEGORIES))
+        db.session.add(house)
+    db.session.commit()
+
+
+def _random_preferences(rng, client_id):
+    prefs = ClientPreferences(client_id=client_id)
+    for criterion in rng.sample(MATCH_CRITERIA, rng.randint(0, 4)):
+        if criterion.kind == "range":
+            low, high = sorted(rng.sample([1.0, 2.0, 3.0, 1500.0, 100000.0, 250000.0], 2))
+            setattr(prefs, criterion.attrs[0], rng.choice([low, None]))
+            setattr(prefs, criterion.attrs[1], rng.choice([high, None]))
+        elif criterion.kind == "equals":
+            setattr(prefs, criterion.attrs[0], rng.choice(["A", "B", "Z"]))
+        else:
+            setattr(prefs, criterion.attrs[0], True)
+    db.session.add(prefs)
+    db.session.commit()
+
+
+def _matched_ids(client_id):
+    result = PreferencesService.find_matching_houses(client_id, mode="all")
+    return [m["house"]["house_id"] for m in result["matches"]]
+
+
+def _ranked(client_id, limit, offset=0):
+    result = PreferencesService.find_matching_houses(client_id, limit=limit, offset=offset)
+    page = [(m["house"]["house_id"], m["score"], m["matched_criteria"]) for m in result["matches"]]
+    return result["total_matches"], page
+
+
+def test_index_matches_sql_query(app, monkeypatch):
+    rng = random.Random(7)
+    vendor = Vendor(email="v@example.com", username="vendor", password="x")
+    client = Client(email="c@example.com", username="client", password="x")
+    db.session.add_all([vendor, client])
+    db.session.commit()
+    _random_inventory(rng, vendor.vendor_id, 400)
+    # Both paths must actually run on every call
+    monkeypatch.setattr(PreferencesService, "_recommendation_cache", TTLCache(max_size=0))
+
+    for _ in range(40):
+        _random_preferences(rng, client.client_id)
+        monkeypatch.setitem(app.config, "HOUSE_INDEX_ENABLED", False)
+        expected = _matched_ids(client.client_id)
+        expected_ranked = _ranked(client.client_id, limit=15, offset=5)
+        monkeypatch.setitem(app.config, "HOUSE_INDEX_ENABLED", True)
+        assert _matched_ids(client.client_id) == expected
+        assert _ranked(client.client_id, limit=15, offset=5) == expected_ranked
+
+
+def test_sql_statements_are_shared_by_preference_shape(app, monkeypatch):
+    monkeypatch.setitem(app.config, "HOUSE_INDEX_ENABLED", False)
+    monkeypatch.setattr(PreferencesService, "_match_statements", TTLCache(max_size=16, ttl=float("inf")))
+    vendor = Vendor(email="v@example.com", username="vendor", password="x")
+    clients = [Client(email=f"c{n}@example.com", username=f"client{n}", password="x") for n in range(3)]
+    db.session.add_all([vendor, *clients])
+    db.session.commit()
+    for n, price in enumerate([100000, 200000, 300000]):
+        db.session.add(VendorHouse(vendor_id=vendor.vendor_id, title=f"Casa {n}", sale_price=price))
+    for client, (low, high) in zip(clients, [(50000, 150000), (150000, 350000), (None, 150000)]):
+        db.session.add(ClientPreferences(client_id=client.client_id, min_sale_price=low, max_sale_price=high))
+    db.session.commit()
+
+    prices = []
+    for client in clients:
+        result = PreferencesService.find_matching_houses(client.client_id, mode="all")
+        prices.append([m["house"]["sale_price"] for m in result["matches"]])
+    assert prices == [[100000], [200000, 300000], [100000]]
+    # The first two clients share a shape; the third has no lower bound
+    assert PreferencesService._match_statements.stats()["size"] == 2
+
+
+def test_ranked_pages_are_ordered_and_bounded(app):
+    rng = random.Random(11)
+    vendor = Vendor(email="v@example.com", username="vendor", password="x")
+    client = Client(email="c@example.com", username="client", password="x")
+    db.session.add_all([vendor, client])
+    db.session.commit()
+    _random_inventory(rng, vendor.vendor_id, 300)
+    db.session.add(ClientPreferences(client_id=client.client_id, min_sale_price=100000, max_sale_price=220000,
+                                     preferred_neighborhood="A", preferred_bsmt_qual="B", min_total_sf=2.0))
+    db.session.commit()
+
+    total, first = _ranked(client.client_id, limit=10)
+    _, second = _ranked(client.client_id, limit=10, offset=10)
+    _, both = _ranked(client.client_id, limit=20)
+    assert total == len(_matched_ids(client.client_id)) > 20
+    assert len(first) == 10 and first + second == both
+
+    keys = [(-score, house_id) for house_id, score, _ in both]
+    assert keys == sorted(keys)
+    # A house matching price, neighborhood and size outranks one matching only the basement
+    assert set(both[0][2]) >= {"sale_price", "neighborhood"}
+    assert 0 < both[-1][1] <= both[0][1] <= 1
+
+
+def test_create_and_delete_update_index_without_rebuild(app):
+    vendor = Vendor(email="v@example.com", username="vendor", password="x")
+    client = Client(email="c@example.com", username="client", password="x")
+    db.session.add_all([vendor, client])
+    db.session.commit()
+    db.session.add(ClientPreferences(client_id=client.client_id, preferred_neighborhood="NAmes"))
+    db.session.commit()
+
+    assert _matched_ids(client.client_id) == []
+    rebuilds = house_index.rebuilds
+
+    house = HouseService.create_house(vendor.vendor_id, {"title": "Casa", "sale_price": 1, "neighborhood": "NAmes"})
+    assert _matched_ids(client.client_id) == [house["house_id"]]
+    assert HouseService.delete_house(house["house_id"])
+    assert _matched_ids(client.client_id) == []
+    assert house_index.rebuilds == rebuilds
+    assert len(house_index) == 0
+
+
+def test_ranked_total_excludes_houses_missing_from_the_database(app):
+    vendor = Vendor(email="v@example.com", username="vendor", password="x")
+    client = Client(email="c@example.com", username="client", password="x")
+    db.session.add_all([vendor, client])
+    db.session.commit()
+    db.session.add(ClientPreferences(client_id=client.client_id, preferred_neighborhood="NAmes"))
+    houses = [HouseService.create_house(vendor.vendor_id, {"title": f"Casa {n}", "sale_price": 1,
+                                                           "neighborhood": "NAmes"}) for n in range(3)]
+    assert _ranked(client.client_id, limit=10)[0] == 3
+
+    # Deleted behind the index's back (no version bump): dropped from the page and the total
+    db.session.delete(db.session.get(VendorHouse, houses[1]["house_id"]))
+    db.session.commit()
+    PreferencesService.reset_recommendation_cache()
+    total, page = _ranked(client.client_id, limit=10)
+    assert total == 2
+    assert [house_id for house_id, _, _ in page] == [houses[0]["house_id"], houses[2]["house_id"]]
+
+
+def test_concurrent_queries_rebuild_once_and_a_failed_load_is_retried():
+    calls = []
+
+    def load():
+        calls.append(1)
+        time.sleep(0.05)
+        if len(calls) == 1:
+            raise RuntimeError("database unavailable")
+        return [(1, {"sale_price": 1.0})]
+
+    index = HouseIndex(load)
+    with pytest.raises(RuntimeError):
+        index.ensure_fresh()
+    assert index._stale and index.rebuilds == 0
+
+    threads = [threading.Thread(target=index.ensure_fresh) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert len(calls) == 2 and index.rebuilds == 1
+    assert index.match([]).tolist() == [1]
+
+
+def test_text_criteria_ignore_case_and_trailing_spaces_like_mysql():
+    # MySQL's default collation compares 'NAmes' = 'names' = 'NAmes ' as equal
+    houses = [(1, {"neighborhood": "NAmes", "central_air": "y"}),
+              (2, {"neighborhood": "OldTown ", "central_air": "N"})]
+    index = HouseIndex(lambda: houses)
+    neighborhood, air = CRITERIA_BY_NAME["neighborhood"], CRITERIA_BY_NAME["central_air"]
+
+    for value in ("names", "NAmes ", "NAMES"):
+        assert index.match([(neighborhood, value)]).tolist() == [1]
+        assert row_matches(neighborhood, value, "NAmes")
+    assert index.match([(neighborhood, "oldtown")]).tolist() == [2]
+    assert index.match([(air, True)]).tolist() == [1]
+    assert row_matches(air, True, "Sí ") and not row_matches(air, True, "n")
+
+
+def test_app_config_reaches_the_services(make_app):
+    app = make_app(HOUSE_INDEX_ENABLED=False, RECOMMENDATIONS_CACHE_SIZE=0)
+    with app.app_context():
+        try:
+            vendor = Vendor(email="v@example.com", username="vendor", password="x")
+            client = Client(email="c@example.com", username="client", password="x")
+            db.session.add_all([vendor, client])
+            db.session.commit()
+            db.session.add(ClientPreferences(client_id=client.client_id, preferred_neighborhood="NAmes"))
+            HouseService.create_house(vendor.vendor_id, {"title": "Casa", "sale_price": 1, "neighborhood": "NAmes"})
+
+            rebuilds = house_index.rebuilds
+            assert len(_matched_ids(client.client_id)) == 1
+            assert house_index.rebuilds == rebuilds
+            assert PreferencesService.get_recommendation_stats()["cache"]["max_size"] == 0
+        finally:
+            db.drop_all()
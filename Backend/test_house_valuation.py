@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+Persisted valuations on vendor_houses: create_house scores the new listing and
+the backfill only re-scores rows that are new, changed or from an older model.
+"""
+
+import json
+import os
+
+import pytest
+
+from app import db
+from app.models import Vendor, VendorHouse
+from app.services import AIService, HouseService
+
+pytestmark = pytest.mark.filterwarnings("ignore::UserWarning")
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+@pytest.fixture(scope="module")
+def app(make_app):
+    app = make_app()
+    with app.app_context():
+        yield app
+        db.drop_all()
+
+
+@pytest.fixture
+def vendor(app):
+    vendor = Vendor(email="v@example.com", username="vendor", password="x")
+    db.session.add(vendor)
+    db.session.commit()
+    yield vendor
+    VendorHouse.query.delete()
+    db.session.delete(vendor)
+    db.session.commit()
+
+
+def _house_data(**overrides):
+    with open(os.path.join(BACKEND_DIR, "sample_data_top20.json"), encoding="utf-8") as f:
+        sample = json.load(f)
+    data = {
+        "title": "Casa", "sale_price": 180000,
+        "central_air": sample["CentralAir"], "neighborhood": sample["Neighborhood"],
+        "sale_condition": sample["SaleCondition"], "total_sf": sample["TotalSF"],
+        "overall_qual": sample["OverallQual"], "overall_cond": sample["OverallCond"],
+        "gr_liv_area": sample["GrLivArea"], "lot_area": sample["LotArea"],
+        "house_age": sample["HouseAge"], "total_bath": sample["TotalBath"],
+        "bsmt_fin_sf1": sample["BsmtFinSF1"], "garage_score": sample["GarageScore"],
+        "year_built": sample["YearBuilt"], "second_flr_sf": sample["2ndFlrSF"],
+        "rooms_plus_bath_eq": sample["RoomsPlusBathEq"], "remod_age": sample["RemodAge"],
+        "garage_area": sample["GarageArea"], "fireplaces": sample["Fireplaces"],
+        "first_flr_sf": sample["1stFlrSF"], "year_remod_add": sample["YearRemodAdd"],
+    }
+    data.update(overrides)
+    return data, sample
+
+
+def test_create_house_stores_server_side_valuation(vendor):
+    data, sample = _house_data(predicted_price=1.0, model_version="client")
+    house = HouseService.create_house(vendor.vendor_id, data)
+
+    expected = AIService.predict_simple(sample)["predicted_price"]
+    assert house["predicted_price"] == pytest.approx(expected)
+    assert house["model_version"].startswith("simple-")
+    assert house["scored_at"] is not None
+
+
+def test_backfill_rescores_only_new_changed_or_stale_rows(vendor):
+    ids = [HouseService.create_house(vendor.vendor_id, _house_data()[0])["house_id"] for _ in range(5)]
+    # Legacy rows without a valuation, one edited row and one scored by an older model
+    VendorHouse.query.filter(VendorHouse.house_id.in_(ids[:2])).update(
+        {"predicted_price": None, "model_version": None, "scored_features_hash": None})
+    VendorHouse.query.filter_by(house_id=ids[2]).update({"gr_liv_area": 2500.0})
+    VendorHouse.query.filter_by(house_id=ids[3]).update({"model_version": "simple-old"})
+    db.session.commit()
+
+    totals = HouseService.backfill_predictions(chunk_size=2)
+    assert totals == {"scanned": 5, "scored": 4, "skipped": 1, "failed": 0}
+
+    changed = db.session.get(VendorHouse, ids[2])
+    unchanged = db.session.get(VendorHouse, ids[4])
+    assert changed.predicted_price != unchanged.predicted_price
+    assert HouseService.backfill_predictions(chunk_size=2)["scored"] == 0
@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+"""
+Parity test for the pandas-free inference path.
+Runs Model/Data/test.csv through the notebook's cleaning steps and checks that
+the precompiled encoder + booster reproduce the sklearn pipelines exactly.
+"""
+
+import os
+
+import joblib
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.features import prepare_kaggle_frame
+from app.inference import CompiledModel, FeatureEncoder
+
+pytestmark = pytest.mark.filterwarnings("ignore::UserWarning")
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+RESOURCES_DIR = os.path.join(BACKEND_DIR, "resources")
+TEST_CSV = os.path.join(BACKEND_DIR, "..", "Model", "Data", "test.csv")
+
+PIPELINES = {
+    "complex": "xgb_full_pipeline.pkl",
+    "simple": "xgb_top20_pipeline.pkl",
+}
+
+
+def _kaggle_test_frame():
+    """Same steps as DataCleansing.ipynb: drop_columns, limpiar_df, add_engineered_features"""
+    # Remaining NaNs are kept on purpose so the pipelines' imputers are exercised too
+    return prepare_kaggle_frame(pd.read_csv(TEST_CSV))
+
+
+@pytest.fixture(scope="module")
+def test_frame():
+    return _kaggle_test_frame()
+
+
+@pytest.fixture(scope="module", params=sorted(PIPELINES))
+def pipeline(request):
+    return request.param, joblib.load(os.path.join(RESOURCES_DIR, PIPELINES[request.param]))
+
+
+def _inputs(pipeline, frame):
+    return frame[list(pipeline.steps[0][1].feature_names_in_)]
+
+
+def _records(pipeline, frame):
+    return _inputs(pipeline, frame).to_dict("records")
+
+
+def test_encoder_matches_column_transformer(pipeline, test_frame):
+    _, pipe = pipeline
+    encoder = FeatureEncoder.from_pipeline(pipe)
+    rows = _records(pipe, test_frame)
+
+    # The frame keeps the notebook dtypes (GarageYrBlt/GarageAge as object),
+    # which the fitted OneHotEncoder of the full pipeline requires
+    expected = pipe.steps[0][1].transform(_inputs(pipe, test_frame)).astype(np.float32)
+    np.testing.assert_array_equal(encoder.encode_many(rows), expected)
+    np.testing.assert_array_equal(encoder.encode(rows[0]), expected[:1])
+
+
+def test_compiled_model_matches_pipeline_predict(pipeline, test_frame):
+    model_type, pipe = pipeline
+    try:
+        compiled = CompiledModel.from_pipeline(model_type, pipe)
+    except Exception as e:
+        pytest.skip(f"{PIPELINES[model_type]} has no fitted booster: {e}")
+    rows = _records(pipe, test_frame)
+
+    expected = pipe.predict(_inputs(pipe, test_frame))
+    np.testing.assert_array_equal(compiled.predict_many(rows), expected)
+    single = [compiled.predict_one(row) for row in rows]
+    np.testing.assert_array_equal(np.asarray(single, dtype=expected.dtype), expected)
+
+
+def test_encoder_rejects_unknown_and_missing_fields(pipeline, test_frame):
+    _, pipe = pipeline
+    encoder = FeatureEncoder.from_pipeline(pipe)
+    row = _records(pipe, test_frame)[0]
+
+    with pytest.raises(ValueError, match="desconocidos"):
+        encoder.encode({**row, "NotAColumn": 1})
+    missing = dict(row)
+    missing.pop(encoder.required_columns[0])
+    with pytest.raises(ValueError, match="faltantes"):
+        encoder.encode(missing)
+    # Raw Kaggle columns dropped by the notebook are accepted and ignored
+    encoder.encode({**row, "Id": 1461, "Street": "Pave"})
+
+
+def test_native_export_round_trip(pipeline, test_frame, tmp_path):
+    model_type, pipe = pipeline
+    try:
+        compiled = CompiledModel.from_pipeline(model_type, pipe)
+    except Exception as e:
+        pytest.skip(f"{PIPELINES[model_type]} has no fitted booster: {e}")
+    spec_path, booster_path = str(tmp_path / "preprocess.json"), str(tmp_path / "booster.ubj")
+    compiled.save(spec_path, booster_path)
+    loaded = CompiledModel.load(spec_path, booster_path)
+    rows = _records(pipe, test_frame)
+
+    np.testing.assert_array_equal(loaded.predict_many(rows), pipe.predict(_inputs(pipe, test_frame)))
+
+
+def test_numpy_trees_match_pipeline_predict(pipeline, test_frame, tmp_path):
+    model_type, pipe = pipeline
+    try:
+        compiled = CompiledModel.from_pipeline(model_type, pipe)
+    except Exception as e:
+        pytest.skip(f"{PIPELINES[model_type]} has no fitted booster: {e}")
+    compiled.use_numpy_trees()
+    rows = _records(pipe, test_frame)
+    expected = pipe.predict(_inputs(pipe, test_frame))
+
+    # Same leaves as XGBoost; only the float32 summation order of the leaf values differs
+    np.testing.assert_allclose(compiled.predict_many(rows), expected, rtol=1e-4)
+    assert compiled.predict_one(rows[0]) == pytest.approx(expected[0], rel=1e-4)
+
+    spec_path, booster_path, trees_path = (str(tmp_path / name) for name in
+                                           ("preprocess.json", "booster.ubj", "trees.npz"))
+    compiled.save(spec_path, booster_path, trees_path)
+    loaded = CompiledModel.load(spec_path, trees_path=trees_path)
+    assert loaded.engine == "numpy" and loaded.booster is None
+    np.testing.assert_array_equal(loaded.predict_many(rows), compiled.predict_many(rows))
+
+
+def test_numpy_engine_serves_without_importing_xgboost():
+    import subprocess
+    import sys
+
+    script = (
+        "import json, sys\n"
+        "from app.inference import CompiledModel\n"
+        "model = CompiledModel.load('resources/xgb_top20_preprocess.json',"
+        " trees_path='resources/xgb_top20_trees.npz')\n"
+        "print(model.predict_one(json.load(open('sample_data_top20.json'))))\n"
+        "assert 'xgboost' not in sys.modules and 'sklearn' not in sys.modules\n"
+    )
+    result = subprocess.run([sys.executable, "-c", script], cwd=BACKEND_DIR,
+                            capture_output=True, text=True)
+    assert result.returncode == 0, result.stderr
+    assert float(result.stdout) > 0
+
+
+def test_sparse_encoder_matches_dense(pipeline, test_frame):
+    _, pipe = pipeline
+    encoder = FeatureEncoder.from_pipeline(pipe)
+    rows = _records(pipe, test_frame)
+
+    # Absent CSR entries are zeros or NaNs (missing) in the dense matrix
+    dense = encoder.encode_many(rows)
+    sparse = encoder.encode_sparse(rows)
+    assert sparse.has_sorted_indices
+    assert not np.isnan(sparse.data).any()
+    np.testing.assert_array_equal(sparse.toarray(), np.nan_to_num(dense, nan=0.0))
+    # Only the one-hot 1s and the present numeric values (zeros included) are stored
+    numeric = np.delete(dense, encoder.onehot_positions, axis=1)
+    assert sparse.nnz == (dense[:, encoder.onehot_positions] == 1).sum() + (~np.isnan(numeric)).sum()
+
+
+def test_sparse_booster_matches_pipeline_predict(pipeline, test_frame):
+    model_type, pipe = pipeline
+    try:
+        compiled = CompiledModel.from_pipeline(model_type, pipe)
+    except Exception as e:
+        pytest.skip(f"{PIPELINES[model_type]} has no fitted booster: {e}")
+    compiled.use_sparse_booster()
+    X = compiled.encoder.encode_sparse(_records(pipe, test_frame))
+
+    np.testing.assert_array_equal(compiled.predict_sparse(X), pipe.predict(_inputs(pipe, test_frame)))
@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+Asynchronous prediction jobs: JSON Lines and CSV uploads, progress, paginated
+and streamed results, cancellation and the pending-jobs limit.
+"""
+import io
+import json
+import os
+import threading
+import time
+
+import pandas as pd
+import pytest
+
+from app.jobs import FINAL_STATES, JobQueue
+from app.services import AIService
+
+pytestmark = pytest.mark.filterwarnings("ignore::UserWarning")
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+TEST_CSV = os.path.join(BACKEND_DIR, "..", "Model", "Data", "test.csv")
+
+
+@pytest.fixture
+def client(make_app, tmp_path):
+    AIService._jobs = None
+    yield make_app(AI_JOBS_DIR=str(tmp_path), AI_JOBS_CHUNK_SIZE=50).test_client()
+    AIService._jobs = None
+
+
+def _wait(client, job_id, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        job = client.get(f"/api/ai/jobs/{job_id}").get_json()
+        if job["status"] in FINAL_STATES:
+            return job
+        time.sleep(0.05)
+    raise AssertionError(f"job {job_id} did not finish")
+
+
+def test_jsonl_job_reports_progress_and_paginates_results(client):
+    with open("sample_data_top20.json") as f:
+        sample = json.load(f)
+    lines = [json.dumps(sample)] * 120
+    lines.insert(7, "{not json")
+    body = "\n".join(lines) + "\n"
+
+    response = client.post("/api/ai/jobs?model=simple", data=body, content_type="application/x-ndjson")
+    assert response.status_code == 202
+    job_id = response.get_json()["job_id"]
+    assert response.headers["Location"] == f"/api/ai/jobs/{job_id}"
+
+    job = _wait(client, job_id)
+    assert job["status"] == "completed"
+    assert job["progress"] == 1.0
+    assert job["rows_total"] == job["rows_processed"] == 121
+    assert (job["success_count"], job["error_count"]) == (120, 1)
+
+    first = client.get(f"/api/ai/jobs/{job_id}/results?limit=10").get_json()
+    assert [r["row"] for r in first["results"]] == list(range(10))
+    assert first["next_offset"] == 10
+    assert "JSON inválido en la línea 8" in first["results"][7]["errors"]["input"]
+    assert first["results"][0]["predictions"]["simple"] > 0
+
+    last = client.get(f"/api/ai/jobs/{job_id}/results?offset=100&limit=50").get_json()
+    assert [r["row"] for r in last["results"]] == list(range(100, 121))
+    assert last["next_offset"] is None
+
+    streamed = client.get(f"/api/ai/jobs/{job_id}/results?format=jsonl")
+    assert streamed.mimetype == "application/x-ndjson"
+    rows = [json.loads(line) for line in streamed.get_data(as_text=True).splitlines()]
+    assert [r["row"] for r in rows] == list(range(121))
+
+
+def test_csv_upload_keeps_ids(client):
+    buffer = io.BytesIO()
+    pd.read_csv(TEST_CSV, nrows=60).to_csv(buffer, index=False)
+    buffer.seek(0)
+
+    response = client.post("/api/ai/jobs?model=simple", data={"file": (buffer, "houses.csv")},
+                           content_type="multipart/form-data")
+    assert response.status_code == 202
+    job = _wait(client, response.get_json()["job_id"])
+    assert job["status"] == "completed"
+    assert job["rows_processed"] == 60
+
+    results = client.get(f"/api/ai/jobs/{job['job_id']}/results").get_json()["results"]
+    assert results[0]["id"] == 1461
+    assert all(r["status"] == "success" for r in results)
+
+
+def test_cancel_and_pending_limit(client, tmp_path):
+    release = threading.Event()
+
+    def blocking_score(rows, model):
+        release.wait(10)
+        return [{"status": "success", "predictions": {model: 1.0}, "errors": {}} for _ in rows]
+
+    AIService._jobs = JobQueue(str(tmp_path), blocking_score, workers=1, max_pending=1, chunk_size=1)
+    body = "\n".join(json.dumps({"OverallQual": n}) for n in range(5))
+
+    job_id = client.post("/api/ai/jobs", data=body, content_type="application/x-ndjson").get_json()["job_id"]
+    full = client.post("/api/ai/jobs", data=body, content_type="application/x-ndjson")
+    assert full.status_code == 429
+    assert "Retry-After" in full.headers
+
+    cancel = client.post(f"/api/ai/jobs/{job_id}/cancel")
+    assert cancel.status_code == 202
+    release.set()
+    job = _wait(client, job_id)
+    assert job["status"] == "cancelled"
+    assert job["rows_processed"] < 5
+    assert client.post(f"/api/ai/jobs/{job_id}/cancel").status_code == 409
+
+    assert client.get("/api/ai/jobs/not-a-job").status_code == 404
+    assert client.post("/api/ai/jobs", data="a,b\n1,2\n", content_type="text/plain").status_code == 415
+
+
+def test_heartbeat_keeps_a_running_job_alive_and_a_silent_one_is_orphaned(tmp_path):
+    release = threading.Event()
+
+    def blocking_score(rows, model):
+        release.wait(10)
+        return [{"status": "success", "predictions": {model: 1.0}, "errors": {}} for _ in rows]
+
+    owner = JobQueue(str(tmp_path), blocking_score, heartbeat_interval=0.05, heartbeat_timeout=0.5)
+    # Another worker, container or host reading the same directory
+    other = JobQueue(str(tmp_path), blocking_score, heartbeat_interval=0.05, heartbeat_timeout=0.5)
+    try:
+        job_id = owner.submit(io.BytesIO(b'{"OverallQual": 5}\n'), "jsonl", "simple")["job_id"]
+        time.sleep(1.0)
+        assert other.get(job_id)["status"] == "running"
+
+        # The owner stops beating (process gone): the job is failed once the timeout passes
+        owner._owned.clear()
+        time.sleep(0.7)
+        job = other.get(job_id)
+        assert job["status"] == "failed" and "terminó" in job["error"]
+    finally:
+        release.set()
@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+Inference metrics: histogram percentiles, per-stage timers exposed through
+/api/ai/models/status and the Prometheus text endpoint /metrics.
+"""
+import json
+
+import pytest
+
+from app.metrics import Histogram, Metrics, metrics
+from app.services import AIService
+
+pytestmark = pytest.mark.filterwarnings("ignore::UserWarning")
+
+
+@pytest.fixture
+def client(make_app):
+    app = make_app()
+    # Cached predictions skip the model stages
+    AIService._prediction_cache.clear()
+    metrics.reset()
+    yield app.test_client()
+    metrics.reset()
+
+
+def test_histogram_percentiles_interpolate_within_buckets():
+    histogram = Histogram((1, 2, 4, 8))
+    for value in [0.5] * 50 + [3] * 45 + [7] * 5:
+        histogram.observe(value)
+
+    assert histogram.percentile(0.5) == pytest.approx(1.0)
+    assert 2 < histogram.percentile(0.95) <= 4
+    assert 4 < histogram.percentile(0.99) <= 8
+    assert Histogram((1,)).percentile(0.5) is None
+
+
+def test_disabled_metrics_record_nothing():
+    disabled = Metrics(enabled=False)
+    disabled.observe_stage("simple", "predict", 0.001)
+    disabled.inc("ai_requests_total", endpoint="predict_simple", status=200)
+
+    assert disabled.summary()["stages_ms"] == {}
+    assert disabled.summary()["counters"] == {}
+
+
+def test_predictions_populate_stage_timers_and_prometheus_text(client):
+    with open("sample_data_top20.json") as f:
+        sample = json.load(f)
+
+    assert client.post("/api/ai/predict/simple", json=sample).status_code == 200
+    assert client.post("/api/ai/predict/batch?model=simple", json=[sample, sample]).status_code == 200
+    assert client.post("/api/ai/predict/simple", json={"OverallQual": 7}).status_code == 400
+
+    summary = client.get("/api/ai/models/status").get_json()["metrics"]
+    stages = summary["stages_ms"]["simple"]
+    for stage in ("parse", "preprocess", "predict", "serialize", "total"):
+        assert stages[stage]["count"] >= 1
+        assert stages[stage]["p50"] <= stages[stage]["p99"]
+    assert summary["batch_size"]["simple:batch"]["count"] == 1
+    assert summary["counters"]["ai_requests_total"]["endpoint=predict_simple,status=400"] == 1
+    assert summary["counters"]["ai_prediction_errors_total"]["kind=validation,model=simple"] == 1
+
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.mimetype == "text/plain"
+    text = response.get_data(as_text=True)
+    assert "# TYPE ai_stage_duration_seconds histogram" in text
+    assert 'ai_stage_duration_seconds_bucket{model="simple",stage="predict",le="+Inf"}' in text
+    assert 'ai_requests_total{endpoint="predict_simple",status="200"} 1' in text
+    assert 'ai_model_info{model="simple"' in text
+    # Queueing delay of the micro-batched single predictions
+    assert "# TYPE ai_microbatch_queue_delay_seconds histogram" in text
+    assert 'ai_microbatch_queue_delay_seconds_count{model="simple"} 1' in text
@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+"""
+Model registry: versioned artifact directories are loaded, smoke-tested and
+swapped in atomically; in-flight requests keep the handle they started with.
+"""
+
+import json
+import os
+import shutil
+import threading
+import time
+
+import pytest
+
+from app.inference import CompiledModel
+from app.registry import ModelHandle, ModelRegistry, ModelSet
+from app.services import AIService
+from config import Config
+
+pytestmark = pytest.mark.filterwarnings("ignore::UserWarning")
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+RESOURCES_DIR = os.path.join(BACKEND_DIR, "resources")
+SIMPLE_FILES = ("xgb_top20_preprocess.json", "xgb_top20_booster.ubj")
+
+
+def _sample():
+    with open(os.path.join(BACKEND_DIR, "sample_data_top20.json"), encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _write_simple_model(directory, rounds=None):
+    """Native simple model; with rounds, a truncated booster stands in for a retrained one"""
+    os.makedirs(directory, exist_ok=True)
+    for name in SIMPLE_FILES:
+        shutil.copy(os.path.join(RESOURCES_DIR, name), directory)
+    if rounds is not None:
+        model = CompiledModel.load(os.path.join(directory, SIMPLE_FILES[0]),
+                                   os.path.join(directory, SIMPLE_FILES[1]))
+        model.booster[:rounds].save_model(os.path.join(directory, SIMPLE_FILES[1]))
+
+
+@pytest.fixture
+def registry_dirs(tmp_path, monkeypatch):
+    monkeypatch.setattr(Config, "AI_RESOURCES_DIR", str(tmp_path))
+    monkeypatch.setattr(AIService, "_registry", None)
+    _write_simple_model(str(tmp_path / "v1"))
+    assert AIService.load_models(str(tmp_path / "v1"))
+    yield tmp_path
+    AIService.registry().stop_watcher()
+
+
+def test_reload_swaps_version_and_in_flight_handle_keeps_its_own(registry_dirs):
+    before = AIService._models()
+    in_flight = before.get("simple")
+    old_price = AIService.predict_simple(_sample())["predicted_price"]
+
+    _write_simple_model(str(registry_dirs / "v2"), rounds=200)
+    assert AIService.reload_models(str(registry_dirs / "v2"), wait=True)
+
+    after = AIService._models()
+    assert after.version != before.version
+    assert after.get("simple").healthy
+    new_price = AIService.predict_simple(_sample())["predicted_price"]
+    assert new_price != old_price
+    # A request that picked its handle before the swap finishes on the old version
+    assert AIService._predict_single(in_flight, _sample())["predicted_price"] == old_price
+    # The replaced set's batcher is closed; its in-flight requests predict without the queue
+    assert in_flight.batcher.closed
+    assert AIService._predict_single(in_flight, _sample(), use_cache=False)["predicted_price"] == old_price
+
+
+def test_cached_prediction_is_not_served_after_a_reload(registry_dirs):
+    AIService._prediction_cache.clear()
+    first = AIService.predict_simple(_sample())["predicted_price"]
+    hits = AIService._prediction_cache.hits
+    assert AIService.predict_simple(_sample())["predicted_price"] == first
+    assert AIService._prediction_cache.hits == hits + 1
+
+    _write_simple_model(str(registry_dirs / "v2"), rounds=200)
+    assert AIService.load_models(str(registry_dirs / "v2"))
+
+    misses = AIService._prediction_cache.misses
+    assert AIService.predict_simple(_sample())["predicted_price"] != first
+    assert AIService._prediction_cache.misses == misses + 1
+
+
+def test_reload_that_breaks_a_healthy_model_is_rejected(registry_dirs):
+    before = AIService._models()
+    broken = registry_dirs / "broken"
+    _write_simple_model(str(broken))
+    (broken / "xgb_top20_booster.ubj").write_bytes(b"not a model")
+
+    assert AIService.reload_models(str(broken), wait=True)
+
+    assert AIService._models() is before
+    status = AIService.registry().status()
+    assert status["history"][-1]["status"] == "rejected"
+    assert "simple" in status["last_error"]
+
+
+def test_file_watch_reloads_changed_artifacts(registry_dirs):
+    before = AIService._models()
+    AIService.start_watcher(interval=0.05)
+
+    _write_simple_model(str(registry_dirs / "v1"), rounds=100)
+    deadline = time.time() + 10
+    while AIService._models() is before and time.time() < deadline:
+        time.sleep(0.05)
+
+    assert AIService._models().version != before.version
+
+
+def test_rejected_candidate_batchers_are_closed():
+    class _Batcher:
+        closed = False
+
+        def close(self):
+            self.closed = True
+
+    batchers = []
+
+    def loader(resources_dir):
+        batchers.append(_Batcher())
+        return ModelSet(resources_dir, resources_dir, (),
+                        {"simple": ModelHandle("simple", compiled=object(), batcher=batchers[-1])})
+
+    def validator(candidate, current):
+        if candidate.version == "bad":
+            raise ValueError("smoke prediction failed")
+        return candidate
+
+    registry = ModelRegistry(loader, validator)
+    registry.load("v1")
+    with pytest.raises(ValueError):
+        registry.load("bad")
+    assert [b.closed for b in batchers] == [False, True]
+
+    registry.load("v2")
+    assert [b.closed for b in batchers] == [True, True, False]
+
+
+def test_concurrent_first_requests_load_once():
+    calls = []
+
+    def loader(resources_dir):
+        calls.append(resources_dir)
+        time.sleep(0.05)
+        return ModelSet("v", resources_dir, (), {})
+
+    registry = ModelRegistry(loader)
+    threads = [threading.Thread(target=registry.ensure_loaded, args=("dir",)) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert len(calls) == 1
+
+
+def test_admin_reload_endpoint(make_app, registry_dirs):
+    client = make_app(ADMIN_TOKEN="secret", AI_RESOURCES_DIR=str(registry_dirs)).test_client()
+    _write_simple_model(str(registry_dirs / "v2"), rounds=200)
+
+    assert client.post("/api/admin/models/reload").status_code == 401
+    headers = {"X-Admin-Token": "secret"}
+    response = client.post("/api/admin/models/reload", json={"directory": "../"}, headers=headers)
+    assert response.status_code == 400
+
+    response = client.post("/api/admin/models/reload", json={"directory": "v2", "wait": True},
+                           headers=headers)
+    assert response.status_code == 200
+    assert response.get_json()["registry"]["resources_dir"] == str(registry_dirs / "v2")
@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+Batch predictions: invalid rows are reported at their own index, a row that
+breaks the model is isolated by bisection while the rest of the batch still
+gets predictions, and the endpoint rejects empty and oversized batches.
+"""
+
+import json
+import os
+
+import pytest
+
+from app.services import AIService
+
+pytestmark = pytest.mark.filterwarnings("ignore::UserWarning")
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def _sample():
+    with open(os.path.join(BACKEND_DIR, "sample_data_top20.json"), encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _rows(count):
+    sample = _sample()
+    return [dict(sample, GrLivArea=1000.0 + 10 * n) for n in range(count)]
+
+
+def test_mixed_batch_reports_errors_at_their_rows(app, monkeypatch):
+    compiled = AIService._models().get("simple").compiled
+    batches = []
+    predict_matrix = compiled.predict_matrix
+    monkeypatch.setattr(compiled, "predict_matrix", lambda X: batches.append(len(X)) or predict_matrix(X))
+
+    rows = _rows(32)
+    rows[5] = {}                                   # rejected before the model
+    del rows[9]["LotArea"]                         # fails validation
+    rows[20]["GrLivArea"] = "abc"                  # fails inside the batch
+    result = AIService.predict_batch(rows, model="simple")
+
+    statuses = {r["index"]: r["status"] for r in result["results"]}
+    assert [r["index"] for r in result["results"]] == list(range(32))
+    assert {i for i, status in statuses.items() if status == "error"} == {5, 9, 20}
+    assert result["success_count"] == 29 and result["error_count"] == 3
+    assert "input" in result["results"][5]["errors"]
+    assert "LotArea" in result["results"][9]["errors"]["simple"]
+    assert "GrLivArea" in result["results"][20]["errors"]["simple"]
+
+    # Bisection: a handful of predict calls, not one per row
+    assert sum(batches) == 29
+    assert len(batches) < 10
+    AIService._prediction_cache.clear()
+    for i in (0, 19, 21, 31):
+        single = AIService.predict_simple(rows[i])["predicted_price"]
+        assert result["results"][i]["predictions"]["simple"] == pytest.approx(single, rel=1e-6)
+
+
+def test_empty_batch_is_rejected(app):
+    with pytest.raises(ValueError):
+        AIService.predict_batch([], model="simple")
+    http = app.test_client()
+    assert http.post("/api/ai/predict/batch", json=[]).status_code == 400
+    assert http.post("/api/ai/predict/batch", json={"rows": []}).status_code == 400
+
+
+def test_batch_over_the_row_limit_returns_400(make_app):
+    http = make_app(AI_BATCH_MAX_ROWS=3).test_client()
+    response = http.post("/api/ai/predict/batch?model=simple", json=_rows(4))
+    assert response.status_code == 400
+    assert "3" in response.get_json()["error"]
+
+    response = http.post("/api/ai/predict/batch?model=simple", json=_rows(3))
+    assert response.status_code == 200
+    assert response.get_json()["success_count"] == 3
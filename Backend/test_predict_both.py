@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+"""
+predict_both: the two models run at the same time, each one reports its own
+timing, and a failing model does not hide the other model's prediction.
+"""
+
+import json
+import os
+import threading
+
+import pytest
+
+from app.services import AIService
+
+pytestmark = pytest.mark.filterwarnings("ignore::UserWarning")
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+@pytest.fixture
+def sample():
+    with open(os.path.join(BACKEND_DIR, "sample_data_top20.json"), encoding="utf-8") as f:
+        return json.load(f)
+
+
+def test_models_run_concurrently_and_one_failure_is_isolated(app, sample, monkeypatch):
+    # Both calls must be inside _predict_single at once to pass the barrier
+    barrier = threading.Barrier(2, timeout=5)
+    threads = {}
+    predict_single = AIService._predict_single.__func__
+
+    def fake_predict_single(cls, handle, data, df=None, **kwargs):
+        threads[handle.model_type] = threading.get_ident()
+        barrier.wait()
+        if handle.model_type == "complex":
+            raise RuntimeError("booster failed")
+        return predict_single(cls, handle, data, df, **kwargs)
+
+    monkeypatch.setattr(AIService, "_predict_single", classmethod(fake_predict_single))
+    response = app.test_client().post("/api/ai/predict/both", json=sample)
+
+    assert response.status_code == 200
+    body = response.get_json()
+    assert threads["complex"] != threads["simple"]
+    assert body["complex_error"] == "booster failed"
+    assert "complex_prediction" not in body
+    assert body["simple_prediction"]["predicted_price"] > 0
+    timings = body["timings_ms"]
+    assert set(timings) == {"complex", "simple", "total"}
+    assert all(value >= 0 for value in timings.values())
+    assert timings["total"] >= max(timings["complex"], timings["simple"])
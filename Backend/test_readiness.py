@@ -0,0 +1,41 @@
+#!/usr/bin/env python3
+"""
+Readiness gating: /api/ai/* answers 503 + Retry-After while the models load
+in the background, CRUD and health routes answer immediately.
+"""
+
+import pytest
+
+from app.services import AIService
+
+pytestmark = pytest.mark.filterwarnings("ignore::UserWarning")
+
+
+@pytest.fixture
+def client(make_app):
+    app = make_app(AI_BACKGROUND_LOAD=True, AI_RETRY_AFTER_SECONDS=7)
+    yield app.test_client()
+    AIService._load_thread.join()
+
+
+def test_ai_routes_return_503_until_models_are_ready(client, monkeypatch):
+    monkeypatch.setattr(AIService, "_load_state", "loading")
+
+    response = client.post("/api/ai/predict/simple", json={})
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "7"
+    assert client.get("/readyz").status_code == 503
+    # Liveness, model status and CRUD routes do not wait for the models
+    assert client.get("/healthz").status_code == 200
+    assert client.get("/api/ai/models/status").status_code == 200
+    assert client.get("/api/vendors").status_code == 200
+
+
+def test_background_load_reaches_ready_and_warms_up(client):
+    AIService._load_thread.join()
+
+    body = client.get("/readyz").get_json()
+    assert body["ready"] is True
+    assert body["warmup"]["simple"]["status"] == "success"
+    response = client.post("/api/ai/predict/simple", json={})
+    assert response.status_code == 400
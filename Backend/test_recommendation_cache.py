@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+Recommendation cache: repeated calls are served with a single version lookup,
+and changes to preferences (per client) or inventory (global) invalidate the
+cached responses, also when another worker made them.
+"""
+
+import pytest
+from sqlalchemy import event
+
+from app import db
+from app.models import Client, Vendor
+from app.cache import TTLCache
+from app.services import HouseService, PreferencesService, VendorService, house_index
+
+pytestmark = pytest.mark.filterwarnings("ignore::UserWarning")
+
+
+@pytest.fixture
+def app(app):
+    vendor = Vendor(email="v@example.com", username="vendor", password="x")
+    clients = [Client(email=f"c{n}@example.com", username=f"client{n}", password="x") for n in range(2)]
+    db.session.add_all([vendor, *clients])
+    db.session.commit()
+    for client in clients:
+        PreferencesService.create_preference(client.client_id, {"preferred_neighborhood": "NAmes"})
+    HouseService.create_house(vendor.vendor_id, {"title": "Casa", "sale_price": 1, "neighborhood": "NAmes"})
+    return app
+
+
+def _titles(client_id):
+    return [m["house"]["title"] for m in PreferencesService.find_matching_houses(client_id)["matches"]]
+
+
+def test_repeat_call_is_served_with_one_version_lookup(app):
+    client_id = Client.query.first().client_id
+    first = PreferencesService.find_matching_houses(client_id)
+    hits = PreferencesService.get_recommendation_stats()["cache"]["hits"]
+
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    engine = db.engine
+    event.listen(engine, "before_cursor_execute", record)
+    try:
+        second = PreferencesService.find_matching_houses(client_id)
+    finally:
+        event.remove(engine, "before_cursor_execute", record)
+
+    assert second == first
+    assert len(statements) == 1 and "cache_versions" in statements[0]
+    assert PreferencesService.get_recommendation_stats()["cache"]["hits"] == hits + 1
+
+
+def test_service_writes_invalidate_cached_responses(app):
+    first, second = (c.client_id for c in Client.query.order_by(Client.client_id))
+    vendor_id = Vendor.query.first().vendor_id
+    assert _titles(first) == _titles(second) == ["Casa"]
+
+    # Preferences: only the client whose preferences changed is recomputed
+    PreferencesService.create_preference(first, {"preferred_neighborhood": "OldTown"})
+    assert _titles(first) == []
+    misses = PreferencesService.get_recommendation_stats()["cache"]["misses"]
+    assert _titles(second) == ["Casa"]
+    assert PreferencesService.get_recommendation_stats()["cache"]["misses"] == misses
+
+    # Inventory: every client sees the new and the deleted house
+    house = HouseService.create_house(vendor_id, {"title": "Casa 2", "sale_price": 2, "neighborhood": "OldTown"})
+    assert _titles(first) == ["Casa 2"]
+    assert HouseService.delete_house(house["house_id"])
+    assert _titles(first) == []
+    assert _titles(second) == ["Casa"]
+
+    assert PreferencesService.delete_preference(second)
+    assert PreferencesService.find_matching_houses(second)["preferences_applied"] is None
+
+
+def test_changes_made_by_another_worker_invalidate_this_workers_cache(app, monkeypatch):
+    first, second = (c.client_id for c in Client.query.order_by(Client.client_id))
+    vendor_id = Vendor.query.first().vendor_id
+    assert _titles(first) == _titles(second) == ["Casa"]
+    this_worker = PreferencesService._recommendation_cache
+
+    # The other worker has its own recommendation cache
+    with monkeypatch.context() as other_worker:
+        other_worker.setattr(PreferencesService, "_recommendation_cache", TTLCache())
+        PreferencesService.create_preference(first, {"preferred_neighborhood": "OldTown"})
+        VendorService.update_vendor(vendor_id, {"username": "renamed"})
+
+    assert PreferencesService._recommendation_cache is this_worker
+    misses = this_worker.misses
+    assert _titles(first) == []
+    matches = PreferencesService.find_matching_houses(second)["matches"]
+    assert [m["vendor"]["username"] for m in matches] == ["renamed"]
+    assert this_worker.misses == misses + 2
+
+
+def test_houses_created_by_another_worker_reach_this_workers_index(app, monkeypatch):
+    client_id = Client.query.first().client_id
+    vendor_id = Vendor.query.first().vendor_id
+    assert _titles(client_id) == ["Casa"]
+    rebuilds = house_index.rebuilds
+
+    # The other worker updates its own index, not this one
+    with monkeypatch.context() as other_worker:
+        other_worker.setattr(PreferencesService, "_recommendation_cache", TTLCache())
+        other_worker.setattr(house_index, "upsert", lambda *args, **kwargs: None)
+        HouseService.create_house(vendor_id, {"title": "Casa 2", "sale_price": 2, "neighborhood": "NAmes"})
+
+    assert _titles(client_id) == ["Casa", "Casa 2"]
+    assert house_index.rebuilds == rebuilds + 1
@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+GET /api/clients/<id>/recommendations must issue a constant number of SQL
+statements: houses and their vendors come from one joined query.
+The in-memory house index is rebuilt and the recommendation cache is
+invalidated before counting, so the request runs the full lookup but not
+the index load query.
+"""
+
+import pytest
+from sqlalchemy import event
+
+from app import db
+from app.models import Client, ClientPreferences, Vendor, VendorHouse
+from app.services import PreferencesService, house_index
+
+pytestmark = pytest.mark.filterwarnings("ignore::UserWarning")
+
+
+@pytest.fixture
+def app(app):
+    client = Client(email="c@example.com", username="client", password="x")
+    db.session.add(client)
+    db.session.flush()
+    db.session.add(ClientPreferences(client_id=client.client_id, preferred_neighborhood="NAmes"))
+    db.session.commit()
+    return app
+
+
+def _add_houses(count):
+    for n in range(count):
+        vendor = Vendor(email=f"v{n}-{count}@example.com", username=f"vendor{n}-{count}", password="x")
+        db.session.add(vendor)
+        db.session.flush()
+        db.session.add(VendorHouse(vendor_id=vendor.vendor_id, title=f"Casa {n}", sale_price=150000,
+                                   neighborhood="NAmes", contact_email=f"v{n}@example.com"))
+    db.session.commit()
+
+
+def _count_statements(app, client_id):
+    # The houses are inserted directly, bypassing HouseService
+    PreferencesService.inventory_changed()
+    db.session.commit()
+    house_index.invalidate()
+    house_index.ensure_fresh()
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    engine = db.engine
+    event.listen(engine, "before_cursor_execute", record)
+    try:
+        response = app.test_client().get(f"/api/clients/{client_id}/recommendations?mode=ranked&limit=100")
+    finally:
+        event.remove(engine, "before_cursor_execute", record)
+    assert response.status_code == 200
+    return len(response.get_json()["matches"]), statements
+
+
+def test_recommendations_query_count_does_not_grow_with_matches(app):
+    client_id = Client.query.first().client_id
+
+    _add_houses(2)
+    few_matches, few = _count_statements(app, client_id)
+    _add_houses(25)
+    many_matches, many = _count_statements(app, client_id)
+
+    assert (few_matches, many_matches) == (2, 27)
+    # Cache versions, the house index's inventory version, client, preferences
+    # and the joined houses query
+    assert len(many) == len(few) <= 5
+
+
+def test_recommendations_include_vendor_contact(app):
+    client_id = Client.query.first().client_id
+    _add_houses(1)
+
+    match = app.test_client().get(f"/api/clients/{client_id}/recommendations").get_json()["matches"][0]
+    assert match["vendor"]["username"] == "vendor0-1"
+    assert match["vendor"]["contact_email"] == "v0@example.com"
+    assert match["house"]["title"] == "Casa 0"
+
+
+def test_recommendations_default_to_every_match(app):
+    client_id = Client.query.first().client_id
+    _add_houses(25)
+    client = app.test_client()
+
+    # The frontend sends neither mode nor limit and does not page
+    everything = client.get(f"/api/clients/{client_id}/recommendations").get_json()
+    assert len(everything["matches"]) == 25
+    assert "score" not in everything["matches"][0]
+
+    page = client.get(f"/api/clients/{client_id}/recommendations?mode=ranked&limit=10").get_json()
+    assert (len(page["matches"]), page["total_matches"]) == (10, 25)
@@ -0,0 +1,239 @@
+#!/usr/bin/env python3
+"""
+Reverse matching: the inverted preference index finds the same clients for a
+new house as forward matching finds houses for each client, and the vendor
+endpoint lists them from house_client_matches, with the clients that accept
+any house added at read time. Rewriting a client's rows after a preference
+change runs outside the request.
+"""
+
+import random
+import threading
+import time
+
+import numpy as np
+import pytest
+
+from app import db
+from app.client_index import IntervalTree
+from app.matching import MATCH_CRITERIA
+from app.models import CacheVersion, Client, ClientPreferences, HouseClientMatch, Vendor, VendorHouse
+from app.services import HouseService, PreferencesService, client_index
+
+pytestmark = pytest.mark.filterwarnings("ignore::UserWarning")
+
+CATEGORIES = ["A", "B", "C", None]
+NUMBERS = [None, 1.0, 2.0, 3.0, 5.0, 1500.0]
+
+
+def _random_house(rng):
+    house = {"title": "Casa", "sale_price": rng.choice([90000, 150000, 210000, 300000]),
+             "central_air": rng.choice(["Y", "N", None])}
+    for criterion in MATCH_CRITERIA:
+        if criterion.column in house:
+            continue
+        house[criterion.column] = rng.choice(NUMBERS if criterion.kind == "range" else CATEGORIES)
+    return house
+
+
+def _random_preferences(rng):
+    prefs = {}
+    for criterion in rng.sample(MATCH_CRITERIA, rng.randint(0, 4)):
+        if criterion.kind == "range":
+            low, high = sorted(rng.sample([1.0, 2.0, 3.0, 1500.0, 100000.0, 250000.0], 2))
+            prefs[criterion.attrs[0]] = rng.choice([low, None])
+            prefs[criterion.attrs[1]] = rng.choice([high, None])
+        elif criterion.kind == "equals":
+            prefs[criterion.attrs[0]] = rng.choice(["A", "B", "Z"])
+        else:
+            prefs[criterion.attrs[0]] = True
+    return prefs
+
+
+def test_interval_tree_stab_matches_brute_force():
+    rng = random.Random(3)
+    intervals = {}
+    for n in range(500):
+        low, high = sorted(rng.uniform(0, 100) for _ in range(2))
+        intervals[n] = (rng.choice([low, None]), rng.choice([high, None]))
+    tree = IntervalTree.build(intervals)
+
+    for x in [rng.uniform(-10, 110) for _ in range(200)] + [0.0, 50.0, 100.0]:
+        expected = {n for n, (low, high) in intervals.items()
+                    if (low is None or low <= x) and (high is None or x <= high)}
+        found = tree.stab(x)
+        assert len(found) == len(expected) and set(found.tolist()) == expected
+    assert IntervalTree.build({}) is None
+    assert np.array_equal(IntervalTree.build({1: (None, None)}).stab(7.0), [1])
+
+
+def test_match_table_agrees_with_forward_matching(app):
+    rng = random.Random(5)
+    vendor = Vendor(email="v@example.com", username="vendor", password="x")
+    clients = [Client(email=f"c{n}@example.com", username=f"client{n}", password="x") for n in range(40)]
+    db.session.add_all([vendor, *clients])
+    db.session.commit()
+
+    # Houses before and after the preferences: both paths fill the table
+    for _ in range(30):
+        HouseService.create_house(vendor.vendor_id, _random_house(rng))
+    for client in clients:
+        PreferencesService.create_preference(client.client_id, _random_preferences(rng))
+    for _ in range(30):
+        HouseService.create_house(vendor.vendor_id, _random_house(rng))
+
+    # Clients without criteria have no rows; they are added when listing
+    recorded = {}
+    for house_id, in db.session.query(VendorHouse.house_id):
+        listed = HouseService.get_interested_clients(vendor.vendor_id, house_id, limit=100)
+        assert listed["total_clients"] == len(listed["clients"])
+        for c in listed["clients"]:
+            recorded.setdefault(c["client_id"], {})[house_id] = (c["score"], c["matched_criteria"])
+    match_all = set(client_index.match_all())
+    assert match_all and not HouseClientMatch.query.filter(HouseClientMatch.client_id.in_(match_all)).count()
+    for client in clients:
+        result = PreferencesService.find_matching_houses(client.client_id, limit=100)
+        expected = {m["house"]["house_id"]: (m["score"], m["matched_criteria"]) for m in result["matches"]}
+        assert recorded.get(client.client_id, {}) == expected
+
+
+def test_vendor_lists_interested_clients(app):
+    vendors = [Vendor(email=f"v{n}@example.com", username=f"vendor{n}", password="x") for n in range(2)]
+    clients = [Client(email=f"c{n}@example.com", username=f"client{n}", password="x") for n in range(3)]
+    db.session.add_all([*vendors, *clients])
+    db.session.commit()
+    PreferencesService.create_preference(clients[0].client_id, {"preferred_neighborhood": "NAmes"})
+    PreferencesService.create_preference(clients[1].client_id, {"preferred_neighborhood": "NAmes",
+                                                                "min_sale_price": 200000})
+    PreferencesService.create_preference(clients[2].client_id, {"preferred_neighborhood": "OldTown"})
+    house = HouseService.create_house(vendors[0].vendor_id, {"title": "Casa", "sale_price": 150000,
+                                                             "neighborhood": "NAmes"})
+
+    http = app.test_client()
+    url = f"/api/vendors/{vendors[0].vendor_id}/houses/{house['house_id']}/interested-clients"
+    body = http.get(url).get_json()
+    assert body["total_clients"] == 2
+    # client1 also asked for a price this house does not meet
+    assert [(c["username"], c["score"]) for c in body["clients"]] == [("client0", 1.0), ("client1", 0.4)]
+    assert body["clients"][1]["matched_criteria"] == ["neighborhood"]
+    assert "password" not in body["clients"][0]
+    assert http.get(url + "?limit=1&offset=1").get_json()["clients"][0]["username"] == "client1"
+
+    other = f"/api/vendors/{vendors[1].vendor_id}/houses/{house['house_id']}/interested-clients"
+    assert http.get(other).status_code == 404
+
+    # Deleting the preferences removes the client from the list
+    assert PreferencesService.delete_preference(clients[0].client_id)
+    assert [c["username"] for c in http.get(url).get_json()["clients"]] == ["client1"]
+
+
+def test_client_without_criteria_is_listed_last_without_rows(app):
+    vendor = Vendor(email="v@example.com", username="vendor", password="x")
+    clients = [Client(email=f"c{n}@example.com", username=f"client{n}", password="x") for n in range(2)]
+    db.session.add_all([vendor, *clients])
+    db.session.commit()
+    PreferencesService.create_preference(clients[0].client_id, {})
+    PreferencesService.create_preference(clients[1].client_id, {"preferred_neighborhood": "names"})
+    house = HouseService.create_house(vendor.vendor_id, {"title": "Casa", "sale_price": 1, "neighborhood": "NAmes"})
+
+    assert [m.client_id for m in HouseClientMatch.query.all()] == [clients[1].client_id]
+    url = f"/api/vendors/{vendor.vendor_id}/houses/{house['house_id']}/interested-clients"
+    body = app.test_client().get(url).get_json()
+    assert body["total_clients"] == 2
+    assert [(c["username"], c["score"]) for c in body["clients"]] == [("client1", 1.0), ("client0", 0.0)]
+    second_page = app.test_client().get(url + "?limit=1&offset=1").get_json()["clients"]
+    assert [c["username"] for c in second_page] == ["client0"]
+
+
+def test_preference_change_rewrites_matches_outside_the_request(make_app, tmp_path, monkeypatch):
+    app = make_app(SQLALCHEMY_DATABASE_URI=f"sqlite:///{tmp_path / 'matches.db'}", CLIENT_MATCHES_SYNC_WORKERS=1)
+    release = threading.Event()
+    rewrite = PreferencesService.rewrite_client_matches.__func__
+    threads = []
+
+    def slow_rewrite(cls, client_id):
+        threads.append(threading.get_ident())
+        release.wait(5)
+        return rewrite(cls, client_id)
+
+    monkeypatch.setattr(PreferencesService, "rewrite_client_matches", classmethod(slow_rewrite))
+    with app.app_context():
+        try:
+            vendor = Vendor(email="v@example.com", username="vendor", password="x")
+            client = Client(email="c@example.com", username="client", password="x")
+            db.session.add_all([vendor, client])
+            db.session.commit()
+            HouseService.create_house(vendor.vendor_id, {"title": "Casa", "sale_price": 1, "neighborhood": "NAmes"})
+
+            # The request returns while the rewrite is still blocked
+            PreferencesService.create_preference(client.client_id, {"preferred_neighborhood": "NAmes"})
+            assert HouseClientMatch.query.count() == 0
+            release.set()
+            deadline = time.time() + 5
+            while HouseClientMatch.query.count() == 0 and time.time() < deadline:
+                db.session.rollback()
+                time.sleep(0.02)
+            assert HouseClientMatch.query.count() == 1
+            assert threads and threads[0] != threading.get_ident()
+        finally:
+            release.set()
+            PreferencesService.start_match_sync(app, workers=0)
+            db.drop_all()
+
+
+def test_failed_match_sync_keeps_the_saved_preferences(app, monkeypatch):
+    client = Client(email="c@example.com", username="client", password="x")
+    db.session.add(client)
+    db.session.commit()
+
+    def broken_rewrite(cls, client_id):
+        raise RuntimeError("database went away")
+
+    monkeypatch.setattr(PreferencesService, "rewrite_client_matches", classmethod(broken_rewrite))
+    response = app.test_client().post(f"/api/clients/{client.client_id}/preferences",
+                                      json={"preferred_neighborhood": "NAmes"})
+    assert response.status_code == 201
+    assert PreferencesService._latest_preferences(client.client_id).preferred_neighborhood == "NAmes"
+    assert PreferencesService.delete_preference(client.client_id)
+
+
+def test_recording_a_match_twice_updates_the_row(app):
+    vendor = Vendor(email="v@example.com", username="vendor", password="x")
+    client = Client(email="c@example.com", username="client", password="x")
+    db.session.add_all([vendor, client])
+    db.session.commit()
+    PreferencesService.create_preference(client.client_id, {"preferred_neighborhood": "NAmes"})
+    house = HouseService.create_house(vendor.vendor_id, {"title": "Casa", "sale_price": 1, "neighborhood": "NAmes"})
+
+    # A rewrite of the client's rows racing create_house writes the same key
+    HouseClientMatch.query.update({"score": 0.1})
+    assert HouseService.record_client_matches(VendorHouse.query.get(house["house_id"])) == 1
+    db.session.commit()
+    assert [(m.client_id, m.score) for m in HouseClientMatch.query.all()] == [(client.client_id, 1.0)]
+
+
+def test_preference_change_in_another_worker_rebuilds_the_index(app):
+    vendor = Vendor(email="v@example.com", username="vendor", password="x")
+    clients = [Client(email=f"c{n}@example.com", username=f"client{n}", password="x") for n in range(2)]
+    db.session.add_all([vendor, *clients])
+    db.session.commit()
+    PreferencesService.create_preference(clients[0].client_id, {"preferred_neighborhood": "NAmes"})
+    assert client_index.match_all() == []
+    rebuilds = client_index.rebuilds
+
+    # Another worker changes client0's criteria and adds client1 without criteria:
+    # only the rows and the shared version move, this process's index is untouched
+    ClientPreferences.query.filter_by(client_id=clients[0].client_id).update({"preferred_neighborhood": "OldTown"})
+    db.session.add(ClientPreferences(client_id=clients[1].client_id))
+    CacheVersion.query.filter_by(scope="preferences", scope_id=0).update({"version": CacheVersion.version + 1})
+    db.session.commit()
+
+    old_town = HouseService.create_house(vendor.vendor_id, {"title": "Casa", "sale_price": 1, "neighborhood": "OldTown"})
+    HouseService.create_house(vendor.vendor_id, {"title": "Casa", "sale_price": 1, "neighborhood": "NAmes"})
+    assert client_index.rebuilds == rebuilds + 1
+    assert [(m.house_id, m.client_id) for m in HouseClientMatch.query.all()] == [
+        (old_town["house_id"], clients[0].client_id)]
+
+    url = f"/api/vendors/{vendor.vendor_id}/houses/{old_town['house_id']}/interested-clients"
+    body = app.test_client().get(url).get_json()
+    assert [c["username"] for c in body["clients"]] == ["client0", "client1"]
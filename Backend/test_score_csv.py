@@ -0,0 +1,40 @@
+#!/usr/bin/env python3
+"""
+Chunked CSV scoring: fill values accumulated over chunks match the whole-file
+statistics, and the output does not depend on the chunk size.
+"""
+import os
+
+import pandas as pd
+import pytest
+
+from app.features import KaggleFillValues
+from score_csv import fill_values_for, score_csv
+
+pytestmark = pytest.mark.filterwarnings("ignore::UserWarning")
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+TEST_CSV = os.path.join(BACKEND_DIR, "..", "Model", "Data", "test.csv")
+
+
+def test_chunked_fill_values_match_whole_file():
+    whole = KaggleFillValues.from_frame(pd.read_csv(TEST_CSV)).values()
+    assert fill_values_for(TEST_CSV, chunk_size=97) == whole
+
+
+def test_output_is_independent_of_chunk_size(tmp_path):
+    sample = tmp_path / "sample.csv"
+    pd.read_csv(TEST_CSV, nrows=300).to_csv(sample, index=False)
+
+    outputs = []
+    for chunk_size in (300, 64):
+        output = tmp_path / f"submission_{chunk_size}.csv"
+        result = score_csv(str(sample), str(output), chunk_size=chunk_size, progress=False)
+        assert result["rows"] == result["scored"] == 300
+        assert result["chunks"] == -(-300 // chunk_size)
+        outputs.append(output.read_text())
+
+    assert outputs[0] == outputs[1]
+    lines = outputs[0].splitlines()
+    assert lines[0] == "Id,SalePrice"
+    assert len(lines) == 301
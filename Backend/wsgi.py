@@ -0,0 +1,19 @@
+"""
+Punto de entrada WSGI para producción (gunicorn con preload_app, ver gunicorn.conf.py).
+
+Los modelos se cargan de forma síncrona en el proceso maestro: un hilo en
+segundo plano no sobrevive al fork, y así los workers heredan los boosters
+y encoders ya cargados, compartidos copy-on-write.
+
+    gunicorn -c gunicorn.conf.py wsgi:app
+"""
+from app import create_app
+from config import Config
+
+
+class PreforkConfig(Config):
+    AI_BACKGROUND_LOAD = False
+    DEBUG = False
+
+
+app = create_app(PreforkConfig)